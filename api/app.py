@@ -1,48 +1,109 @@
-from flask import Flask, jsonify, session
+from dotenv import load_dotenv
+from api.db import db_status, init_db, wait_for_db
+import os
+
+load_dotenv()
+
+# Start connecting to MongoDB in the background while the rest of the app is
+# imported; gunicorn.conf.py turns this off and connects after forking instead
+init_db(warm=os.getenv("MONGO_CONNECT_ON_IMPORT", "1") != "0")
+
+from flask import Flask, Response, jsonify, session
 from flask_cors import CORS
 from flask_bcrypt import Bcrypt
 from flask_jwt_extended import JWTManager
 from flask_restful import Api
-from mongoengine import connect, disconnect, get_db
 from api.controllers import *  # Import controllers
 from api.models import User, Course, Announcement, Week, Module, TestCase, Question, ChatHistory  # Import models
-from dotenv import load_dotenv
-import os
-from api.seed_db import seed_database
-import requests
+from api.enrollment import backfill_enrollments
+from api.stats import rebuild_counters, rollup_daily_stats
+from api.topics import compute_topic_snapshot
+from api.singleflight import stats as singleflight_stats
+from api.upstream import dependency_stats
+from api.json_provider import FastJSONProvider, output_json
+from api.compression import init_compression
+from api.timing import init_timing
+from api.query_monitor import init_query_monitor, route_stats as query_route_stats
+from api.metrics import init_metrics, render_metrics
+from api.profiler import admin_only, init_profiler
 
-load_dotenv()
 # Initialize Flask app
 app = Flask(__name__)
 
-# Enable CORS for specified origins
-CORS(app, supports_credentials=True, origins=["*"])
+# orjson-backed JSON for jsonify and for the flask-restful resources below
+app.json = FastJSONProvider(app)
+
+# Enable CORS for specified origins. Pagination cursors travel in headers,
+# which cross-origin pages can only read when they are exposed
+CORS(app, supports_credentials=True, origins=["*"], expose_headers=["X-Next-Cursor"])
 
 # Configuration
 app.config['JWT_SECRET_KEY'] = 'your_jwt_secret_key'  # Ensure this is secure
 app.config['SECRET_KEY'] = os.getenv("FLASK_SECRET_KEY", "your_default_secret_key")  # Set a secret key for session management
+# /metrics and the status routes need PROFILER_TOKEN unless this is set
+app.config['STATUS_ENDPOINTS_PUBLIC'] = os.getenv("STATUS_ENDPOINTS_PUBLIC", "false").lower() in ("1", "true", "yes")
 
 # Initialize extensions
 bcrypt = Bcrypt(app)
 jwt = JWTManager(app)
 api = Api(app)
+api.representations['application/json'] = output_json
 
-# Disconnect and attempt DB connection
-disconnect()
-db_status = False
+# Server-Timing header and a log line per request. Registered before
+# compression so its after_request hook runs last and sees the final body
+init_timing(app)
 
-try:
-    # Connect to MongoDB
-    connect(db="backend", host=os.getenv("MONGO_URI"), alias="default")
-    print("DB Connected")  # Print message when connected successfully
-    db_status = True
-except Exception as e:
-    print(f"DB Connection Failed: {e}")  # Print error message if connection fails
+# Query counts per route, and a log line for requests repeating one query shape (N+1)
+init_query_monitor(app)
+
+# Request rate, errors and latency per route for /metrics
+init_metrics(app)
+
+# gzip/brotli for larger responses. Course trees and transcripts are cached
+# with their compressed bodies, so they are compressed harder: transcripts,
+# cached for an hour, get brotli's slow maximum quality
+init_compression(app, levels={
+    "courseapi": {"br": 9, "gzip": 9},
+    "videotranscriptapi": {"br": 11, "gzip": 9},
+    "course.video_transcript_api": {"br": 11, "gzip": 9}
+})
+
+# Requests arriving during a cold start wait for the MongoDB client rather than racing its creation
+app.before_request(wait_for_db)
+
+# Admin-only request profiling and tracemalloc endpoints; nothing is registered
+# unless PROFILER_TOKEN is set. Registered last so profiles cover just the handler
+init_profiler(app)
 
 # Route to check DB status
 @app.route('/db_status', methods=['GET'])
 def check_db_status():
-    return jsonify({"status": db_status}), 200
+    return jsonify({"status": db_status()}), 200
+
+# Route to check how many upstream calls and queries were coalesced
+@app.route('/singleflight_status', methods=['GET'])
+@admin_only
+def check_singleflight_status():
+    return jsonify(singleflight_stats()), 200
+
+# Route to check the circuit breakers and bulkheads of upstream services
+@app.route('/dependency_status', methods=['GET'])
+@admin_only
+def check_dependency_status():
+    return jsonify(dependency_stats()), 200
+
+# Route to check MongoDB query counts and time per route
+@app.route('/query_status', methods=['GET'])
+@admin_only
+def check_query_status():
+    return jsonify(query_route_stats()), 200
+
+# Prometheus metrics, aggregated across gunicorn workers
+@app.route('/metrics', methods=['GET'])
+@admin_only
+def metrics():
+    body, contentType = render_metrics()
+    return Response(body, content_type=contentType)
 
 @app.route('/')
 def home():
@@ -53,6 +114,7 @@ api.add_resource(Login, '/login')
 # api.add_resource(Study, '/study')
 api.add_resource(CourseAPI, '/courses', '/course/<courseId>')
 api.add_resource(RegisteredCourses, '/registered-courses')
+api.add_resource(CourseEnrollmentsAPI, '/course/<courseId>/enrollments')
 api.add_resource(UsersAPI, '/users', '/user/<userId>')
 
 # # YouTube Transcript API Route
@@ -61,6 +123,9 @@ api.add_resource(UsersAPI, '/users', '/user/<userId>')
 # Chatbot Interaction Route
 api.add_resource(ChatbotInteractionAPI, '/chatbot')
 
+# Weekwise Chatbot Questions Route
+api.add_resource(FetchWeekwiseQuestionsAPI, '/weekwise-questions')
+
 # User Statistics Route
 api.add_resource(UserStatisticsAPI, '/user-statistics/<userId>')
 
@@ -75,10 +140,38 @@ api.add_resource(VideoTranscriptAPI, '/video-transcript')
 
 
 
+# Copy legacy enrollment arrays into the Enrollment collection
+@app.cli.command('backfill-enrollments')
+def backfill_enrollments_command():
+    print(f"Created {backfill_enrollments()} enrollments")
+
+# Recompute the statistics counters from stored data
+@app.cli.command('stats-rebuild')
+def stats_rebuild_command():
+    print(f"Rebuilt {rebuild_counters()} counters")
+
+# Snapshot the statistics counters into today's daily buckets (run from cron)
+@app.cli.command('stats-rollup')
+def stats_rollup_command():
+    print(f"Wrote {rollup_daily_stats()} daily buckets")
+
+# Fold new chatbot questions into every course's topic model and cached topics (run from cron)
+@app.cli.command('topics-refresh')
+def topics_refresh_command():
+    for courseId in Course.objects.scalar('id'):
+        snapshot = compute_topic_snapshot(courseId, "all")
+        print(f"Course {courseId}: {', '.join(topic['topic'] for topic in snapshot['topics'])}")
+
+# Load the seed fixtures (imported here: the fixture module is large and rarely needed)
+@app.cli.command('seed-db')
+def seed_db_command():
+    from api.seed_db import seed_database
+    seed_database()
+
 # Register Flask routes
 app.register_blueprint(course_bp)
 app.register_blueprint(user_bp)
 
 if __name__ == '__main__':
-    # seed_database()
+    # Seed with `flask --app api.app seed-db`
     app.run(debug=True)
\ No newline at end of file
@@ -0,0 +1,203 @@
+"""
+ASGI entry point, alongside the WSGI app in api/app.py.
+
+/chatbot, /debug/code and /top-questions spend almost all their time waiting
+on RAG and Groq, so here they are async views: upstream calls go through one
+shared httpx.AsyncClient and a worker keeps hundreds of them in flight instead
+of one per thread. mongoengine is synchronous, so their database work runs in
+the thread pool. Every other route is passed through to the Flask app.
+
+Run with:
+    uvicorn api.asgi:app --workers 2
+"""
+import json
+from contextlib import asynccontextmanager
+
+import httpx
+from asgiref.wsgi import WsgiToAsgi
+from starlette.applications import Starlette
+from starlette.concurrency import run_in_threadpool
+from starlette.datastructures import MutableHeaders
+from starlette.middleware import Middleware
+from starlette.middleware.cors import CORSMiddleware
+from starlette.responses import JSONResponse as StarletteJSONResponse
+from starlette.routing import Mount, Route
+
+from api.app import app as flask_app
+from api.controllers import (chatbot_unavailable, debug_prompt, debug_unavailable, llm_diagnosis,
+                             prepare_chatbot_question, prepare_debug_request, prepare_top_questions,
+                             test_run_diagnosis, top_questions_body)
+from api.json_provider import dumps_bytes
+from api.metrics import observe_request
+from api.resilience import DependencyUnavailable
+from api.singleflight import AsyncSingleFlight
+from api.timing import LOG_ENABLED, begin_request_timer, end_request_timer, log_request, server_timing
+from api.upstream import GROQ, RAG, groq_chat_async, rag_ask_async
+
+# Identical concurrent requests share one upstream call, as in the WSGI views
+CHATBOT_FLIGHTS = AsyncSingleFlight("chatbot-async")
+DEBUG_FLIGHTS = AsyncSingleFlight("debug-async")
+
+
+class JSONResponse(StarletteJSONResponse):
+    # Same encoder and output as the Flask app (api/json_provider.py)
+    def render(self, content):
+        return dumps_bytes(content)
+
+
+class AsyncRoutesOnly:
+    """
+    Applies an ASGI middleware to the async routes only. The mounted Flask app
+    already has its own (Flask-CORS), and running both stacks the headers.
+    """
+
+    def __init__(self, app, routes, middleware, **options):
+        self.app = app
+        self.routes = frozenset(routes)
+        self.wrapped = middleware(app, **options)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http" and scope["path"] in self.routes:
+            return await self.wrapped(scope, receive, send)
+        return await self.app(scope, receive, send)
+
+
+class RequestTimingMiddleware:
+    """
+    Server-Timing, the request log line and the /metrics request series for
+    the async routes, which bypass the Flask hooks that record them for every
+    other route (the mounted Flask app records its own).
+    """
+
+    def __init__(self, app, routes):
+        self.app = app
+        self.routes = frozenset(routes)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] not in self.routes:
+            return await self.app(scope, receive, send)
+
+        timer, token = begin_request_timer()
+        response = {"status": 500, "bytes": 0}
+
+        async def send_timed(message):
+            if message["type"] == "http.response.start":
+                response["status"] = message["status"]
+                MutableHeaders(scope=message).append("Server-Timing", server_timing(timer, timer.elapsed()))
+            elif message["type"] == "http.response.body":
+                response["bytes"] += len(message.get("body", b""))
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_timed)
+        finally:
+            end_request_timer(token)
+            total = timer.elapsed()
+            observe_request(scope["path"], scope["method"], response["status"], total)
+            if LOG_ENABLED:
+                headers = dict(scope["headers"])
+                log_request(scope["method"], scope["path"], scope["path"], response["status"],
+                            int(headers.get(b"content-length", 0)), response["bytes"], timer, total)
+
+
+@asynccontextmanager
+async def lifespan(app):
+    # One connection pool per worker, sized to what the bulkheads let through
+    limits = httpx.Limits(
+        max_connections=RAG.maxConcurrentAsync + GROQ.maxConcurrentAsync,
+        max_keepalive_connections=64
+    )
+    async with httpx.AsyncClient(limits=limits) as client:
+        app.state.http = client
+        yield
+
+
+async def ask_rag(client, data):
+    """Async counterpart of controllers.ask_rag(); returns (body, status)."""
+    response = await rag_ask_async(client, data)
+
+    # Check the status code and the response
+    if response.status_code == 200:
+        return response.json(), 200
+    else:
+        return response.text, response.status_code
+
+
+async def chatbot(request):
+    try:
+        data, error = await run_in_threadpool(prepare_chatbot_question, await request.json())
+        if error:
+            return JSONResponse(*error)
+
+        # Students asking the same thing at the same moment share one RAG call
+        flightKey = json.dumps(data, sort_keys=True)
+        body, status = await CHATBOT_FLIGHTS.ado(flightKey, lambda: ask_rag(request.app.state.http, data))
+        return JSONResponse(body, status)
+
+    except DependencyUnavailable as e:
+        return JSONResponse(*chatbot_unavailable(e))
+
+    except Exception as e:
+        return JSONResponse({"error": "Something went wrong", "message": str(e)}, 500)
+
+
+async def diagnose_code(client, cacheKey, submitted_code, module):
+    """Async counterpart of controllers.diagnose_code(); returns (status, body)."""
+    # The test run is a subprocess with a short timeout; keep it off the event loop
+    result = await run_in_threadpool(test_run_diagnosis, cacheKey, submitted_code, module)
+    if result:
+        return result
+
+    return llm_diagnosis(cacheKey, await groq_chat_async(client, debug_prompt(submitted_code, module)))
+
+
+async def debug_code(request):
+    try:
+        result, pending = await run_in_threadpool(prepare_debug_request, await request.json())
+
+        # Identical concurrent requests share a single test run and upstream call
+        if pending:
+            cacheKey = pending[0]
+            result = await DEBUG_FLIGHTS.ado(cacheKey, lambda: diagnose_code(request.app.state.http, *pending))
+
+        status, body = result
+        return JSONResponse(body, status)
+
+    except DependencyUnavailable as e:
+        return JSONResponse(*debug_unavailable(e))
+
+    except Exception as e:
+        return JSONResponse({"error": f"An error occurred: {str(e)}"}, 500)
+
+
+async def top_questions(request):
+    try:
+        params, error = await run_in_threadpool(prepare_top_questions, await request.json())
+        if error:
+            return JSONResponse(*error)
+
+        # Topic labelling calls Groq from the snapshot refresh, which already
+        # runs in its own thread pool once a snapshot exists
+        return JSONResponse(await run_in_threadpool(top_questions_body, *params))
+
+    except Exception as e:
+        return JSONResponse({"error": f"An error occurred: {str(e)}"}, 500)
+
+
+ASYNC_ROUTES = [
+    Route('/chatbot', chatbot, methods=['POST']),
+    Route('/debug/code', debug_code, methods=['POST']),
+    Route('/top-questions', top_questions, methods=['POST']),
+]
+
+app = Starlette(
+    routes=ASYNC_ROUTES + [Mount('/', WsgiToAsgi(flask_app))],
+    middleware=[
+        # Same CORS policy as Flask-CORS in api/app.py, which covers the mounted routes
+        Middleware(AsyncRoutesOnly, routes=[route.path for route in ASYNC_ROUTES], middleware=CORSMiddleware,
+                   allow_origins=["*"], allow_credentials=True, allow_methods=["*"], allow_headers=["*"],
+                   expose_headers=["X-Next-Cursor"]),
+        Middleware(RequestTimingMiddleware, routes=[route.path for route in ASYNC_ROUTES])
+    ],
+    lifespan=lifespan
+)
@@ -0,0 +1,68 @@
+from collections import OrderedDict
+import threading
+import time
+from api.metrics import cache_counters
+
+
+class TTLCache:
+    """
+    Small thread-safe LRU cache whose entries expire `ttl` seconds after being set.
+    Shared by the controllers for data that is read far more often than it changes.
+    A `name` reports its hits and misses to /metrics.
+    """
+
+    def __init__(self, maxsize=128, ttl=300, name=None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.name = name
+        self._hits, self._misses = cache_counters(name) if name else (None, None)
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None and entry[1] <= time.monotonic():
+                del self._data[key]
+                entry = None
+
+            if entry is not None:
+                # Mark as most recently used
+                self._data.move_to_end(key)
+
+        if self.name:
+            (self._hits if entry is not None else self._misses).inc()
+        return default if entry is None else entry[0]
+
+    def get_many(self, keys):
+        """Returns a dict of the keys that are cached and still fresh."""
+        found = {}
+        for key in keys:
+            value = self.get(key, _MISSING)
+            if value is not _MISSING:
+                found[key] = value
+        return found
+
+    def set(self, key, value, ttl=None):
+        expiresAt = time.monotonic() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._data[key] = (value, expiresAt)
+            self._data.move_to_end(key)
+
+            # Evict least recently used entries beyond the size limit
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+
+_MISSING = object()
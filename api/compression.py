@@ -0,0 +1,121 @@
+"""
+Response compression.
+
+init_compression() registers an after_request hook that encodes responses
+with brotli (when installed) or gzip, as negotiated from Accept-Encoding, once
+the body reaches a minimum size. Levels are chosen per endpoint: cheap levels
+for bodies compressed on every request, high ones for bodies that are
+compressed once and served many times from a cache.
+
+Cached bodies are PrecompressedBody objects: each encoding is computed on
+first use and kept with the body, so a cache hit never compresses again.
+"""
+import gzip
+import os
+import threading
+from flask import current_app, request
+from api.timing import timed
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+MIN_SIZE = int(os.getenv("COMPRESSION_MIN_SIZE", "1024"))  # bytes; smaller bodies gain little
+COMPRESSIBLE_TYPES = {"application/json", "text/plain", "text/html", "text/csv"}
+
+# Levels for bodies compressed per request; brotli quality 0-11, gzip level 1-9
+DEFAULT_LEVELS = {"br": 5, "gzip": 6}
+
+# Preferred first when the client accepts several equally
+ENCODINGS = ("br", "gzip") if brotli else ("gzip",)
+
+
+def compress(data, encoding, level):
+    if encoding == "br":
+        return brotli.compress(data, quality=level)
+    return gzip.compress(data, compresslevel=level, mtime=0)
+
+
+def choose_encoding(acceptEncoding):
+    """Returns the best supported encoding allowed by an Accept-Encoding header, or None."""
+    accepted = {}
+    for part in (acceptEncoding or "").split(","):
+        name, _, params = part.partition(";")
+        quality = 1.0
+        for param in params.split(";"):
+            key, _, value = param.partition("=")
+            if key.strip() == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        if name.strip():
+            accepted[name.strip().lower()] = quality
+
+    candidates = [
+        (accepted.get(encoding, accepted.get("*", 0.0)), -rank, encoding)
+        for rank, encoding in enumerate(ENCODINGS)
+    ]
+    quality, _, encoding = max(candidates)
+    return encoding if quality > 0 else None
+
+
+class PrecompressedBody:
+    """A response body for the response caches, stored with its compressed encodings."""
+
+    def __init__(self, data):
+        self.data = data
+        self._encoded = {}
+        self._lock = threading.Lock()
+
+    def encoded(self, encoding, level):
+        # Concurrent requests for a new encoding wait for one compression
+        with self._lock:
+            if encoding not in self._encoded:
+                self._encoded[encoding] = compress(self.data, encoding, level)
+            return self._encoded[encoding]
+
+
+def cached_response(body, status=200, mimetype="application/json"):
+    """Response for a PrecompressedBody; compress_response() serves its stored encodings."""
+    response = current_app.response_class(body.data, status=status, mimetype=mimetype)
+    response.precompressed = body
+    return response
+
+
+def compress_response(response):
+    if response.mimetype not in COMPRESSIBLE_TYPES or response.is_streamed or response.direct_passthrough:
+        return response
+    if response.status_code < 200 or response.status_code in (204, 206, 304) or "Content-Encoding" in response.headers:
+        return response
+
+    # Caches must key compressible responses on Accept-Encoding, compressed or not
+    response.vary.add("Accept-Encoding")
+
+    settings = current_app.extensions["compression"]
+    if response.content_length is not None and response.content_length < settings["minSize"]:
+        return response
+
+    encoding = choose_encoding(request.headers.get("Accept-Encoding"))
+    if encoding is None:
+        return response
+
+    level = settings["levels"].get(request.endpoint, DEFAULT_LEVELS)[encoding]
+    precompressed = getattr(response, "precompressed", None)
+    with timed("compress"):
+        if precompressed is not None:
+            response.set_data(precompressed.encoded(encoding, level))
+        else:
+            response.set_data(compress(response.get_data(), encoding, level))
+    response.headers["Content-Encoding"] = encoding
+    return response
+
+
+def init_compression(app, levels=None, minSize=MIN_SIZE):
+    """
+    Compresses the app's responses. `levels` maps endpoint names to
+    {"br": quality, "gzip": level} for routes that differ from DEFAULT_LEVELS.
+    """
+    app.extensions["compression"] = {"levels": levels or {}, "minSize": minSize}
+    app.after_request(compress_response)
@@ -1,16 +1,32 @@
 from datetime import timedelta, datetime
-from flask import Blueprint, make_response, request, jsonify, session
+from flask import Blueprint, Response, make_response, request, jsonify, session, stream_with_context
 from flask_restful import Resource
 from flask_jwt_extended import create_access_token, get_jwt_identity, jwt_required, unset_jwt_cookies
-from youtube_transcript_api import YouTubeTranscriptApi
 from api.models import User, Course, Announcement, Week, Module, TestCase, Question, VideoTranscript, ChatHistory, ChatQuestions # Import models
+from api.cache import TTLCache
+from api.singleflight import SingleFlight
+from api.enrollment import enroll, enrolled_user_ids, count_enrolled
+from api.topics import WINDOW_RE, get_topic_snapshot
+from api.upstream import groq_chat, rag_ask
+from api.resilience import DependencyUnavailable
+from api.json_provider import dumps_bytes
+from api.compression import PrecompressedBody, cached_response
+from api.metrics import judge_run
+from api.precheck import as_completion, quick_run_diagnosis, sandbox_env, static_diagnosis
+from api.stats import (ADMIN_BREAKDOWNS, GLOBAL_KEY, GLOBAL_SCOPE, USER_SCOPE, compute_admin_statistics, count_user_lists,
+                       get_counters, get_daily_stats, record_enrollments, record_event, record_events,
+                       user_removal_updates, write_counter_updates)
 from bson import ObjectId
 import re
 import os
-import requests
-import subprocess
+import io
+import json
+import hashlib
+import tokenize
 import sys
-from mongoengine.errors import DoesNotExist
+import tempfile
+from mongoengine.errors import DoesNotExist, ValidationError
+from pymongo import ReturnDocument
 
 
 def get_ist_time():
@@ -36,25 +52,53 @@ def process_history(history):
     return formatted_history
 
 def get_module_type(moduleId):
-    # Fetch the module from the database using the moduleId
-    module = Module.objects(id=moduleId).first()
+    # Fetch the module's type from the database using the moduleId
+    module = Module.objects(id=moduleId).only('type', 'isGraded').as_pymongo().first()
     
     if not module:
         return "Module not found"
     
     prompt_option = ""
 
-    if module.isGraded:
+    if module.get("isGraded"):
         prompt_option = "graded"
-    elif module.type == "assignment":
+    elif module.get("type") == "assignment":
         prompt_option = "practice"
     else:
         prompt_option = "learning"
     
     return prompt_option
 
+# Course id -> {"id", "name", "description"}, shared across requests
+COURSE_METADATA_CACHE = TTLCache(maxsize=512, ttl=300, name="course-metadata")
+
+def get_course_metadata(courseIds):
+    """
+    Returns a dict mapping course id strings to their id, name and description.
+    Cached entries are reused; the rest are fetched with a single $in query.
+    Ids of courses that no longer exist are left out.
+    """
+    courseIds = [str(courseId) for courseId in courseIds]
+    metadata = COURSE_METADATA_CACHE.get_many(courseIds)
+
+    missing = [ObjectId(courseId) for courseId in set(courseIds) if courseId not in metadata]
+    if missing:
+        for course in Course.objects(id__in=missing).only('name', 'description').as_pymongo():
+            courseData = {
+                "id": str(course["_id"]),
+                "name": course.get("name"),
+                "description": course.get("description")
+            }
+            COURSE_METADATA_CACHE.set(courseData["id"], courseData)
+            metadata[courseData["id"]] = courseData
+
+    return metadata
+
 course_bp = Blueprint('course', __name__)
 
+# Fields returned by the login upsert
+LOGIN_FIELDS = {"role": 1, "email": 1, "name": 1, "profilePictureUrl": 1, "lastLogin": 1}
+
 class Login(Resource):
     def post(self):
         try:
@@ -65,34 +109,82 @@ class Login(Resource):
             if not email:
                 return make_response(jsonify({"error": "Email is required"}), 400)
 
-            user = User.objects(email=email).first()
+            try:
+                User.email.validate(email)
+            except ValidationError:
+                return make_response(jsonify({"error": "Invalid email"}), 400)
+
+            # Create the user on first login and stamp lastLogin in a single write
+            newUserId = ObjectId()
+            user = User._get_collection().find_one_and_update(
+                {"email": email},
+                {
+                    "$set": {"lastLogin": get_ist_time()},
+                    "$setOnInsert": {
+                        "_id": newUserId,
+                        "role": "student",
+                        "name": name if name else email.split("@")[0].capitalize(),
+                        "profilePictureUrl": picture if picture else "",
+                        "registeredCourses": [],
+                        "active": True
+                    }
+                },
+                projection=LOGIN_FIELDS,
+                upsert=True,
+                return_document=ReturnDocument.AFTER
+            )
+
+            if user["_id"] == newUserId:
+                record_events({"logins": 1, "users": 1, "activeUsers": 1}, userId=user["_id"])
+            else:
+                record_event("logins", userId=user["_id"])
 
-            if not user:
-                user = User(
-                    role="student",
-                    email=email,
-                    name=name if name else email.split("@")[0].capitalize(),
-                    profilePictureUrl=picture if picture else "",
-                    registeredCourses=[]
-                )
-                user.save()
-            
-            user.lastLogin = get_ist_time()
-            user.save()
             return make_response(jsonify({
                 'message': 'Login successful',
-                'userId': str(user.id),  # Changed user_id to userId
-                'role': user.role,
-                'email': user.email,
-                'name': user.name,
-                'picture': user.profilePictureUrl,
-                'lastLogin': user.lastLogin
+                'userId': str(user["_id"]),  # Changed user_id to userId
+                'role': user.get("role"),
+                'email': user.get("email"),
+                'name': user.get("name"),
+                'picture': user.get("profilePictureUrl"),
+                'lastLogin': user.get("lastLogin")
             }), 200)
         except Exception as e:
             return make_response(jsonify({"error": "Something went wrong", "message": str(e)}), 500)
 
 user_bp = Blueprint('user', __name__)
 
+# User listing pagination and export settings
+USER_LIST_FIELDS = ('id', 'role', 'email', 'name', 'profilePictureUrl', 'registeredCourses')
+USER_PAGE_DEFAULT_LIMIT = 100
+USER_PAGE_MAX_LIMIT = 1000
+USER_EXPORT_BATCH_SIZE = 500
+
+def parse_limit(value, default, maximum):
+    """
+    Parses a `limit` query parameter, clamping it to `maximum`.
+    Returns None if the value is not a positive integer.
+    """
+    if value is None:
+        return default
+    try:
+        limit = int(value)
+    except ValueError:
+        return None
+    if limit < 1:
+        return None
+    return min(limit, maximum)
+
+def serialize_user_listing(user):
+    # Serialize a raw (as_pymongo) user document for the listing endpoints
+    return {
+        "id": str(user["_id"]),
+        "role": user.get("role"),
+        "email": user.get("email"),
+        "name": user.get("name"),
+        "profilePictureUrl": user.get("profilePictureUrl"),
+        "registeredCourses": [str(courseId) for courseId in user.get("registeredCourses", [])]
+    }
+
 class UsersAPI(Resource):
     def get(self, userId=None):  # Changed user_id to userId
         """Fetch all users or a specific user by ID"""
@@ -106,31 +198,51 @@ class UsersAPI(Resource):
                 if not ObjectId.is_valid(userId):
                     return make_response(jsonify({"error": "Invalid user ID"}), 400)
 
-                user = User.objects(id=userId).first()
+                user = User.objects(id=userId).only(*USER_LIST_FIELDS).as_pymongo().first()
                 if not user:
                     return make_response(jsonify({"error": "User not found"}), 404)
 
-                return jsonify({
-                    "id": str(user.id),
-                    "role": user.role,
-                    "email": user.email,
-                    "name": user.name,
-                    "profilePictureUrl": user.profilePictureUrl,
-                    "registeredCourses": [str(course.id) for course in user.registeredCourses]
-                })
+                return jsonify(serialize_user_listing(user))
             
-            # Fetch all users
-            users = User.objects()
-            userList = [{
-                "id": str(user.id),
-                "role": user.role,
-                "email": user.email,
-                "name": user.name,
-                "profilePictureUrl": user.profilePictureUrl,
-                "registeredCourses": [str(course.id) for course in user.registeredCourses]
-            } for user in users]
-
-            return jsonify(userList)
+            # Build the filtered listing query
+            filters = {}
+            role = request.args.get('role')
+            if role:
+                filters['role'] = role
+
+            active = request.args.get('active')
+            if active is not None:
+                filters['active'] = active.lower() in ('true', '1', 'yes')
+
+            after = request.args.get('after')
+            if after:
+                if not ObjectId.is_valid(after):
+                    return make_response(jsonify({"error": "Invalid cursor"}), 400)
+                filters['id__gt'] = ObjectId(after)
+
+            # Raw documents with only the listed fields; registeredCourses stay ObjectIds
+            users = User.objects(**filters).only(*USER_LIST_FIELDS).order_by('id').as_pymongo()
+
+            # NDJSON export streams every matching user without building the list in memory
+            if request.args.get('format') == 'ndjson':
+                def generate():
+                    for user in users.batch_size(USER_EXPORT_BATCH_SIZE):
+                        yield dumps_bytes(serialize_user_listing(user)) + b"\n"
+
+                return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+
+            limit = parse_limit(request.args.get('limit'), USER_PAGE_DEFAULT_LIMIT, USER_PAGE_MAX_LIMIT)
+            if limit is None:
+                return make_response(jsonify({"error": "Invalid limit"}), 400)
+
+            # Fetch one extra document to know whether another page exists
+            page = list(users.limit(limit + 1))
+            userList = [serialize_user_listing(user) for user in page[:limit]]
+
+            response = make_response(jsonify(userList))
+            if len(page) > limit:
+                response.headers['X-Next-Cursor'] = userList[-1]["id"]
+            return response
 
         except Exception as e:
             return make_response(jsonify({"error": "Something went wrong", "message": str(e)}), 500)
@@ -149,7 +261,10 @@ class UsersAPI(Resource):
             if not user:
                 return make_response(jsonify({"error": "User not found"}), 404)
 
+            # Read the user's share of the statistics before the delete cascades it away
+            counterUpdates = user_removal_updates(user.id)
             user.delete()
+            write_counter_updates(counterUpdates, "user removal statistics")
             return make_response(jsonify({"message": "User deleted successfully"}), 200)
 
         except Exception as e:
@@ -162,21 +277,20 @@ class RegisteredCourses(Resource):
             if not email:
                 return make_response(jsonify({"error": "Email is required"}), 400)
 
-            user = User.objects(email=email).first()
+            user = User.objects(email=email).only('registeredCourses').as_pymongo().first()
             if not user:
                 return make_response(jsonify({"error": "User not found"}), 404)
 
-            registeredCourses = user.registeredCourses
+            registeredCourses = user.get("registeredCourses", [])
             if not registeredCourses:
                 return make_response(jsonify({"registeredCourses": []}), 200)
 
+            # Course names come from the shared metadata cache, fetched in one batch on a miss
+            metadata = get_course_metadata(registeredCourses)
             courseList = [
-                {
-                    "id": str(course.id),
-                    "name": course.name,
-                    "description": course.description
-                }
-                for course in registeredCourses
+                metadata[str(courseId)]
+                for courseId in registeredCourses
+                if str(courseId) in metadata
             ]
             return make_response(jsonify({"registeredCourses": courseList}), 200)
 
@@ -200,45 +314,215 @@ class RegisteredCourses(Resource):
             except Exception as e:
                 return make_response(jsonify({"error": "Invalid course ID", "details": str(e)}), 400)
 
-            courses = Course.objects(id__in=courseObjectIds)
-
-            if len(courses) != len(courseIds):
+            # Validate the ids with a count instead of loading the course documents
+            courseObjectIds = list(dict.fromkeys(courseObjectIds))
+            if Course.objects(id__in=courseObjectIds).count() != len(courseObjectIds):
                 return make_response(jsonify({"error": "Some course IDs are invalid"}), 400)
 
-            user = User.objects(email=email).first()
+            try:
+                User.email.validate(email)
+            except ValidationError:
+                return make_response(jsonify({"error": "Invalid email"}), 400)
+
+            # One atomic upsert adds the courses to a new or existing user; the
+            # pre-generated _id tells us afterwards whether the user was created
+            newUserId = ObjectId()
+            user = User._get_collection().find_one_and_update(
+                {"email": email},
+                {
+                    "$addToSet": {"registeredCourses": {"$each": courseObjectIds}},
+                    "$setOnInsert": {
+                        "_id": newUserId,
+                        "role": "student",
+                        "name": email.split("@")[0].capitalize(),
+                        "active": True,
+                        "lastLogin": get_ist_time()
+                    }
+                },
+                projection={"_id": 1},
+                upsert=True,
+                return_document=ReturnDocument.AFTER
+            )
+
+            # Course membership is recorded in Enrollment with one bulk upsert
+            record_enrollments(user["_id"], enroll(user["_id"], courseObjectIds))
 
-            if user:
-                existingCourses = set(str(c.id) for c in user.registeredCourses)
-                newCourses = [c for c in courses if str(c.id) not in existingCourses]
+            if user["_id"] != newUserId:
+                return make_response(jsonify({"message": "User updated with new courses", "user_id": str(user["_id"])}), 200)
 
-                if newCourses:
-                    user.registeredCourses.extend(newCourses)
-                    user.save()
+            record_events({"users": 1, "activeUsers": 1}, userId=user["_id"])
+            return make_response(jsonify({"message": "User registered successfully", "user_id": str(user["_id"])}), 201)
 
-                    for course in newCourses:
-                        if user not in course.registeredUsers:
-                            course.registeredUsers.append(user)
-                            course.save()
+        except Exception as e:
+            return make_response(jsonify({"error": "Something went wrong", "message": str(e)}), 500)
 
-                return make_response(jsonify({"message": "User updated with new courses", "user_id": str(user.id)}), 200)
+class CourseEnrollmentsAPI(Resource):
+    def get(self, courseId):
+        """Count and page through the users enrolled in a course"""
+        try:
+            if not ObjectId.is_valid(courseId):
+                return make_response(jsonify({'error': 'Invalid course ID format'}), 400)
 
-            else:
-                newUser = User(
-                    role="student",
-                    email=email,
-                    name=email.split("@")[0].capitalize(),
-                    registeredCourses=courses
-                )
-                newUser.save()
+            after = request.args.get('after')
+            if after and not ObjectId.is_valid(after):
+                return make_response(jsonify({'error': 'Invalid cursor'}), 400)
 
-                for course in courses:
-                    course.registeredUsers.append(newUser)
-                    course.save()
+            limit = parse_limit(request.args.get('limit'), USER_PAGE_DEFAULT_LIMIT, USER_PAGE_MAX_LIMIT)
+            if limit is None:
+                return make_response(jsonify({'error': 'Invalid limit'}), 400)
 
-                return make_response(jsonify({"message": "User registered successfully", "user_id": str(newUser.id)}), 201)
+            # Fetch one extra row to know whether another page exists
+            userIds = enrolled_user_ids(ObjectId(courseId), after=ObjectId(after) if after else None, limit=limit + 1)
+            hasMore = len(userIds) > limit
+            userIds = userIds[:limit]
+
+            return make_response(jsonify({
+                "courseId": courseId,
+                "count": count_enrolled(ObjectId(courseId)),
+                "users": [str(userId) for userId in userIds],
+                "nextCursor": str(userIds[-1]) if hasMore else None
+            }), 200)
 
         except Exception as e:
-            return make_response(jsonify({"error": "Something went wrong", "message": str(e)}), 500)
+            return make_response(jsonify({'error': 'Something went wrong', 'message': str(e)}), 500)
+
+# Identical concurrent course reads share one set of queries
+COURSE_FLIGHTS = SingleFlight("course")
+
+# Encoded course bodies, with their compressed encodings once requested
+COURSE_RESPONSE_CACHE = TTLCache(maxsize=256, ttl=int(os.getenv("COURSE_CACHE_TTL", "60")), name="course-response")
+
+def cached_body(cache, flights, key, build):
+    """
+    Returns the cached PrecompressedBody for `key`. On a miss, one caller
+    builds the data, encodes it and caches it while the others wait for it.
+    Returns None, uncached, when `build` finds nothing.
+    """
+    body = cache.get(key)
+    if body is not None:
+        return body
+
+    def build_body():
+        data = build()
+        if data is None:
+            return None
+        body = PrecompressedBody(dumps_bytes(data))
+        cache.set(key, body)
+        return body
+
+    return flights.do(key, build_body)
+
+# Raw projections for the course read path; documents are mapped straight to
+# response dicts without building mongoengine Documents
+COURSE_FIELDS = {"name": 1, "description": 1, "startDate": 1, "endDate": 1}
+MODULE_FIELDS = {
+    "week": 1, "title": 1, "type": 1, "url": 1, "language": 1, "description": 1, "codeTemplate": 1,
+    "hint": 1, "testCases": 1, "isGraded": 1, "questions": 1, "docType": 1, "docUrl": 1
+}
+
+def serialize_module(module):
+    # Course-tree entry for a raw module document; missing fields get the Module defaults
+    moduleData = {
+        "moduleId": str(module["_id"]),
+        "title": module.get("title"),
+        "type": module.get("type")
+    }
+    if moduleData["type"] == "video":
+        moduleData["url"] = module.get("url")
+    elif moduleData["type"] == "coding":
+        moduleData.update({
+            "language": module.get("language"),
+            "description": module.get("description"),
+            "codeTemplate": module.get("codeTemplate"),
+            "hint": module.get("hint") or "No hint available.",  # Added hint for coding modules
+            "testCases": [
+                {"inputData": tc.get("inputData"), "expectedOutput": tc.get("expectedOutput")}
+                for tc in module.get("testCases", [])
+            ]
+        })
+    elif moduleData["type"] == "assignment":
+        moduleData.update({
+            "questions": [
+                {
+                    "question": q.get("question"),
+                    "type": q.get("type"),
+                    "options": q.get("options", []),
+                    "correctAnswer": q.get("correctAnswer"),
+                    "hint": q.get("hint")  # Added hint field for assignment type
+                }
+                for q in module.get("questions", [])
+            ],
+            "graded": module.get("isGraded", False)
+        })
+    elif moduleData["type"] == "document":
+        moduleData.update({
+            "docType": module.get("docType"),
+            "docUrl": module.get("docUrl"),
+            "description": module.get("description")
+        })
+    return moduleData
+
+def build_course_detail(courseId):
+    """
+    Builds the full course tree (announcements, weeks and modules), or None if
+    the course does not exist, in four queries regardless of the number of weeks.
+    """
+    courseId = ObjectId(courseId)
+
+    # Fetch the specific course
+    course = Course._get_collection().find_one({"_id": courseId}, COURSE_FIELDS)
+    if not course:
+        return None
+
+    # Fetch announcements for the course
+    announcementList = [
+        {
+            "announcementId": str(ann["_id"]),
+            "message": ann.get("message"),
+            "date": ann.get("date")
+        }
+        for ann in Announcement._get_collection().find({"course": courseId}, {"message": 1, "date": 1})
+    ]
+
+    # Fetch weeks for the course, then all of their modules in one query
+    weeks = list(Week._get_collection().find({"course": courseId}, {"title": 1, "deadline": 1}).sort("_id", 1))
+    modulesByWeek = {week["_id"]: [] for week in weeks}
+    for module in Module._get_collection().find({"week": {"$in": list(modulesByWeek)}}, MODULE_FIELDS).sort("_id", 1):
+        modulesByWeek[module["week"]].append(serialize_module(module))
+
+    weekList = [
+        {
+            "weekId": str(week["_id"]),
+            "title": week.get("title"),
+            "deadline": week.get("deadline"),
+            "modules": modulesByWeek[week["_id"]]
+        }
+        for week in weeks
+    ]
+
+    # Construct the response
+    course_data = {
+        "courseId": str(course["_id"]),
+        "name": course.get("name"),
+        "description": course.get("description"),
+        "startDate": course.get("startDate"),
+        "endDate": course.get("endDate"),
+        "announcements": announcementList,
+        "weeks": weekList
+    }
+    return course_data
+
+def build_course_list():
+    """Builds the summary list of all courses."""
+    # Get all courses
+    course_list = [{
+        'id': str(course["_id"]),
+        'name': course.get("name"),
+        'description': course.get("description"),
+        'startDate': course.get("startDate"),
+        'endDate': course.get("endDate"),
+    } for course in Course._get_collection().find({}, COURSE_FIELDS)]
+    return course_list
 
 class CourseAPI(Resource):
     def get(self, courseId=None):
@@ -251,98 +535,16 @@ class CourseAPI(Resource):
                 if not ObjectId.is_valid(courseId):
                     return make_response(jsonify({'error': 'Invalid course ID format'}), 400)
 
-                # Fetch the specific course
-                course = Course.objects(id=courseId).first()
-                if not course:
+                body = cached_body(COURSE_RESPONSE_CACHE, COURSE_FLIGHTS, courseId, lambda: build_course_detail(courseId))
+                if body is None:
                     return make_response(jsonify({'error': 'Course not found'}), 404)
 
-                # Fetch announcements for the course
-                announcements = Announcement.objects(course=course)
-                announcementList = [
-                    {
-                        "announcementId": str(ann.id),
-                        "message": ann.message,
-                        "date": ann.date.strftime("%Y-%m-%dT%H:%M:%SZ")
-                    }
-                    for ann in announcements
-                ]
-
-                # Fetch weeks for the course
-                weeks = Week.objects(course=course)
-                weekList = []
-                for week in weeks:
-                    modules = Module.objects(week=week)
-                    moduleList = []
-                    for module in modules:
-                        moduleData = {
-                            "moduleId": str(module.id),
-                            "title": module.title,
-                            "type": module.type
-                        }
-                        if module.type == "video":
-                            moduleData["url"] = module.url
-                        elif module.type == "coding":
-                            moduleData.update({
-                                "language": module.language,
-                                "description": module.description,
-                                "codeTemplate": module.codeTemplate,
-                                "hint": module.hint or "No hint available.",  # Added hint for coding modules
-                                "testCases": [
-                                    {"inputData": tc.inputData, "expectedOutput": tc.expectedOutput} for tc in module.testCases
-                                ]
-                            })
-                        elif module.type == "assignment":
-                            moduleData.update({
-                                "questions": [
-                                    {
-                                        "question": q.question,
-                                        "type": q.type,
-                                        "options": q.options,
-                                        "correctAnswer": q.correctAnswer,
-                                        "hint": q.hint  # Added hint field for assignment type
-                                    } 
-                                    for q in module.questions
-                                ],
-                                "graded": module.isGraded
-                            })
-                        elif module.type == "document":
-                            moduleData.update({
-                                "docType": module.docType,
-                                "docUrl": module.docUrl,
-                                "description": module.description
-                            })
-                        moduleList.append(moduleData)
-
-                    weekList.append({
-                        "weekId": str(week.id),
-                        "title": week.title,
-                        "deadline": week.deadline.strftime("%Y-%m-%dT%H:%M:%SZ"),
-                        "modules": moduleList
-                    })
-
-                # Construct the response
-                course_data = {
-                    "courseId": str(course.id),
-                    "name": course.name,
-                    "description": course.description,
-                    "startDate": course.startDate.strftime("%Y-%m-%dT%H:%M:%SZ"),
-                    "endDate": course.endDate.strftime("%Y-%m-%dT%H:%M:%SZ"),
-                    "announcements": announcementList,
-                    "weeks": weekList
-                }
-                return make_response(jsonify(course_data), 200)
+                return cached_response(body, 200)
 
             else:
                 # Get all courses
-                courses = Course.objects()
-                course_list = [{
-                    'id': str(course.id),
-                    'name': course.name,
-                    'description': course.description,
-                    'startDate': course.startDate.strftime("%Y-%m-%dT%H:%M:%SZ"),
-                    'endDate': course.endDate.strftime("%Y-%m-%dT%H:%M:%SZ"),
-                } for course in courses]
-                return make_response(jsonify({"courses": course_list}), 200)
+                body = cached_body(COURSE_RESPONSE_CACHE, COURSE_FLIGHTS, None, lambda: {"courses": build_course_list()})
+                return cached_response(body, 200)
 
         except Exception as e:
             return make_response(jsonify({'error': 'Something went wrong', 'message': str(e)}), 500)
@@ -371,7 +573,9 @@ def fetch_and_save_transcripts(video_urls):
             # Extract video ID from the URL
             video_id = extract_video_id(video_url)
             
-            # Fetch transcript using YouTubeTranscriptApi
+            # Fetch transcript using YouTubeTranscriptApi (imported here: it is
+            # slow to import and only used when transcripts are fetched)
+            from youtube_transcript_api import YouTubeTranscriptApi
             transcript = YouTubeTranscriptApi.get_transcript(video_id)
             
             # Save the transcript in the database
@@ -381,6 +585,24 @@ def fetch_and_save_transcripts(video_urls):
         except Exception as e:
             print(f"Error fetching transcript for video URL {video_url}: {str(e)}")
 
+# Identical concurrent transcript reads share one query
+TRANSCRIPT_FLIGHTS = SingleFlight("transcript")
+
+# Encoded transcript bodies by video URL; a fetched transcript never changes
+TRANSCRIPT_RESPONSE_CACHE = TTLCache(maxsize=256, ttl=int(os.getenv("TRANSCRIPT_CACHE_TTL", "3600")),
+                                     name="transcript-response")
+
+def load_full_transcript(video_id):
+    """Returns the full transcript text of a video, or None if it has not been fetched."""
+    video_transcript = VideoTranscript._get_collection().find_one(
+        {"videoID": video_id}, {"transcript.text": 1, "_id": 0}
+    )
+    if not video_transcript:
+        return None
+
+    # Concatenate the full transcript from the chunked transcript
+    return " ".join([chunk.get("text", "") for chunk in video_transcript.get("transcript", [])])
+
 # Route to fetch transcript for a specific video URL
 class VideoTranscriptAPI(Resource):
     def get(self):
@@ -392,19 +614,22 @@ class VideoTranscriptAPI(Resource):
             # Extract video ID from the URL
             video_id = extract_video_id(video_url)
 
-            # Fetch the transcript from the database
-            video_transcript = VideoTranscript.objects(videoID=video_id).first()
-            if not video_transcript:
-                return make_response(jsonify({"error": "Transcript not found for the given video URL"}), 404)
+            def build():
+                full_transcript = load_full_transcript(video_id)
+                if full_transcript is None:
+                    return None
+                return {
+                    "videoURL": video_url,
+                    "videoID": video_id,
+                    "transcript": full_transcript  # Return only the full transcript
+                }
 
-            # Concatenate the full transcript from the chunked transcript
-            full_transcript = " ".join([chunk["text"] for chunk in video_transcript.transcript])
+            # Identical concurrent requests share one database read
+            body = cached_body(TRANSCRIPT_RESPONSE_CACHE, TRANSCRIPT_FLIGHTS, video_url, build)
+            if body is None:
+                return make_response(jsonify({"error": "Transcript not found for the given video URL"}), 404)
 
-            return make_response(jsonify({
-                "videoURL": video_url,
-                "videoID": video_transcript.videoID,
-                "transcript": full_transcript  # Return only the full transcript
-            }), 200)
+            return cached_response(body, 200)
         except ValueError as e:
             return make_response(jsonify({"error": "Invalid YouTube URL", "message": str(e)}), 400)
         except Exception as e:
@@ -413,64 +638,93 @@ class VideoTranscriptAPI(Resource):
 # Register the VideoTranscriptAPI route
 course_bp.add_url_rule('/video-transcript', view_func=VideoTranscriptAPI.as_view('video_transcript_api'))
 
+# Identical concurrent chatbot questions share one RAG call
+CHATBOT_FLIGHTS = SingleFlight("chatbot")
+
+def ask_rag(data):
+    """Sends a question to the RAG service and returns (body, status)."""
+    response = rag_ask(data)
+
+    # Check the status code and the response
+    if response.status_code == 200:
+        return response.json(), 200
+    else:
+        return response.text, response.status_code
+
+def prepare_chatbot_question(data):
+    """
+    Validates a chatbot request and records the question. Returns the payload
+    for the RAG service and None, or None and an error (body, status).
+    Shared by ChatbotInteractionAPI and the async view in api/asgi.py.
+    """
+    query = data.get("query")
+    history = data.get("history")
+    email = data.get("email")
+    moduleId = data.get("moduleId")
+    
+    user = User.objects(email=email).first()
+    if not user:
+        return None, ({"error": "User not found"}, 404)
+    
+    if not query or not history:
+        return None, ({"error": "Query and history are required"}, 400)
+
+    
+    # Retrieve the module based on moduleId
+    module = Module.objects(id=moduleId).first()
+    
+    # Look for existing ChatQuestions entry for the same user, date, course, and week
+    existing_question_entry = ChatQuestions.objects(
+        user=user,
+        date=get_ist_time().date(),
+        course=module.week.course,
+        week=module.week
+    ).first()
+
+    # If an entry exists, append the new question to the existing array of questions
+    if existing_question_entry:
+        existing_question_entry.update(push__questions=query, set__updatedAt=get_ist_time())
+    else:
+        # If no entry exists, create a new entry
+        new_question_entry = ChatQuestions(
+            user=user, 
+            week=module.week,
+            course=module.week.course,
+            date=get_ist_time().date(),
+            questions=[query],  # Initialize with the current question
+        )
+        new_question_entry.save()
+
+    record_event("chatQuestions", userId=user.id, courseId=module.week.course.id)
+
+    return {
+        'query' : query,
+        'history' : process_history(history),
+        'prompt_option' : get_module_type(moduleId)
+    }, None
+
+def chatbot_unavailable(e):
+    """Fast 503 returned while the RAG service is down or saturated."""
+    return {
+        "error": "The assistant is temporarily unavailable, please try again shortly",
+        "message": str(e),
+        "degraded": True
+    }, 503, {"Retry-After": str(e.retryAfter)}
+
 class ChatbotInteractionAPI(Resource):
     def post(self):
         try:
-            data = request.get_json()
-            query = data.get("query")
-            history = data.get("history")
-            email = data.get("email")
-            moduleId = data.get("moduleId")
-            
-            user = User.objects(email=email).first()
-            if not user:
-                return {"error": "User not found"}, 404
+            data, error = prepare_chatbot_question(request.get_json())
+            if error:
+                return error
             
-            if not query or not history:
-                return {"error": "Query and history are required"}, 400
+            # Students asking the same thing at the same moment share one RAG call
+            flightKey = json.dumps(data, sort_keys=True)
+            return CHATBOT_FLIGHTS.do(flightKey, lambda: ask_rag(data))
 
-            
-            # Retrieve the module based on moduleId
-            module = Module.objects(id=moduleId).first()
-            
-            # Look for existing ChatQuestions entry for the same user, date, course, and week
-            existing_question_entry = ChatQuestions.objects(
-                user=user,
-                date=get_ist_time().date(),
-                course=module.week.course,
-                week=module.week
-            ).first()
-
-            # If an entry exists, append the new question to the existing array of questions
-            if existing_question_entry:
-                existing_question_entry.update(push__questions=query)
-                # return {"message": "Question added to existing entry"}, 200
-            else:
-                # If no entry exists, create a new entry
-                new_question_entry = ChatQuestions(
-                    user=user, 
-                    week=module.week,
-                    course=module.week.course,
-                    date=get_ist_time().date(),
-                    questions=[query],  # Initialize with the current question
-                )
-                new_question_entry.save()
-                # return {"message": "New question entry created"}, 201
-
-            # Optionally, you could also handle the response from an external service
-            data = {
-                'query' : query,
-                'history' : process_history(history),
-                'prompt_option' : get_module_type(moduleId)
-            }
-            
-            response = requests.post(os.getenv("RAG_API") + "/ask", json=data)
-
-            # Check the status code and the response
-            if response.status_code == 200:
-                return response.json(), 200
-            else:
-                return response.text, response.status_code
+        except DependencyUnavailable as e:
+            # Fail fast while the RAG service is down or saturated
+            return chatbot_unavailable(e)
             
         except Exception as e:
             # Return error with details
@@ -489,48 +743,159 @@ class ChatbotInteractionAPI(Resource):
             }
         return None
 
+# Weekwise question pagination (questions per week) and top-N limit
+WEEKWISE_DEFAULT_LIMIT = 100
+WEEKWISE_MAX_LIMIT = 1000
+WEEKWISE_MAX_TOP = 50
+
+def weekwise_questions_pipeline(match):
+    """
+    Counts a course's chatbot questions per week in the database, returning
+    each week's id, title, deadline and question count; no question text.
+    """
+    return [
+        {"$match": match},
+        {"$group": {
+            "_id": "$week",
+            "questionCount": {"$sum": {"$size": {"$ifNull": ["$questions", []]}}}
+        }},
+        {"$lookup": {
+            "from": Week._get_collection_name(),
+            "localField": "_id",
+            "foreignField": "_id",
+            "as": "week"
+        }},
+        {"$project": {
+            "questionCount": 1,
+            "title": {"$arrayElemAt": ["$week.title", 0]},
+            "deadline": {"$arrayElemAt": ["$week.deadline", 0]}
+        }},
+        {"$sort": {"deadline": 1, "_id": 1}}
+    ]
+
+def weekwise_page_pipeline(match, weekIds, offset, limit):
+    """
+    One page of questions for each of `weekIds`, oldest first, in a single
+    $facet: each week's stream is skipped and limited before anything is
+    collected, so only the page's questions are ever held.
+    """
+    return [
+        {"$match": {**match, "week": {"$in": weekIds}}},
+        {"$facet": {
+            str(weekId): [
+                {"$match": {"week": weekId}},
+                {"$sort": {"date": 1, "_id": 1}},
+                {"$unwind": "$questions"},
+                {"$skip": offset},
+                {"$limit": limit},
+                {"$project": {"_id": 0, "question": "$questions"}}
+            ]
+            for weekId in weekIds
+        }}
+    ]
+
+def weekwise_top_questions_pipeline(match):
+    """Counts each distinct question, ignoring case, per week."""
+    return [
+        {"$match": match},
+        {"$unwind": "$questions"},
+        {"$group": {
+            "_id": {"week": "$week", "question": {"$toLower": "$questions"}},
+            "count": {"$sum": 1}
+        }}
+    ]
+
+def top_questions_by_week(rows, top):
+    """
+    Merges the rows of weekwise_top_questions_pipeline() that differ only in
+    surrounding whitespace and keeps each week's `top` most frequent questions.
+    """
+    counts = {}
+    for row in rows:
+        weekCounts = counts.setdefault(row["_id"]["week"], {})
+        question = row["_id"]["question"].strip()
+        weekCounts[question] = weekCounts.get(question, 0) + row["count"]
+
+    return {
+        weekId: [
+            {"question": question, "count": count}
+            for question, count in sorted(weekCounts.items(), key=lambda item: (-item[1], item[0]))[:top]
+        ]
+        for weekId, weekCounts in counts.items()
+    }
+
 class FetchWeekwiseQuestionsAPI(Resource):
     def get(self):
         try:
             # Get query parameter for the course
             courseId = request.args.get('courseId')
-            course = Course.objects(id=courseId).first()
             
             # Ensure the 'course' parameter is provided
-            if not course:
+            if not courseId or not ObjectId.is_valid(courseId):
                 return {"error": "Course is required"}, 400
-            
-            # Retrieve all ChatQuestions that match the given course
-            questions = ChatQuestions.objects(course=course)
-            
-            if not questions:
+
+            match = {"course": ObjectId(courseId)}
+
+            # Optionally restrict to a single week
+            weekId = request.args.get('weekId')
+            if weekId:
+                if not ObjectId.is_valid(weekId):
+                    return {"error": "Invalid week ID"}, 400
+                match["week"] = ObjectId(weekId)
+
+            # Pagination over each week's questions
+            limit = parse_limit(request.args.get('limit'), WEEKWISE_DEFAULT_LIMIT, WEEKWISE_MAX_LIMIT)
+            offset = request.args.get('offset', 0, type=int)
+            if limit is None or offset < 0:
+                return {"error": "Invalid limit or offset"}, 400
+
+            top = request.args.get('top', type=int)
+            if top is not None and not 1 <= top <= WEEKWISE_MAX_TOP:
+                return {"error": f"top must be between 1 and {WEEKWISE_MAX_TOP}"}, 400
+
+            # Count questions by week in the database
+            weeks = list(ChatQuestions._get_collection().aggregate(weekwise_questions_pipeline(match)))
+
+            if not weeks:
                 return {"message": "No questions found for the given course"}, 404
-            
-            # Group questions by week
-            weekwise_questions = {}
-            
-            for question_entry in questions:
-                week = question_entry.week
-                if week not in weekwise_questions:
-                    weekwise_questions[week] = []
-                
-                # Append the questions for each week
-                weekwise_questions[week].extend(question_entry.questions)
-            
-            # Prepare the result to return, sorted by week
+
+            # Then read just this page of each week that has one
+            pageWeeks = [week["_id"] for week in weeks if week["questionCount"] > offset]
+            pages = {}
+            if pageWeeks:
+                pages = next(ChatQuestions._get_collection().aggregate(
+                    weekwise_page_pipeline(match, pageWeeks, offset, limit), allowDiskUse=True
+                ))
+
+            topQuestions = {}
+            if top:
+                topQuestions = top_questions_by_week(ChatQuestions._get_collection().aggregate(
+                    weekwise_top_questions_pipeline(match), allowDiskUse=True
+                ), top)
+
+            # Prepare the result to return, sorted by week deadline
             result = []
-            for week, questions_list in sorted(weekwise_questions.items()):
-                result.append({
-                    'week': week,
-                    'questions': questions_list
-                })
+            for week in weeks:
+                weekData = {
+                    'weekId': str(week["_id"]),
+                    'title': week.get("title"),
+                    'questionCount': week["questionCount"],
+                    'questions': [row["question"] for row in pages.get(str(week["_id"]), [])],
+                    'hasMore': week["questionCount"] > offset + limit
+                }
+                if top:
+                    weekData['topQuestions'] = topQuestions.get(week["_id"], [])
+                result.append(weekData)
             
-            return {"weekwise_questions": result}, 200
+            return {"weekwise_questions": result, "offset": offset, "limit": limit}, 200
 
         except Exception as e:
             # Return error if something went wrong
             return {"error": "Something went wrong", "message": str(e)}, 500
 
+# Longest daily history the statistics endpoints return
+MAX_STATISTICS_DAYS = 90
+
 class UserStatisticsAPI(Resource):
     def get(self, userId):
         try:
@@ -541,22 +906,36 @@ class UserStatisticsAPI(Resource):
             if not ObjectId.is_valid(userId):
                 return jsonify({"error": "Invalid user ID"}), 400
 
-            user = User.objects(id=userId).first()
+            user = User.objects(id=userId).only(*USER_LIST_FIELDS, 'averageScore').as_pymongo().first()
             if not user:
                 return jsonify({"error": "User not found"}), 404
 
+            # Counts come from the user's counter document, maintained at event time
+            # once rebuild_counters() has seeded the counters; until then, from the user's lists
+            counts = get_counters(USER_SCOPE, userId)
+            if counts is None:
+                counts = count_user_lists(user["_id"])
+
             userData = {
-                "id": str(user.id),
-                "role": user.role,
-                "email": user.email,
-                "name": user.name,
-                "registeredCourses": [str(course.id) for course in user.registeredCourses],
+                "id": str(user["_id"]),
+                "role": user.get("role"),
+                "email": user.get("email"),
+                "name": user.get("name"),
+                "registeredCourses": [str(courseId) for courseId in user.get("registeredCourses", [])],
                 "statistics": {
-                    "questionsAttempted": len(getattr(user, 'questionsAttempted', [])),
-                    "modulesCompleted": len(getattr(user, 'modulesCompleted', [])),
-                    "averageScore": getattr(user, 'averageScore', None)
+                    "questionsAttempted": counts.get("questionsAttempted", 0),
+                    "modulesCompleted": counts.get("modulesCompleted", 0),
+                    "averageScore": user.get("averageScore"),
+                    "logins": counts.get("logins", 0),
+                    "submissions": counts.get("submissions", 0),
+                    "chatQuestions": counts.get("chatQuestions", 0)
                 }
             }
+
+            days = request.args.get('days', type=int)
+            if days:
+                userData["daily"] = get_daily_stats(USER_SCOPE, userId, min(days, MAX_STATISTICS_DAYS))
+
             return jsonify(userData)
 
         except Exception as e:
@@ -601,12 +980,32 @@ class RunCodeAPI(Resource):
 class AdminStatisticsAPI(Resource):
     def get(self):
         try:
-            statisticsData = {
-                "totalUsers": User.objects.count(),
-                "totalModules": Module.objects.count(),
-                "activeUsers": User.objects(active=True).count(),
-                "questionsAttempted": sum(len(user.questionsAttempted) for user in User.objects)  # Sum the lengths of the lists
-            }
+            # Optional breakdowns, e.g. ?breakdown=role,course
+            breakdowns = [b for b in request.args.get('breakdown', '').split(',') if b]
+            if any(b not in ADMIN_BREAKDOWNS for b in breakdowns):
+                return {"error": f"breakdown must be one of: {', '.join(ADMIN_BREAKDOWNS)}"}, 400
+
+            # Totals come from the global counter document unless breakdowns or
+            # exact recomputation are requested, or counters do not exist yet
+            counts = None
+            if not breakdowns and request.args.get('exact') != 'true':
+                counts = get_counters(GLOBAL_SCOPE, GLOBAL_KEY)
+
+            if counts is None:
+                # All user statistics come from one server-side $facet aggregation
+                statisticsData = compute_admin_statistics(breakdowns, courseMetadata=get_course_metadata)
+            else:
+                statisticsData = {
+                    "totalUsers": counts.get("users", 0),
+                    "totalModules": Module._get_collection().estimated_document_count(),
+                    "activeUsers": counts.get("activeUsers", 0),
+                    "questionsAttempted": counts.get("questionsAttempted", 0)
+                }
+
+            days = request.args.get('days', type=int)
+            if days:
+                statisticsData["daily"] = get_daily_stats(GLOBAL_SCOPE, GLOBAL_KEY, min(days, MAX_STATISTICS_DAYS))
+
             return statisticsData
 
         except Exception as e:
@@ -621,6 +1020,9 @@ def submit_code():
     - moduleId: ID of the module (coding problem)
     - code: The submitted code as a string
     """
+    # Only code submissions run subprocesses; keep it off the cold-start path
+    import subprocess
+
     try:
         # Parse the request data
         data = request.get_json()
@@ -637,7 +1039,7 @@ def submit_code():
             return jsonify({"error": "User not found"}), 404
 
         # Fetch the module (coding problem) from the database
-        module = Module.objects(id=module_id).first()
+        module = Module.objects(id=module_id).no_dereference().first()
         if not module or module.type != "coding":
             return jsonify({"error": "Invalid module or module is not a coding problem"}), 404
 
@@ -670,12 +1072,16 @@ def submit_code():
 
             try:
                 # Execute the user's code with the input data
-                process = subprocess.run(
-                    [sys.executable, "-c", submitted_code],
-                    input=input_data,
-                    text=True,
-                    capture_output=True
-                )
+                with judge_run("submit"):
+                    process = subprocess.run(
+                        [sys.executable, "-c", submitted_code],
+                        input=input_data,
+                        text=True,
+                        capture_output=True,
+                        # Output is returned to the student; keep the server's secrets out of reach
+                        env=sandbox_env(),
+                        cwd=tempfile.gettempdir()
+                    )
 
                 # Get the output from the executed code
                 actual_output = process.stdout.strip()
@@ -709,10 +1115,15 @@ def submit_code():
         # )
         # code_submission.save()
 
-        # Update the user's attempted questions or modules if needed
-        if module not in user.modulesCompleted:
-            user.modulesCompleted.append(module)
-            user.save()
+        # Update the user's completed modules atomically, without loading the list
+        completed = User._get_collection().update_one(
+            {"_id": user.id},
+            {"$addToSet": {"modulesCompleted": module.id}}
+        ).modified_count
+
+        # The week reference is still a DBRef here, so this reads one small document
+        courseId = Week._get_collection().find_one({"_id": module.week.id}, {"course": 1})["course"]
+        record_events({"submissions": 1, "modulesCompleted": completed}, userId=user.id, courseId=courseId)
 
         # Return the results to the user
         return jsonify({
@@ -726,37 +1137,86 @@ def submit_code():
     except Exception as e:
         return jsonify({"error": f"An error occurred: {str(e)}"}), 500
 
-@course_bp.route('/debug/code', methods=['POST'])
-def debug_code2():
+# Debug diagnoses keyed by (moduleId, fingerprint of the normalized code)
+DEBUG_CACHE = TTLCache(maxsize=1024, ttl=int(os.getenv("DEBUG_CACHE_TTL", "3600")), name="debug")
+DEBUG_FLIGHTS = SingleFlight("debug")
+
+def normalize_code(code):
     """
-    API endpoint to debug code submissions.
-    Expects JSON payload with:
-    - email: Email of the user submitting the code
-    - moduleId: ID of the module (coding problem)
-    - code: The submitted code as a string
+    Normalizes Python source so edits that cannot change a diagnosis (comments,
+    blank lines, trailing whitespace, indentation width) map to the same text.
     """
     try:
-        # Parse the request data
-        data = request.get_json()
-        email = data.get('email')
-        module_id = data.get('moduleId')
-        submitted_code = data.get('code')
+        parts = []
+        for token in tokenize.generate_tokens(io.StringIO(code).readline):
+            if token.type in (tokenize.COMMENT, tokenize.NL, tokenize.ENDMARKER):
+                continue
+            if token.type in (tokenize.INDENT, tokenize.DEDENT, tokenize.NEWLINE):
+                parts.append(tokenize.tok_name[token.type])
+            else:
+                parts.append(token.string)
+        return " ".join(parts)
+    except (tokenize.TokenError, SyntaxError):
+        # Code that does not tokenize is only normalized line by line
+        return "\n".join(line.rstrip() for line in code.splitlines() if line.strip())
 
-        if not email or not module_id or not submitted_code:
-            return jsonify({"error": "Missing required fields (email, moduleId, code)"}), 400
+def code_fingerprint(code):
+    return hashlib.sha256(normalize_code(code).encode("utf-8")).hexdigest()
 
-        # Fetch the user from the database using email
-        user = User.objects(email=email).first()
-        if not user:
-            return jsonify({"error": "User not found"}), 404
+def prepare_debug_request(data):
+    """
+    Validates a /debug/code request and runs the local tiers that need no
+    upstream call. Returns a finished (status, body) and None, or None and the
+    (cacheKey, code, module) still to be diagnosed by diagnose_code().
+    Shared by debug_code2 and the async view in api/asgi.py.
+    """
+    email = data.get('email')
+    module_id = data.get('moduleId')
+    submitted_code = data.get('code')
+
+    if not email or not module_id or not submitted_code:
+        return (400, {"error": "Missing required fields (email, moduleId, code)"}), None
+
+    # Fetch the user from the database using email
+    if not User.objects(email=email).count():
+        return (404, {"error": "User not found"}), None
+
+    # Fetch the module (coding problem) from the database, with only its first test case
+    module = Module.objects(id=module_id).only(
+        'type', 'description', 'codeTemplate', 'testCases'
+    ).fields(slice__testCases=1).first()
+    if not module or module.type != "coding":
+        return (404, {"error": "Invalid module or module is not a coding problem"}), None
+
+    # Syntax errors, missing template functions and undefined names are
+    # diagnosed locally in milliseconds
+    diagnosis = static_diagnosis(submitted_code, module.codeTemplate)
+    if diagnosis:
+        return (200, as_completion(diagnosis, "static")), None
+
+    # Unchanged code gets the previous diagnosis
+    cacheKey = (module_id, code_fingerprint(submitted_code))
+    result = DEBUG_CACHE.get(cacheKey)
+    if result is not None:
+        return result, None
+
+    return None, (cacheKey, submitted_code, module)
+
+def test_run_diagnosis(cacheKey, submitted_code, module):
+    """Runs the code on the module's first test case; returns a cached (status, body) or None."""
+    if not module.testCases:
+        return None
 
-        # Fetch the module (coding problem) from the database
-        module = Module.objects(id=module_id).first()
-        if not module or module.type != "coding":
-            return jsonify({"error": "Invalid module or module is not a coding problem"}), 404
-        
+    diagnosis = quick_run_diagnosis(submitted_code, module.testCases[0].inputData)
+    if not diagnosis:
+        return None
 
-        debug_prompt = f"""
+    result = (200, as_completion(diagnosis, "test-run"))
+    DEBUG_CACHE.set(cacheKey, result)
+    return result
+
+def debug_prompt(submitted_code, module):
+    return f"""
 You are 'Alfred', an expert Python programmer and debugging assistant.
 Analyze the provided Python code and identify any errors or issues.
 Respond with a concise explanation in **two lines only**.
@@ -765,148 +1225,225 @@ Respond with a concise explanation in **two lines only**.
 
 **Question:** {module.description}
 """
-        
-        response = requests.post("https://api.groq.com/openai/v1/chat/completions", json={
-            "model": "llama-3.3-70b-versatile",
-            "messages": [{
-                "role": "user",
-                "content": debug_prompt
-            }]
-        },
-        headers={
-            "Content-Type": "application/json",
-            "Authorization": f"Bearer {os.getenv('GROQ_API_KEY')}"
-        })
 
-        # Check if the RAG API responded successfully
-        if response.status_code == 200:
-            return jsonify(response.json()), 200
-        else:
-            # If the RAG API response was not successful, return the error response from RAG API
-            return jsonify({"error": "Failed to debug code", "message": response.text}), response.status_code
+def llm_diagnosis(cacheKey, response):
+    """Turns the LLM's response (requests or httpx) into (status, body), caching successes."""
+    # Check if the LLM responded successfully
+    if response.status_code == 200:
+        result = (200, response.json())
+        DEBUG_CACHE.set(cacheKey, result)
+        return result
+
+    # If the LLM response was not successful, pass its error response on
+    return response.status_code, {"error": "Failed to debug code", "message": response.text}
+
+def diagnose_code(cacheKey, submitted_code, module):
+    """
+    Diagnoses code that passed the static checks and returns (status, body):
+    first by running it on the module's first test case, then, only if that
+    finds nothing, by asking the LLM. Successful diagnoses are cached under `cacheKey`.
+    """
+    result = test_run_diagnosis(cacheKey, submitted_code, module)
+    if result:
+        return result
+
+    return llm_diagnosis(cacheKey, groq_chat(debug_prompt(submitted_code, module)))
+
+def debug_unavailable(e):
+    """Fast 503 returned when the local tiers found nothing and the LLM is down or saturated."""
+    return {
+        "error": "Failed to debug code",
+        "message": "The debugging assistant is temporarily unavailable, please try again shortly",
+        "degraded": True
+    }, 503, {"Retry-After": str(e.retryAfter)}
+
+@course_bp.route('/debug/code', methods=['POST'])
+def debug_code2():
+    """
+    API endpoint to debug code submissions.
+    Expects JSON payload with:
+    - email: Email of the user submitting the code
+    - moduleId: ID of the module (coding problem)
+    - code: The submitted code as a string
+    """
+    try:
+        # Parse the request data
+        result, pending = prepare_debug_request(request.get_json())
+
+        # Identical concurrent requests share a single test run and upstream call
+        if pending:
+            cacheKey = pending[0]
+            result = DEBUG_FLIGHTS.do(cacheKey, lambda: diagnose_code(*pending))
+
+        status, body = result
+        return jsonify(body), status
+
+    except DependencyUnavailable as e:
+        body, status, headers = debug_unavailable(e)
+        return jsonify(body), status, headers
 
     except Exception as e:
         return jsonify({"error": f"An error occurred: {str(e)}"}), 500
     
 
+# Dashboard question pagination, counted in ChatQuestions entries (one user, course, week and day each)
+QUESTIONS_PAGE_DEFAULT_LIMIT = 100
+QUESTIONS_PAGE_MAX_LIMIT = 500
+
+def coursewise_questions_pipeline(match, limit):
+    """
+    Builds the aggregation behind /dashboard/user/questions: newest entries
+    first, flattened, grouped by course with the course names joined in once,
+    plus the cursor for the next page.
+    """
+    return [
+        {"$match": match},
+        {"$sort": {"date": -1, "_id": -1}},
+        # One extra entry tells whether another page exists
+        {"$limit": limit + 1},
+        {"$facet": {
+            "courses": [
+                {"$limit": limit},
+                {"$unwind": "$questions"},
+                {"$group": {
+                    "_id": "$course",
+                    "latest": {"$max": "$date"},
+                    "questions": {"$push": {
+                        "question": "$questions",
+                        "date": {"$dateToString": {"format": "%Y-%m-%d", "date": "$date"}}
+                    }}
+                }},
+                {"$sort": {"latest": -1}},
+                {"$lookup": {
+                    "from": Course._get_collection_name(),
+                    "localField": "_id",
+                    "foreignField": "_id",
+                    "as": "course"
+                }},
+                {"$project": {
+                    "course_name": {"$arrayElemAt": ["$course.name", 0]},
+                    "questions": 1
+                }}
+            ],
+            # The page's last entry and, if there is one, the extra entry
+            "page": [
+                {"$skip": limit - 1},
+                {"$project": {"_id": 1}}
+            ]
+        }}
+    ]
+
 @course_bp.route('/dashboard/user/questions', methods=['GET'])
 def get_coursewise_questions():
     try:
         # Get user email from request
-        user_email = request.args.get('email') or request.json.get('email')
+        user_email = request.args.get('email') or (request.get_json(silent=True) or {}).get('email')
         
         if not user_email:
             return jsonify({'error': 'Email is required'}), 400
+
+        limit = parse_limit(request.args.get('limit'), QUESTIONS_PAGE_DEFAULT_LIMIT, QUESTIONS_PAGE_MAX_LIMIT)
+        if limit is None:
+            return jsonify({'error': 'Invalid limit'}), 400
         
-        # Get the user object
-        user = User.objects.get(email=user_email)
-        
-        # Query all ChatQuestions for this user, sorted by date descending
-        chat_questions = ChatQuestions.objects(user=user).order_by('-date')
-        
-        # Dictionary to group by course
-        courses = {}
-        
-        for cq in chat_questions:
-            course_id = str(cq.course.id)
-            
-            if course_id not in courses:
-                courses[course_id] = {
-                    'course_name': cq.course.name,
-                    'questions': []
-                }
-            
-            # Add all questions with their dates
-            for question in cq.questions:
-                courses[course_id]['questions'].append({
-                    'question': question,
-                    'date': cq.date.isoformat()
-                })
-        
-        # Sort questions within each course by date descending
-        for course in courses.values():
-            course['questions'].sort(key=lambda x: x['date'], reverse=True)
+        # Get the user id
+        user = User._get_collection().find_one({"email": user_email}, {"_id": 1})
+        if not user:
+            return jsonify({'error': 'User not found'}), 404
+        match = {"user": user["_id"]}
+
+        # `before` is the last entry id of the previous page
+        before = request.args.get('before')
+        if before:
+            if not ObjectId.is_valid(before):
+                return jsonify({'error': 'Invalid cursor'}), 400
+            cursor = ChatQuestions._get_collection().find_one({"_id": ObjectId(before), "user": user["_id"]}, {"date": 1})
+            if not cursor:
+                return jsonify({'error': 'Invalid cursor'}), 400
+            match["$or"] = [
+                {"date": {"$lt": cursor["date"]}},
+                {"date": cursor["date"], "_id": {"$lt": cursor["_id"]}}
+            ]
+
+        # Flattening, grouping, sorting and course names all happen in the database
+        result = next(ChatQuestions._get_collection().aggregate(coursewise_questions_pipeline(match, limit)))
+
+        courses = {
+            str(course["_id"]): {
+                'course_name': course.get("course_name"),
+                'questions': course["questions"]
+            }
+            for course in result["courses"]
+        }
+        page = result["page"]
         
         return jsonify({
             'success': True,
-            'data': courses
+            'data': courses,
+            'nextBefore': str(page[0]["_id"]) if len(page) > 1 else None
         })
         
-    except DoesNotExist:
-        return jsonify({'error': 'User not found'}), 404
     except Exception as e:
         return jsonify({'error': str(e)}), 500
     
 
+def prepare_top_questions(data):
+    """
+    Validates a /top-questions request. Returns the course id and window and
+    None, or None and an error (body, status).
+    Shared by get_top_questions and the async view in api/asgi.py.
+    """
+    email = data.get('email')
+    courseId = data.get('courseId')
+    window = data.get('window', 'all')
+
+    if not email or not courseId:
+        return None, ({"error": "Missing required fields (email, courseId)"}, 400)
+
+    if not WINDOW_RE.match(window):
+        return None, ({"error": "Invalid window"}, 400)
+
+    # Fetch the user from the database using email
+    user = User.objects(email=email).only('role').first()
+    if not user or user.role != "instructor":
+        return None, ({"error": "User not found"}, 404)
+
+    # Fetch the course from the database
+    if not ObjectId.is_valid(courseId) or not Course.objects(id=courseId).count():
+        return None, ({"error": "Invalid courseId"}, 404)
+
+    return (ObjectId(courseId), window), None
+
+def top_questions_body(courseId, window):
+    # Cached snapshot; refreshed in the background once enough new questions arrive
+    snapshot, stale = get_topic_snapshot(courseId, window)
+
+    return {
+        "allQuestions": snapshot["recentQuestions"],
+        "topQuestions": [topic["topic"] for topic in snapshot["topics"]],
+        "topics": snapshot["topics"],
+        "window": window,
+        "computedAt": snapshot["computedAt"],
+        "stale": stale
+    }
+
 @course_bp.route('/top-questions', methods=['POST'])
 def get_top_questions():
     """
-    API endpoint to debug code submissions.
+    API endpoint returning the most frequent topics of a course's chatbot questions.
     Expects JSON payload with:
-    - email: Email of the user submitting the code
-    - moduleId: ID of the module (coding problem)
-    - code: The submitted code as a string
+    - email: Email of the instructor
+    - courseId: ID of the course
+    - window (optional): "all" (default), "<n>d" for the last n days, or "week:<weekId>"
     """
     try:
         # Parse the request data
-        data = request.get_json()
-        email = data.get('email')
-        courseId = data.get('courseId')
+        params, error = prepare_top_questions(request.get_json())
+        if error:
+            body, status = error
+            return jsonify(body), status
 
-        if not email or not courseId:
-            return jsonify({"error": "Missing required fields (email, courseId)"}), 400
-
-        # Fetch the user from the database using email
-        user = User.objects(email=email).first()
-        if not user or user.role != "instructor":
-            return jsonify({"error": "User not found"}), 404
-
-        # Fetch the module (coding problem) from the database
-        course = Course.objects(id=courseId).first()
-        if not course:
-            return jsonify({"error": "Invalid courseId"}), 404
-        
-        questions = ChatQuestions.objects(course=course).all()
-        all_questions = []
-        for question in questions:
-            all_questions.extend(question.questions)
-        
-        
-        prompt = f"""
-Analyze these programming questions and return the top 5 most frequent topics. Respond with ONLY a Python list literal containing exactly 5 unquoted items separated by commas, formatted exactly like this example:
-Python functions, Lists, Error handling, OOP, File handling
-STRICT REQUIREMENTS: "
-1. No quotation marks of any kind
-2. No backslashes or escape characters
-3. No counts or numbering
-4. No additional text or commentary
-5. Exactly 5 comma-separated
-6. Each topic must be 2-4 words in lowercase/uppercase
-If you include any quotes, backslashes, or other formatting, the response is wrong.\n\n
-QUESTIONS: {"\n - ".join(all_questions)}
-"""
-        
-        response = requests.post("https://api.groq.com/openai/v1/chat/completions", json={
-            "model": "llama-3.3-70b-versatile",
-            "messages": [{
-                "role": "user",
-                "content": prompt
-            }]
-        },
-        headers={
-            "Content-Type": "application/json",
-            "Authorization": f"Bearer {os.getenv('GROQ_API_KEY')}"
-        })
-
-        # Check if the RAG API responded successfully
-        if response.status_code == 200:
-            return jsonify({
-                "allQuestions" : all_questions,
-                "topQuestions" : response.json()["choices"][0]["message"]["content"].split(", ")
-                }), 200
-        else:
-            # If the RAG API response was not successful, return the error response from RAG API
-            return jsonify({"error": "Failed to get hot topics", "message": response.text}), response.status_code
+        return jsonify(top_questions_body(*params)), 200
 
     except Exception as e:
-        return jsonify({"error": f"An error occurred: {str(e)}"}), 500
\ No newline at end of file
+        return jsonify({"error": f"An error occurred: {str(e)}"}), 500
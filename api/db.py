@@ -0,0 +1,98 @@
+"""
+MongoDB connection setup.
+
+Nothing here blocks at import time. init_db() only registers the connection
+settings, then creates the client and pings the cluster in a background
+thread, so on a cold start the DNS/SRV lookup and the TCP and TLS handshakes
+overlap with importing and wiring up the rest of the app. The client is
+created once per process and reused by every request.
+
+Under gunicorn with preload_app (gunicorn.conf.py) the app is imported in the
+master with MONGO_CONNECT_ON_IMPORT=0, so no client exists before the fork;
+each worker calls init_db() from the post_fork hook with its own pool size.
+"""
+import os
+import threading
+from mongoengine import disconnect, get_connection, register_connection
+from api.metrics import MongoPoolMetricsListener
+from api.query_monitor import QueryMonitorListener
+from api.timing import MongoTimingListener
+
+ALIAS = "default"
+DB_NAME = "backend"
+
+# Set once the client exists (connected or not), so requests never race its creation
+_clientReady = threading.Event()
+
+
+def connection_settings(**overrides):
+    """
+    MongoClient options. The pool sizes bound the connections each process
+    opens; MONGO_MAX_POOL_SIZE and MONGO_MIN_POOL_SIZE take precedence over
+    the values passed in (pymongo's defaults are 100 and 0).
+    """
+    settings = {
+        "host": os.getenv("MONGO_URI"),
+        # Fail a request within seconds when the cluster is unreachable instead
+        # of pymongo's 30 second default
+        "serverSelectionTimeoutMS": int(os.getenv("MONGO_SERVER_SELECTION_TIMEOUT_MS", "5000")),
+        "connectTimeoutMS": int(os.getenv("MONGO_CONNECT_TIMEOUT_MS", "5000")),
+        # Close pooled connections idle this long, so quiet workers shrink back to minPoolSize
+        "maxIdleTimeMS": int(os.getenv("MONGO_MAX_IDLE_TIME_MS", "300000")),
+        # Command durations for the Server-Timing header (api/timing.py),
+        # per-request query counts and shapes (api/query_monitor.py) and pool
+        # usage for /metrics (api/metrics.py)
+        "event_listeners": [MongoTimingListener(), QueryMonitorListener(), MongoPoolMetricsListener()]
+    }
+    settings.update(overrides)
+
+    for key, env in (("maxPoolSize", "MONGO_MAX_POOL_SIZE"), ("minPoolSize", "MONGO_MIN_POOL_SIZE")):
+        if os.getenv(env):
+            settings[key] = int(os.getenv(env))
+    return settings
+
+
+def _warm_up():
+    try:
+        client = get_connection(ALIAS)
+    except Exception as e:
+        print(f"DB Connection Failed: {e}")
+        return
+    finally:
+        _clientReady.set()
+
+    try:
+        client.admin.command("ping")
+        print("DB Connected")
+    except Exception as e:
+        print(f"DB Connection Failed: {e}")
+
+
+def init_db(warm=True, **overrides):
+    """
+    Registers the connection settings. With `warm`, the client is created and
+    connected in the background; otherwise on the first query.
+    `overrides` are extra MongoClient options such as maxPoolSize.
+    """
+    disconnect(ALIAS)
+    _clientReady.clear()
+    register_connection(ALIAS, db=DB_NAME, **connection_settings(**overrides))
+
+    if warm:
+        threading.Thread(target=_warm_up, name="mongo-warm-up", daemon=True).start()
+    else:
+        _clientReady.set()
+
+
+def wait_for_db(timeout=10):
+    """Blocks until the warm-up thread has created the client; a no-op afterwards."""
+    _clientReady.wait(timeout)
+
+
+def db_status():
+    """Pings the cluster; True if it answered."""
+    try:
+        get_connection(ALIAS).admin.command("ping")
+        return True
+    except Exception:
+        return False
@@ -0,0 +1,96 @@
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
+from api.models import User, Course, Enrollment, get_ist_time
+
+DUPLICATE_KEY_ERROR = 11000
+
+
+# Rows written per bulk write by backfill_enrollments()
+BACKFILL_BATCH = 1000
+
+
+def _upsert_enrollments(pairs):
+    """
+    Upserts (userId, courseId) pairs in one unordered bulk write.
+    Returns the indexes, in `pairs`, of the rows that did not exist yet.
+    """
+    operations = [
+        UpdateOne(
+            {"user": userId, "course": courseId},
+            {"$setOnInsert": {"enrolledAt": get_ist_time()}},
+            upsert=True
+        )
+        for userId, courseId in pairs
+    ]
+
+    try:
+        upserted = Enrollment._get_collection().bulk_write(operations, ordered=False).upserted_ids
+    except BulkWriteError as e:
+        # A concurrent enrollment inserted the same row first; that row is not new to us
+        if any(error["code"] != DUPLICATE_KEY_ERROR for error in e.details["writeErrors"]):
+            raise
+        upserted = {item["index"]: item["_id"] for item in e.details["upserted"]}
+
+    return sorted(upserted)
+
+
+def enroll(userId, courseIds):
+    """
+    Enrolls a user in the given courses with one unordered bulk upsert.
+    Returns the ids of the courses the user was not already enrolled in.
+    """
+    courseIds = list(dict.fromkeys(courseIds))
+    if not courseIds:
+        return []
+
+    return [courseIds[index] for index in _upsert_enrollments([(userId, courseId) for courseId in courseIds])]
+
+
+def enrolled_user_ids(courseId, after=None, limit=100):
+    """Returns a page of user ids enrolled in a course, ordered by user id."""
+    query = {"course": courseId}
+    if after:
+        query["user"] = {"$gt": after}
+
+    cursor = Enrollment._get_collection().find(
+        query,
+        {"user": 1, "_id": 0}
+    ).sort("user", 1).limit(limit)
+    return [row["user"] for row in cursor]
+
+
+def count_enrolled(courseId):
+    """Counts the users enrolled in a course using the (course, user) index."""
+    return Enrollment._get_collection().count_documents({"course": courseId})
+
+
+def _legacy_enrollments():
+    # (userId, courseId) pairs from both legacy arrays
+    for user in User.objects.only('registeredCourses').as_pymongo():
+        for courseId in user.get("registeredCourses", []):
+            yield user["_id"], courseId
+
+    for course in Course.objects.only('registeredUsers').as_pymongo():
+        for userId in course.get("registeredUsers", []):
+            yield userId, course["_id"]
+
+
+def backfill_enrollments():
+    """
+    Creates Enrollment rows from the legacy User.registeredCourses and
+    Course.registeredUsers arrays, BACKFILL_BATCH rows per bulk write.
+    Safe to run more than once. Returns the number of rows created.
+    """
+    created = 0
+    batch = {}
+
+    for pair in _legacy_enrollments():
+        # Most pairs appear in both arrays; a dict keeps one of each per batch
+        batch[pair] = None
+        if len(batch) >= BACKFILL_BATCH:
+            created += len(_upsert_enrollments(list(batch)))
+            batch = {}
+
+    if batch:
+        created += len(_upsert_enrollments(list(batch)))
+    return created
@@ -0,0 +1,145 @@
+"""
+Prometheus metrics, served at /metrics.
+
+- http_requests_total, http_request_duration_seconds: per route, method and status
+- upstream_requests_total, upstream_request_duration_seconds: RAG and Groq
+  calls by outcome (ok, failed, or rejected by the circuit breaker or bulkhead)
+- judge_runs_in_progress, judge_run_duration_seconds: code runs of submissions
+  and debug prechecks, in flight and per run
+- cache_requests_total: hits and misses of each named TTLCache
+- mongo_pool_connections, mongo_pool_checked_out,
+  mongo_pool_checkout_failures_total: the MongoDB connection pool
+
+Under gunicorn, PROMETHEUS_MULTIPROC_DIR (set by gunicorn.conf.py) makes every
+worker write its samples to files in that directory, and /metrics adds up all
+workers whichever one serves the scrape. prometheus_client reads the variable
+when it is imported, so it has to be set before the app is imported.
+"""
+import os
+import time
+from prometheus_client import (CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Gauge, Histogram,
+                               generate_latest, multiprocess)
+from pymongo import monitoring
+
+UPSTREAM_BUCKETS = (0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60)
+JUDGE_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+HTTP_REQUESTS = Counter("http_requests_total", "Requests served", ["route", "method", "status"])
+HTTP_LATENCY = Histogram("http_request_duration_seconds", "Time to serve a request", ["route", "method"])
+
+UPSTREAM_REQUESTS = Counter("upstream_requests_total", "Calls to upstream services", ["dependency", "outcome"])
+UPSTREAM_LATENCY = Histogram("upstream_request_duration_seconds", "Time of calls that reached the upstream service",
+                             ["dependency"], buckets=UPSTREAM_BUCKETS)
+
+JUDGE_IN_PROGRESS = Gauge("judge_runs_in_progress", "Submitted code being run", ["kind"],
+                          multiprocess_mode="livesum")
+JUDGE_LATENCY = Histogram("judge_run_duration_seconds", "Time to run submitted code on one input", ["kind"],
+                          buckets=JUDGE_BUCKETS)
+
+CACHE_REQUESTS = Counter("cache_requests_total", "Cache lookups", ["cache", "result"])
+
+MONGO_CONNECTIONS = Gauge("mongo_pool_connections", "Open MongoDB connections", multiprocess_mode="livesum")
+MONGO_CHECKED_OUT = Gauge("mongo_pool_checked_out", "MongoDB connections in use", multiprocess_mode="livesum")
+MONGO_CHECKOUT_FAILURES = Counter("mongo_pool_checkout_failures_total", "Failed MongoDB connection checkouts",
+                                  ["reason"])
+
+
+def observe_request(route, method, status, seconds):
+    HTTP_REQUESTS.labels(route, method, str(status)).inc()
+    HTTP_LATENCY.labels(route, method).observe(seconds)
+
+
+def observe_upstream(dependency, outcome, seconds=None):
+    UPSTREAM_REQUESTS.labels(dependency, outcome).inc()
+    if seconds is not None:
+        UPSTREAM_LATENCY.labels(dependency).observe(seconds)
+
+
+def judge_run(kind):
+    """Context manager counting and timing one run of submitted code."""
+    return _JudgeRun(JUDGE_IN_PROGRESS.labels(kind), JUDGE_LATENCY.labels(kind))
+
+
+class _JudgeRun:
+    def __init__(self, inProgress, latency):
+        self.inProgress = inProgress
+        self.latency = latency
+
+    def __enter__(self):
+        self.inProgress.inc()
+        self.started = time.perf_counter()
+
+    def __exit__(self, *exc):
+        self.latency.observe(time.perf_counter() - self.started)
+        self.inProgress.dec()
+
+
+def cache_counters(name):
+    """(hits, misses) counters for the TTLCache called `name`."""
+    return CACHE_REQUESTS.labels(name, "hit"), CACHE_REQUESTS.labels(name, "miss")
+
+
+class MongoPoolMetricsListener(monitoring.ConnectionPoolListener):
+    """Tracks the pool's open and checked out connections; pass it to the MongoClient."""
+
+    def pool_created(self, event):
+        pass
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        pass
+
+    def pool_closed(self, event):
+        pass
+
+    def connection_created(self, event):
+        MONGO_CONNECTIONS.inc()
+
+    def connection_ready(self, event):
+        pass
+
+    def connection_closed(self, event):
+        MONGO_CONNECTIONS.dec()
+
+    def connection_check_out_started(self, event):
+        pass
+
+    def connection_check_out_failed(self, event):
+        MONGO_CHECKOUT_FAILURES.labels(str(event.reason)).inc()
+
+    def connection_checked_out(self, event):
+        MONGO_CHECKED_OUT.inc()
+
+    def connection_checked_in(self, event):
+        MONGO_CHECKED_OUT.dec()
+
+
+def render_metrics():
+    """The exposition body and its content type, for every worker when running multi-process."""
+    if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return generate_latest(registry), CONTENT_TYPE_LATEST
+
+
+def init_metrics(app):
+    """Counts and times every request of `app` by route."""
+    from flask import g, request
+
+    @app.before_request
+    def start_request_metrics():
+        g.metricsStarted = time.perf_counter()
+
+    @app.after_request
+    def record_request_metrics(response):
+        started = g.pop("metricsStarted", None)
+        if started is None:
+            return response
+
+        route = request.url_rule.rule if request.url_rule else "<unmatched>"
+        observe_request(route, request.method, response.status_code, time.perf_counter() - started)
+        return response
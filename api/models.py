@@ -19,6 +19,14 @@ class User(Document):
     active = fields.BooleanField(default=True)  # Add the 'active' field
     lastLogin = fields.DateTimeField(default=get_ist_time(), required=True)
 
+    meta = {
+        # The paginated user listing filters on role or active and pages by _id
+        'indexes': [
+            ['role', 'id'],
+            ['active', 'id'],
+        ],
+    }
+
 # -----------------------------
 # Course Model
 # -----------------------------
@@ -27,7 +35,24 @@ class Course(Document):
     description = fields.StringField(required=True, max_length=500)
     startDate = fields.DateTimeField(required=True)
     endDate = fields.DateTimeField(required=True)
-    registeredUsers = fields.ListField(fields.ReferenceField(User))  # Many-to-Many
+    registeredUsers = fields.ListField(fields.ReferenceField(User))  # Legacy; enrollment now lives in Enrollment
+
+
+# -----------------------------
+# Enrollment Model
+# -----------------------------
+class Enrollment(Document):
+    user = fields.ReferenceField(User, required=True, reverse_delete_rule=CASCADE)
+    course = fields.ReferenceField(Course, required=True, reverse_delete_rule=CASCADE)
+    enrolledAt = fields.DateTimeField(default=get_ist_time)
+
+    meta = {
+        'collection': 'enrollments',
+        'indexes': [
+            {'fields': ['user', 'course'], 'unique': True},  # One row per user and course
+            ['course', 'user'],  # Course rosters and counts
+        ],
+    }
 
 
 # -----------------------------
@@ -108,6 +133,49 @@ class ChatQuestions(Document):
     week = fields.ReferenceField(Week, required=True, reverse_delete_rule=CASCADE)
     date = fields.DateField(default=get_ist_time().date())
     questions = fields.ListField(fields.StringField())
+    updatedAt = fields.DateTimeField(default=get_ist_time)  # Set on every new question
+    clustered = fields.IntField(default=0)  # Questions already folded into the course's topic model
+
+    meta = {
+        'indexes': [
+            ['user', '-date', '-id'],  # A user's questions, newest first
+            ['course', 'week'],  # Course-wide and weekwise question views
+            ['course', 'updatedAt'],  # Questions added since the last topic refresh
+        ],
+    }
+
+
+class CourseTopics(Document):
+    # Incremental topic model of a course's chatbot questions (see api/topics.py)
+    course = fields.ReferenceField(Course, required=True, unique=True, reverse_delete_rule=CASCADE)
+    docCount = fields.IntField(default=0)
+    docFreq = fields.DictField()
+    clusters = fields.ListField(fields.DictField())
+    questionCount = fields.IntField(default=0)
+    highWaterMark = fields.DateTimeField()  # Latest ChatQuestions.updatedAt folded in
+    updatedAt = fields.DateTimeField()
+    version = fields.IntField(default=0)
+
+    meta = {
+        'collection': 'course_topics',
+    }
+
+
+class TopicSnapshot(Document):
+    # Cached /top-questions result for one course and time window
+    course = fields.ReferenceField(Course, required=True, reverse_delete_rule=CASCADE)
+    window = fields.StringField(required=True, max_length=40)  # "all", "7d", "week:<weekId>"
+    topics = fields.ListField(fields.DictField())
+    recentQuestions = fields.ListField(fields.StringField())
+    highWaterMark = fields.DateTimeField()  # Latest ChatQuestions.updatedAt included
+    computedAt = fields.DateTimeField()
+
+    meta = {
+        'collection': 'topic_snapshots',
+        'indexes': [
+            {'fields': ['course', 'window'], 'unique': True},
+        ],
+    }
 
 
 class VideoTranscript(Document):
@@ -118,4 +186,41 @@ class VideoTranscript(Document):
     meta = {
         'collection': 'video_transcripts',  # Explicit collection name in MongoDB
         'indexes': ['videoID'],  # Index for faster lookups by videoID
-    }
\ No newline at end of file
+    }
+
+
+# -----------------------------
+# Statistics Models
+# -----------------------------
+class StatsCounter(Document):
+    # Running totals for one user, one course, or the whole platform ("global"/"all")
+    scope = fields.StringField(required=True, choices=["user", "course", "global"])
+    key = fields.StringField(required=True, max_length=50)
+    counts = fields.DictField()
+    updatedAt = fields.DateTimeField()
+    seededAt = fields.DateTimeField()  # Last rebuild_counters() run that wrote this counter
+    rolledUpAt = fields.DateTimeField()  # Global counter only: start of the last rollup_daily_stats() run
+
+    meta = {
+        'collection': 'stats_counters',
+        'indexes': [
+            {'fields': ['scope', 'key'], 'unique': True},
+            'updatedAt',  # Rollups read the counters changed since the previous run
+        ],
+    }
+
+
+class DailyStats(Document):
+    # Daily rollup of a StatsCounter: the totals at rollup time and the change since the previous day
+    scope = fields.StringField(required=True, choices=["user", "course", "global"])
+    key = fields.StringField(required=True, max_length=50)
+    day = fields.DateTimeField(required=True)
+    counts = fields.DictField()
+    deltas = fields.DictField()
+
+    meta = {
+        'collection': 'daily_stats',
+        'indexes': [
+            {'fields': ['scope', 'key', '-day'], 'unique': True},  # Also a counter's latest bucket before a day
+        ],
+    }
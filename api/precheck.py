@@ -0,0 +1,234 @@
+"""
+Local diagnosis tiers for /debug/code.
+
+Each tier returns a two-line diagnosis in the same register as the LLM's, or
+None when it finds nothing and the next tier should be consulted:
+1. static_diagnosis: syntax errors, functions from the code template that are
+   missing, and names that are used but never defined.
+2. quick_run_diagnosis: runs the code once against the module's first test case
+   in a short-lived, resource-limited interpreter, without the server's
+   environment, and explains a crash or hang.
+"""
+import ast
+import builtins
+import difflib
+import os
+import re
+import signal
+import sys
+import tempfile
+from api.metrics import judge_run
+
+QUICK_RUN_TIMEOUT = 2  # seconds
+QUICK_RUN_MEMORY = 256 * 1024 * 1024  # bytes of address space
+QUICK_RUN_OUTPUT = 64 * 1024  # bytes per file written, stdout and stderr included
+
+# Names that exist without being bound: builtins, module attributes, and the
+# implicit __class__ of methods and __module__/__qualname__ of class bodies
+BUILTIN_NAMES = frozenset(dir(builtins)) | {
+    "__name__", "__file__", "__doc__", "__builtins__", "__spec__", "__loader__", "__package__",
+    "__annotations__", "__class__", "__module__", "__qualname__"
+}
+
+# Runs the student's code from a file under CPU, memory, process and file size
+# limits; the limits are set here rather than in preexec_fn, which is unsafe in
+# threaded workers. No new processes or threads may be started, and a write
+# past the file size limit fails with "File too large"
+LIMITED_RUNNER = """
+import sys
+try:
+    import resource
+except ImportError:
+    resource = None
+cpu, memory, output, path = int(sys.argv[1]), int(sys.argv[2]), int(sys.argv[3]), sys.argv[4]
+with open(path) as f:
+    code = compile(f.read(), "<string>", "exec")
+if resource is not None:
+    resource.setrlimit(resource.RLIMIT_CPU, (cpu, cpu))
+    resource.setrlimit(resource.RLIMIT_AS, (memory, memory))
+    resource.setrlimit(resource.RLIMIT_NPROC, (0, 0))
+    resource.setrlimit(resource.RLIMIT_FSIZE, (output, output))
+sys.argv = ["-c"]
+del sys, resource, cpu, memory, output, path, f
+exec(code, {"__name__": "__main__", "__builtins__": __builtins__})
+"""
+
+# Second line of a runtime-error diagnosis, by exception type
+RUNTIME_HINTS = {
+    "NameError": "A variable or function is used before it is defined; check the spelling.",
+    "TypeError": "A value of the wrong type is used here; check conversions such as int(input()).",
+    "ValueError": "A conversion received an unexpected value; check how the input is parsed.",
+    "IndexError": "An index is past the end of a list or string; check loop bounds and off-by-one errors.",
+    "KeyError": "A dictionary key is missing; check it exists or use dict.get().",
+    "ZeroDivisionError": "A division by zero happens here; guard the divisor for the zero case.",
+    "AttributeError": "The object does not have this attribute or method; check its type and spelling.",
+    "RecursionError": "The recursion never stops; check the base case.",
+    "EOFError": "The code reads more input than the test provides; check the number of input() calls.",
+    "UnboundLocalError": "A local variable is read before it is assigned in this function.",
+}
+
+TRACEBACK_LINE_RE = re.compile(r'File "<string>", line (\d+)')
+
+
+def _bound_names(tree):
+    # Every name the code binds anywhere; scopes are deliberately flattened so
+    # that only names defined nowhere are reported
+    names = set()
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Name) and isinstance(node.ctx, (ast.Store, ast.Del)):
+            names.add(node.id)
+        elif isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+            names.add(node.name)
+        elif isinstance(node, ast.arg):
+            names.add(node.arg)
+        elif isinstance(node, (ast.Import, ast.ImportFrom)):
+            for alias in node.names:
+                names.add((alias.asname or alias.name).split(".")[0])
+        elif isinstance(node, ast.ExceptHandler) and node.name:
+            names.add(node.name)
+        elif isinstance(node, (ast.Global, ast.Nonlocal)):
+            names.update(node.names)
+        elif isinstance(node, (ast.MatchAs, ast.MatchStar)) and node.name:
+            names.add(node.name)
+        elif isinstance(node, ast.MatchMapping) and node.rest:
+            names.add(node.rest)
+    return names
+
+
+def _module_names(tree):
+    # Names bound at module level: defs, classes, assignments (so `solve = lambda ...`
+    # counts) and imports, including those under top-level if/for/try/with blocks
+    names = set()
+    pending = list(tree.body)
+    while pending:
+        node = pending.pop()
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+            names.add(node.name)
+        elif isinstance(node, (ast.Import, ast.ImportFrom)):
+            for alias in node.names:
+                names.add((alias.asname or alias.name).split(".")[0])
+        elif isinstance(node, ast.Name) and isinstance(node.ctx, ast.Store):
+            names.add(node.id)
+        elif not isinstance(node, ast.Lambda):
+            pending.extend(ast.iter_child_nodes(node))
+    return names
+
+
+def _template_functions(codeTemplate):
+    try:
+        tree = ast.parse(codeTemplate or "")
+    except SyntaxError:
+        return []
+    return [node.name for node in tree.body if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef))]
+
+
+def static_diagnosis(code, codeTemplate=None):
+    """Checks the code without running it."""
+    try:
+        tree = ast.parse(code)
+    except SyntaxError as e:
+        line = (e.text or "").strip()
+        return (f"Line {e.lineno}: SyntaxError: {e.msg}.\n"
+                + (f"Check this line for a missing colon, bracket or quote: {line}" if line
+                   else "Check for a missing colon, bracket or quote near this line."))
+
+    defined = _module_names(tree)
+    for name in _template_functions(codeTemplate):
+        if name not in defined:
+            return (f"The function `{name}` from the code template is not defined.\n"
+                    f"Keep `def {name}(...)` with the name and parameters given in the template.")
+
+    # A star import binds names that cannot be known without importing the module
+    if any(isinstance(node, ast.ImportFrom) and any(alias.name == "*" for alias in node.names)
+           for node in ast.walk(tree)):
+        return None
+
+    bound = _bound_names(tree) | BUILTIN_NAMES
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Name) and isinstance(node.ctx, ast.Load) and node.id not in bound:
+            suggestion = difflib.get_close_matches(node.id, bound, n=1)
+            return (f"Line {node.lineno}: NameError: `{node.id}` is used but never defined.\n"
+                    + (f"Did you mean `{suggestion[0]}`?" if suggestion
+                       else f"Define or import `{node.id}` before using it, or check its spelling."))
+
+    return None
+
+
+def sandbox_env():
+    """Environment for running submitted code: none of the server's secrets, only PATH."""
+    return {"PATH": os.environ.get("PATH", os.defpath)}
+
+
+def quick_run_diagnosis(code, inputData=""):
+    """Runs the code once on a test case's input and explains a crash or timeout."""
+    import subprocess
+
+    # A scratch working directory, removed with whatever the code writes there.
+    # Output goes to files in it rather than pipes, so RLIMIT_FSIZE bounds what
+    # is kept no matter how much the code prints
+    with tempfile.TemporaryDirectory(prefix="precheck-") as workDir:
+        path = os.path.join(workDir, "main.py")
+        with open(path, "w") as f:
+            f.write(code)
+        with open(os.path.join(workDir, "input.txt"), "w") as f:
+            f.write(inputData)
+
+        with open(os.path.join(workDir, "input.txt")) as stdin, \
+                open(os.path.join(workDir, "stdout.txt"), "w+b") as stdout, \
+                open(os.path.join(workDir, "stderr.txt"), "w+b") as stderr:
+            with judge_run("precheck"):
+                # Its own session, so a timeout kills everything it started
+                process = subprocess.Popen(
+                    [sys.executable, "-I", "-c", LIMITED_RUNNER,
+                     str(QUICK_RUN_TIMEOUT), str(QUICK_RUN_MEMORY), str(QUICK_RUN_OUTPUT), path],
+                    stdin=stdin,
+                    stdout=stdout,
+                    stderr=stderr,
+                    env=sandbox_env(),
+                    cwd=workDir,
+                    start_new_session=True
+                )
+                try:
+                    returncode = process.wait(timeout=QUICK_RUN_TIMEOUT)
+                except subprocess.TimeoutExpired:
+                    _kill_session(process)
+                    return (f"The code did not finish within {QUICK_RUN_TIMEOUT} seconds on the first test case.\n"
+                            "Check for an infinite loop or a condition that never becomes false.")
+
+            printed = stdout.seek(0, os.SEEK_END)
+            stderr.seek(0)
+            errors = stderr.read(QUICK_RUN_OUTPUT).decode(errors="replace")
+
+    if printed >= QUICK_RUN_OUTPUT:
+        return (f"The code printed more than {QUICK_RUN_OUTPUT // 1024} KB on the first test case.\n"
+                "Check for a print inside a loop that runs more often than intended.")
+
+    if returncode == 0 or "Traceback" not in errors:
+        return None
+
+    error = errors.strip().splitlines()[-1]
+    errorType = error.split(":", 1)[0].strip()
+    lines = TRACEBACK_LINE_RE.findall(errors)
+    location = f"Line {lines[-1]}: " if lines else ""
+    return (f"{location}{error} when run on the first test case.\n"
+            + RUNTIME_HINTS.get(errorType, "Fix this runtime error before checking the output."))
+
+
+def _kill_session(process):
+    try:
+        os.killpg(process.pid, signal.SIGKILL)
+    except ProcessLookupError:
+        pass
+    process.wait()
+
+
+def as_completion(diagnosis, source):
+    """Wraps a local diagnosis in the chat-completion shape /debug/code returns."""
+    return {
+        "choices": [{
+            "index": 0,
+            "message": {"role": "assistant", "content": diagnosis},
+            "finish_reason": "stop"
+        }],
+        "source": source
+    }
@@ -0,0 +1,257 @@
+"""
+On-demand profiling of live workers, for admins.
+
+Only active when PROFILER_TOKEN is set; otherwise init_profiler() registers
+nothing, so requests pay nothing for it. With it set:
+
+- A request sent with `X-Profile: <token>` is profiled and answered with the
+  profile instead of its normal body (the original status is kept in
+  X-Profiled-Status). `X-Profile-Format` picks the output:
+    text       cProfile, the top functions by cumulative time (default)
+    pstats     cProfile, marshalled stats for `python -m pstats` or snakeviz
+    collapsed  stacks sampled every PROFILER_SAMPLE_MS from the request's
+               thread, one "frame;frame;... count" line per stack, for
+               flamegraph.pl or speedscope
+- /admin/profiler/memory/* (same header) drive tracemalloc in the worker that
+  serves them: start tracing, snapshot (with the growth since the previous
+  snapshot) and stop. Each worker traces its own memory; the pid is returned.
+
+admin_only() guards other internal endpoints (/metrics and the status
+routes) with the same token.
+
+    curl -H "X-Profile: $PROFILER_TOKEN" -H "X-Profile-Format: collapsed" \\
+        https://host/course/<courseId> > course.folded
+"""
+import cProfile
+import functools
+import hmac
+import io
+import marshal
+import os
+import pstats
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from flask import Blueprint, current_app, g, jsonify, request
+
+SAMPLE_SECONDS = float(os.getenv("PROFILER_SAMPLE_MS", "5")) / 1000
+TRACEMALLOC_FRAMES = int(os.getenv("PROFILER_TRACEMALLOC_FRAMES", "10"))
+TOP_LINES = 40
+
+profiler_bp = Blueprint("profiler", __name__, url_prefix="/admin/profiler")
+
+# One profiled request at a time per worker: profilers are process-wide
+_profileLock = threading.Lock()
+
+# Last tracemalloc snapshot of this worker, the baseline for the next diff
+_lastSnapshot = None
+_snapshotLock = threading.Lock()
+
+
+def _authorized():
+    token = current_app.config.get("PROFILER_TOKEN")
+    if not token:
+        return False
+    # Scrapers such as Prometheus send credentials as a bearer token
+    authorization = request.headers.get("Authorization", "")
+    presented = authorization[7:] if authorization.startswith("Bearer ") else request.headers.get("X-Profile", "")
+    return hmac.compare_digest(presented, token)
+
+
+def admin_only(view):
+    """
+    Restricts a view to requests carrying the profiler token as
+    `Authorization: Bearer <token>` (X-Profile works too, but profiles the
+    request). With STATUS_ENDPOINTS_PUBLIC set in the app's config the view
+    is served to anyone, e.g. behind a private network.
+    """
+    @functools.wraps(view)
+    def guarded(*args, **kwargs):
+        if not current_app.config.get("STATUS_ENDPOINTS_PUBLIC") and not _authorized():
+            return jsonify({"error": "Forbidden"}), 403
+        return view(*args, **kwargs)
+    return guarded
+
+
+@profiler_bp.before_request
+def require_token():
+    if not _authorized():
+        return jsonify({"error": "Forbidden"}), 403
+
+
+def _positive_int_arg(name, default):
+    # `default` when the parameter is absent, None when it is not a positive integer
+    if name not in request.args:
+        return default
+    value = request.args.get(name, type=int)
+    return value if value is not None and value > 0 else None
+
+
+class StackSampler:
+    """Samples one thread's Python stack on a timer and counts identical stacks."""
+
+    def __init__(self, threadId, interval=SAMPLE_SECONDS):
+        self.threadId = threadId
+        self.interval = interval
+        self.stacks = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="profiler-sampler", daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.threadId)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})")
+                frame = frame.f_back
+            if stack:
+                self.stacks[";".join(reversed(stack))] += 1
+
+    def collapsed(self):
+        return "".join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+
+def start_profile():
+    if not _profileLock.acquire(blocking=False):
+        return jsonify({"error": "Another request is being profiled in this worker"}), 409
+
+    outputFormat = request.headers.get("X-Profile-Format", "text")
+    if outputFormat == "collapsed":
+        profiler = StackSampler(threading.get_ident())
+        profiler.start()
+    else:
+        profiler = cProfile.Profile()
+        profiler.enable()
+    g.profile = (outputFormat, profiler, time.perf_counter())
+
+
+def stop_profile():
+    outputFormat, profiler, started = g.pop("profile")
+    try:
+        if outputFormat == "collapsed":
+            profiler.stop()
+        else:
+            profiler.disable()
+    finally:
+        _profileLock.release()
+    return outputFormat, profiler, time.perf_counter() - started
+
+
+def finish_profile(response):
+    outputFormat, profiler, elapsed = stop_profile()
+
+    if outputFormat == "collapsed":
+        body, mimetype = profiler.collapsed(), "text/plain"
+    else:
+        stats = pstats.Stats(profiler)
+        if outputFormat == "pstats":
+            body, mimetype = marshal.dumps(stats.stats), "application/octet-stream"
+        else:
+            out = io.StringIO()
+            stats.stream = out
+            stats.sort_stats("cumulative").print_stats(TOP_LINES)
+            body, mimetype = out.getvalue(), "text/plain"
+
+    profiled = current_app.response_class(body, status=200, mimetype=mimetype)
+    profiled.headers["X-Profiled-Status"] = str(response.status_code)
+    profiled.headers["X-Profiled-Ms"] = f"{elapsed * 1000:.1f}"
+    profiled.headers["Cache-Control"] = "no-store"
+    return profiled
+
+
+@profiler_bp.route('/memory/start', methods=['POST'])
+def memory_start():
+    global _lastSnapshot
+    frames = _positive_int_arg("frames", TRACEMALLOC_FRAMES)
+    if frames is None:
+        return jsonify({"error": "frames must be a positive integer"}), 400
+    with _snapshotLock:
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(frames)
+        _lastSnapshot = None
+    return jsonify({"pid": os.getpid(), "tracing": True, "frames": tracemalloc.get_traceback_limit()}), 200
+
+
+@profiler_bp.route('/memory/snapshot', methods=['GET'])
+def memory_snapshot():
+    """Top allocation sites, and the growth since the previous snapshot of this worker."""
+    global _lastSnapshot
+    if not tracemalloc.is_tracing():
+        return jsonify({"error": "tracemalloc is not running; POST /admin/profiler/memory/start first"}), 409
+
+    limit = _positive_int_arg("limit", TOP_LINES)
+    if limit is None:
+        return jsonify({"error": "limit must be a positive integer"}), 400
+    groupBy = request.args.get("groupBy", "lineno")
+    snapshot = tracemalloc.take_snapshot().filter_traces((
+        tracemalloc.Filter(False, tracemalloc.__file__),
+        tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+    ))
+
+    with _snapshotLock:
+        previous, _lastSnapshot = _lastSnapshot, snapshot
+
+    current, peak = tracemalloc.get_traced_memory()
+    body = {
+        "pid": os.getpid(),
+        "tracedBytes": current,
+        "peakBytes": peak,
+        "top": [{"site": str(stat.traceback), "bytes": stat.size, "count": stat.count}
+                for stat in snapshot.statistics(groupBy)[:limit]]
+    }
+    if previous is not None:
+        body["growth"] = [
+            {"site": str(stat.traceback), "bytes": stat.size_diff, "count": stat.count_diff}
+            for stat in snapshot.compare_to(previous, groupBy)[:limit] if stat.size_diff
+        ]
+    return jsonify(body), 200
+
+
+@profiler_bp.route('/memory/stop', methods=['POST'])
+def memory_stop():
+    global _lastSnapshot
+    with _snapshotLock:
+        tracemalloc.stop()
+        _lastSnapshot = None
+    return jsonify({"pid": os.getpid(), "tracing": False}), 200
+
+
+def init_profiler(app, token=None):
+    """
+    Enables request profiling and the memory endpoints when a token is
+    configured (PROFILER_TOKEN). Register it after the other request hooks so
+    its after_request hook runs first and profiles end with the handler.
+    """
+    token = token or os.getenv("PROFILER_TOKEN")
+    if not token:
+        return
+    app.config["PROFILER_TOKEN"] = token
+
+    @app.before_request
+    def maybe_start_profile():
+        if "X-Profile" in request.headers and request.blueprint != "profiler" and _authorized():
+            return start_profile()
+
+    @app.after_request
+    def maybe_finish_profile(response):
+        if "profile" in g:
+            return finish_profile(response)
+        return response
+
+    @app.teardown_request
+    def release_profile(error=None):
+        # after_request hooks are skipped when the response itself fails
+        if "profile" in g:
+            stop_profile()
+
+    app.register_blueprint(profiler_bp)
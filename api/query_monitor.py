@@ -0,0 +1,214 @@
+"""
+MongoDB command monitoring.
+
+QueryMonitorListener sees every command the client sends. Commands issued
+while a QueryMonitor is active (one per Flask request, see
+init_query_monitor(), or one opened by assert_queries()) are recorded with
+their shape: the collection, the command and the filter with every value
+replaced by "?", so find({"week": a}) and find({"week": b}) share a shape.
+
+At the end of a request the monitor:
+- adds the request's query count and time to per-route totals (route_stats(),
+  served at /query_status);
+- logs the request when one shape was issued more than QUERY_REPEAT_THRESHOLD
+  times, the signature of an N+1 pattern such as lazily dereferencing a
+  ReferenceField inside a loop.
+
+Commands slower than MONGO_SLOW_COMMAND_MS are logged with their shape
+whether or not they ran inside a request.
+"""
+import json
+import os
+import threading
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from pymongo import monitoring
+from api.timing import stdout_logger
+
+SLOW_COMMAND_SECONDS = float(os.getenv("MONGO_SLOW_COMMAND_MS", "100")) / 1000
+REPEAT_THRESHOLD = int(os.getenv("QUERY_REPEAT_THRESHOLD", "10"))
+
+# Driver and auth housekeeping, not queries made by the app
+IGNORED_COMMANDS = {"ping", "hello", "isMaster", "ismaster", "endSessions", "buildInfo",
+                    "saslStart", "saslContinue", "authenticate", "getnonce", "killCursors"}
+
+logger = stdout_logger("api.queries")
+
+_current = ContextVar("queryMonitor", default=None)
+
+# Shapes of commands started but not yet finished, by driver request id
+_pending = {}
+
+# Per-route totals for route_stats()
+_routes = {}
+_routesLock = threading.Lock()
+
+
+def _shape(value):
+    if isinstance(value, dict):
+        return "{" + ", ".join(f"{key}: {_shape(item)}" for key, item in value.items()) + "}"
+    if isinstance(value, (list, tuple)):
+        # $and/$or hold sub-filters; any other list ($in, values) is one placeholder
+        if value and all(isinstance(item, dict) for item in value):
+            return "[" + ", ".join(dict.fromkeys(_shape(item) for item in value)) + "]"
+        return "[?]"
+    return "?"
+
+
+def command_shape(commandName, command):
+    """A command with its values stripped, e.g. 'module.find {week: {$in: [?]}}'."""
+    if commandName == "getMore":
+        return f"{command.get('collection')}.getMore"
+
+    collection = command.get(commandName)
+    if commandName == "find":
+        detail = _shape(command.get("filter", {}))
+    elif commandName in ("count", "distinct", "findAndModify"):
+        detail = _shape(command.get("query", {}))
+    elif commandName == "aggregate":
+        detail = "[" + ", ".join(
+            f"{stage}: {_shape(body)}" if stage == "$match" else stage
+            for step in command.get("pipeline", []) for stage, body in step.items()
+        ) + "]"
+    elif commandName == "update":
+        detail = _shape(command.get("updates", [{}])[0].get("q", {}))
+    elif commandName == "delete":
+        detail = _shape(command.get("deletes", [{}])[0].get("q", {}))
+    else:
+        detail = ""
+    return f"{collection}.{commandName} {detail}".rstrip()
+
+
+class QueryMonitor:
+    """The commands issued while it is active, as (shape, seconds) pairs."""
+
+    def __init__(self, parent=None):
+        self.parent = parent
+        self.commands = []
+
+    def record(self, shape, seconds):
+        monitor = self
+        # Nested monitors (a test around a test-client request) all see the command
+        while monitor is not None:
+            monitor.commands.append((shape, seconds))
+            monitor = monitor.parent
+
+    @property
+    def count(self):
+        return len(self.commands)
+
+    @property
+    def seconds(self):
+        return sum(seconds for _, seconds in self.commands)
+
+    def repeated(self):
+        """Shapes issued more than once, most frequent first."""
+        return [(shape, count) for shape, count in Counter(shape for shape, _ in self.commands).most_common()
+                if count > 1]
+
+
+class QueryMonitorListener(monitoring.CommandListener):
+    """Feeds the active QueryMonitor and logs slow commands; pass it to the MongoClient."""
+
+    def started(self, event):
+        if event.command_name in IGNORED_COMMANDS:
+            return
+        _pending[event.request_id] = command_shape(event.command_name, event.command)
+
+    def succeeded(self, event):
+        self._finished(event)
+
+    def failed(self, event):
+        self._finished(event)
+
+    def _finished(self, event):
+        shape = _pending.pop(event.request_id, None)
+        if shape is None:
+            return
+
+        seconds = event.duration_micros / 1e6
+        monitor = _current.get()
+        if monitor is not None:
+            monitor.record(shape, seconds)
+
+        if seconds >= SLOW_COMMAND_SECONDS:
+            logger.info(json.dumps({"slowCommand": shape, "ms": round(seconds * 1000, 2),
+                                    "database": event.database_name}))
+
+
+@contextmanager
+def monitor_queries():
+    """Records the commands issued inside the block; yields the QueryMonitor."""
+    monitor = QueryMonitor(_current.get())
+    token = _current.set(monitor)
+    try:
+        yield monitor
+    finally:
+        _current.reset(token)
+
+
+@contextmanager
+def assert_queries(maxQueries=None, maxRepeated=None):
+    """
+    Fails with AssertionError when the block issues more than `maxQueries`
+    commands, or the same command shape more than `maxRepeated` times:
+
+        with assert_queries(maxQueries=4, maxRepeated=1):
+            build_course_detail(courseId)
+    """
+    with monitor_queries() as monitor:
+        yield monitor
+
+    if maxQueries is not None and monitor.count > maxQueries:
+        raise AssertionError(f"{monitor.count} queries, expected at most {maxQueries}: "
+                             f"{[shape for shape, _ in monitor.commands]}")
+    repeated = [(shape, count) for shape, count in monitor.repeated()
+                if maxRepeated is not None and count > maxRepeated]
+    if repeated:
+        raise AssertionError(f"Queries repeated more than {maxRepeated} times: {repeated}")
+
+
+def route_stats():
+    with _routesLock:
+        return {
+            route: dict(totals, avgQueries=round(totals["queries"] / totals["requests"], 2),
+                        avgMs=round(totals["ms"] / totals["requests"], 2), ms=round(totals["ms"], 2))
+            for route, totals in _routes.items()
+        }
+
+
+def init_query_monitor(app, repeatThreshold=REPEAT_THRESHOLD):
+    """Monitors the queries of every request of `app`."""
+    from flask import g, request
+
+    @app.before_request
+    def start_query_monitor():
+        monitor = QueryMonitor(_current.get())
+        g.queryMonitor = monitor
+        g.queryMonitorToken = _current.set(monitor)
+
+    @app.teardown_request
+    def finish_query_monitor(error=None):
+        monitor = g.pop("queryMonitor", None)
+        token = g.pop("queryMonitorToken", None)
+        if monitor is None:
+            return
+        _current.reset(token)
+
+        route = request.url_rule.rule if request.url_rule else "<unmatched>"
+        with _routesLock:
+            totals = _routes.setdefault(route, {"requests": 0, "queries": 0, "maxQueries": 0, "ms": 0.0})
+            totals["requests"] += 1
+            totals["queries"] += monitor.count
+            totals["maxQueries"] = max(totals["maxQueries"], monitor.count)
+            totals["ms"] += monitor.seconds * 1000
+
+        repeated = [(shape, count) for shape, count in monitor.repeated() if count > repeatThreshold]
+        if repeated:
+            logger.info(json.dumps({
+                "repeatedQueries": route,
+                "path": request.path,
+                "queries": monitor.count,
+                "shapes": [{"shape": shape, "count": count} for shape, count in repeated]
+            }))
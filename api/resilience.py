@@ -0,0 +1,275 @@
+"""
+Isolation for slow or failing upstream services (RAG, Groq).
+
+Each Dependency combines:
+- a bulkhead: at most `maxConcurrent` calls in flight per worker, so a slow
+  service can only tie up that many threads and the rest keep serving
+  unrelated endpoints;
+- a timeout on every request;
+- a circuit breaker: after `failureThreshold` consecutive failures or calls
+  slower than `slowCallSeconds`, calls fail fast for `resetTimeout` seconds,
+  then a single probe call decides whether to close the circuit again.
+"""
+import os
+import threading
+import time
+from api.metrics import observe_upstream
+from api.timing import record as record_timing
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half-open"
+
+
+class DependencyUnavailable(Exception):
+    """
+    Raised instead of calling a dependency whose circuit is open or whose
+    bulkhead is full, and by post()/apost() when the call timed out or could
+    not connect.
+    """
+
+    def __init__(self, name, reason, retryAfter=1):
+        super().__init__(f"{name} is unavailable: {reason}")
+        self.name = name
+        self.reason = reason
+        self.retryAfter = retryAfter
+
+
+class CircuitBreaker:
+    def __init__(self, failureThreshold=5, slowCallSeconds=10.0, resetTimeout=30.0):
+        self.failureThreshold = failureThreshold
+        self.slowCallSeconds = slowCallSeconds
+        self.resetTimeout = resetTimeout
+        self.state = CLOSED
+        self.failures = 0
+        self.openedAt = 0.0
+        self._probing = False
+        self._lock = threading.Lock()
+
+    def allow(self):
+        """
+        Returns False if the call must not go ahead, otherwise the state it was
+        let through in: CLOSED, or HALF_OPEN for the single probe call.
+        """
+        with self._lock:
+            if self.state == OPEN and time.monotonic() - self.openedAt >= self.resetTimeout:
+                self.state = HALF_OPEN
+                self._probing = False
+
+            if self.state == CLOSED:
+                return CLOSED
+            if self.state == HALF_OPEN and not self._probing:
+                self._probing = True
+                return HALF_OPEN
+            return False
+
+    def release_probe(self):
+        # The call never reached the dependency; let another caller probe
+        with self._lock:
+            self._probing = False
+
+    def retry_after(self):
+        with self._lock:
+            return max(1, int(self.resetTimeout - (time.monotonic() - self.openedAt)))
+
+    def record(self, succeeded, duration, probe=False):
+        """
+        Records the outcome of a call. Only the probe decides a half-open
+        circuit; calls that started before the circuit opened and finish
+        later change nothing, so a slow straggler cannot close it.
+        """
+        # Calls slower than the latency SLO count as failures
+        failed = not succeeded or duration > self.slowCallSeconds
+        with self._lock:
+            if probe:
+                self._probing = False
+                self.failures = 0 if not failed else self.failures + 1
+                self.state = CLOSED if not failed else OPEN
+                if failed:
+                    self.openedAt = time.monotonic()
+                return
+
+            if self.state != CLOSED:
+                return
+            if not failed:
+                self.failures = 0
+                return
+
+            self.failures += 1
+            if self.failures >= self.failureThreshold:
+                self.state = OPEN
+                self.openedAt = time.monotonic()
+
+
+class Dependency:
+    def __init__(self, name, maxConcurrent=8, acquireTimeout=0.5, timeout=(3.05, 20),
+                 failureThreshold=5, slowCallSeconds=10.0, resetTimeout=30.0, maxConcurrentAsync=256):
+        self.name = name
+        self.timeout = timeout
+        self.acquireTimeout = acquireTimeout
+        self.maxConcurrent = maxConcurrent
+        self.maxConcurrentAsync = maxConcurrentAsync
+        self.breaker = CircuitBreaker(failureThreshold, slowCallSeconds, resetTimeout)
+        self.inFlight = 0
+        self.rejected = 0
+        self._bulkhead = threading.BoundedSemaphore(maxConcurrent)
+        # Async calls only hold a socket, not a thread, so their limit is much
+        # higher; created on first use by the ASGI app
+        self._asyncBulkhead = None
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls, name, **defaults):
+        """Builds a Dependency, letting <NAME>_MAX_CONCURRENT, <NAME>_MAX_CONCURRENT_ASYNC, <NAME>_TIMEOUT,
+        <NAME>_SLOW_CALL_SECONDS, <NAME>_FAILURE_THRESHOLD and <NAME>_RESET_TIMEOUT override the defaults."""
+        prefix = name.upper()
+        settings = dict(defaults)
+        for key, env, cast in (
+            ("maxConcurrent", "MAX_CONCURRENT", int),
+            ("maxConcurrentAsync", "MAX_CONCURRENT_ASYNC", int),
+            ("timeout", "TIMEOUT", float),
+            ("slowCallSeconds", "SLOW_CALL_SECONDS", float),
+            ("failureThreshold", "FAILURE_THRESHOLD", int),
+            ("resetTimeout", "RESET_TIMEOUT", float),
+        ):
+            value = os.getenv(f"{prefix}_{env}")
+            if value:
+                settings[key] = cast(value)
+        if isinstance(settings.get("timeout"), float):
+            settings["timeout"] = (3.05, settings["timeout"])
+        return cls(name, **settings)
+
+    def call(self, fn, isFailure=None):
+        """
+        Runs fn() behind the circuit breaker and bulkhead. `isFailure(result)`
+        marks unsuccessful results (such as 5xx responses) that should count
+        against the breaker; exceptions always do.
+        """
+        admittedAs = self.breaker.allow()
+        if not admittedAs:
+            self._reject()
+            raise DependencyUnavailable(self.name, "circuit open", self.breaker.retry_after())
+
+        if not self._bulkhead.acquire(timeout=self.acquireTimeout):
+            # A full bulkhead is back-pressure, not a failure of the dependency
+            if admittedAs == HALF_OPEN:
+                self.breaker.release_probe()
+            self._reject()
+            raise DependencyUnavailable(self.name, "too many concurrent calls")
+
+        with self._lock:
+            self.inFlight += 1
+        started = time.monotonic()
+        try:
+            result = fn()
+        except Exception:
+            self._finish(False, time.monotonic() - started, admittedAs)
+            raise
+        except BaseException:
+            if admittedAs == HALF_OPEN:
+                self.breaker.release_probe()
+            raise
+        else:
+            self._finish(not (isFailure and isFailure(result)), time.monotonic() - started, admittedAs)
+            return result
+        finally:
+            record_timing("http", time.monotonic() - started)
+            with self._lock:
+                self.inFlight -= 1
+            self._bulkhead.release()
+
+    def post(self, url, **kwargs):
+        """requests.post with this dependency's timeout; 5xx and 429 responses count as failures."""
+        # requests is slow to import and only needed once an upstream call is made
+        import requests
+        try:
+            return self.call(
+                lambda: requests.post(url, timeout=self.timeout, **kwargs),
+                isFailure=lambda response: response.status_code >= 500 or response.status_code == 429
+            )
+        except requests.Timeout as e:
+            # Already counted by the breaker; callers answer it like an open circuit
+            raise DependencyUnavailable(self.name, "timed out") from e
+        except requests.ConnectionError as e:
+            raise DependencyUnavailable(self.name, "connection failed") from e
+
+    async def acall(self, fn, isFailure=None):
+        """call() for coroutines: `fn` returns an awaitable and the bulkhead is an asyncio.Semaphore."""
+        import asyncio
+        if self._asyncBulkhead is None:
+            self._asyncBulkhead = asyncio.Semaphore(self.maxConcurrentAsync)
+
+        admittedAs = self.breaker.allow()
+        if not admittedAs:
+            self._reject()
+            raise DependencyUnavailable(self.name, "circuit open", self.breaker.retry_after())
+
+        try:
+            await asyncio.wait_for(self._asyncBulkhead.acquire(), self.acquireTimeout)
+        except asyncio.TimeoutError:
+            if admittedAs == HALF_OPEN:
+                self.breaker.release_probe()
+            self._reject()
+            raise DependencyUnavailable(self.name, "too many concurrent calls")
+        except BaseException:
+            # Cancelled while waiting for the bulkhead
+            if admittedAs == HALF_OPEN:
+                self.breaker.release_probe()
+            raise
+
+        with self._lock:
+            self.inFlight += 1
+        started = time.monotonic()
+        try:
+            result = await fn()
+        except Exception:
+            self._finish(False, time.monotonic() - started, admittedAs)
+            raise
+        except BaseException:
+            # Cancelled (e.g. the client went away): the call says nothing about
+            # the dependency, but a probe must not keep the circuit half-open forever
+            if admittedAs == HALF_OPEN:
+                self.breaker.release_probe()
+            raise
+        else:
+            self._finish(not (isFailure and isFailure(result)), time.monotonic() - started, admittedAs)
+            return result
+        finally:
+            record_timing("http", time.monotonic() - started)
+            with self._lock:
+                self.inFlight -= 1
+            self._asyncBulkhead.release()
+
+    async def apost(self, client, url, **kwargs):
+        """post() through an httpx.AsyncClient."""
+        # httpx is only needed by the ASGI app
+        import httpx
+        connect, read = self.timeout
+        try:
+            return await self.acall(
+                lambda: client.post(url, timeout=httpx.Timeout(read, connect=connect), **kwargs),
+                isFailure=lambda response: response.status_code >= 500 or response.status_code == 429
+            )
+        except httpx.TimeoutException as e:
+            raise DependencyUnavailable(self.name, "timed out") from e
+        except httpx.ConnectError as e:
+            raise DependencyUnavailable(self.name, "connection failed") from e
+
+    def _finish(self, succeeded, duration, admittedAs):
+        self.breaker.record(succeeded, duration, probe=admittedAs == HALF_OPEN)
+        observe_upstream(self.name, "ok" if succeeded else "failed", duration)
+
+    def _reject(self):
+        with self._lock:
+            self.rejected += 1
+        observe_upstream(self.name, "rejected")
+
+    def stats(self):
+        return {
+            "state": self.breaker.state,
+            "consecutiveFailures": self.breaker.failures,
+            "inFlight": self.inFlight,
+            "maxConcurrent": self.maxConcurrent,
+            "maxConcurrentAsync": self.maxConcurrentAsync,
+            "rejected": self.rejected
+        }
@@ -0,0 +1,109 @@
+import asyncio
+import threading
+
+# Every SingleFlight by name, for stats()
+_registry = {}
+_registryLock = threading.Lock()
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls with the same key: the first caller runs the
+    function and every caller that arrives while it is running waits for and
+    shares its result (or exception) instead of repeating the work.
+    Results are not kept once the call finishes; pair it with a cache for that.
+    """
+
+    def __init__(self, name):
+        self.name = name
+        self.calls = 0       # Calls to do()
+        self.executions = 0  # Calls that ran the function
+        self.coalesced = 0   # Calls that waited on another caller's execution
+        self._calls = {}
+        self._lock = threading.Lock()
+
+        with _registryLock:
+            _registry[name] = self
+
+    def do(self, key, fn):
+        with self._lock:
+            self.calls += 1
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                self.executions += 1
+                call = _Call()
+                self._calls[key] = call
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn()
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+    def stats(self):
+        with self._lock:
+            return {
+                "calls": self.calls,
+                "executions": self.executions,
+                "coalesced": self.coalesced,
+                "inFlight": len(self._calls)
+            }
+
+
+class AsyncSingleFlight(SingleFlight):
+    """
+    SingleFlight for coroutines on one event loop (the ASGI app): every
+    caller awaits the same task instead of blocking a thread.
+    """
+
+    async def ado(self, key, fn):
+        with self._lock:
+            self.calls += 1
+            task = self._calls.get(key)
+            if task is None:
+                self.executions += 1
+                # The call runs in its own task, so cancelling the caller that
+                # started it does not cancel it for the others
+                task = asyncio.ensure_future(fn())
+                self._calls[key] = task
+                task.add_done_callback(lambda done: self._finished(key, done))
+            else:
+                self.coalesced += 1
+
+        # shield() so a caller's cancellation does not cancel the shared call
+        return await asyncio.shield(task)
+
+    def _finished(self, key, task):
+        with self._lock:
+            del self._calls[key]
+        # Mark the exception retrieved in case every caller was cancelled
+        if not task.cancelled():
+            task.exception()
+
+
+def stats():
+    """Returns the counters of every SingleFlight, by name."""
+    with _registryLock:
+        flights = list(_registry.values())
+    return {flight.name: flight.stats() for flight in flights}
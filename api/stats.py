@@ -0,0 +1,463 @@
+from datetime import datetime, timedelta
+from pymongo import DeleteOne, UpdateOne
+from api.models import User, Module, Week, ChatQuestions, Enrollment, StatsCounter, DailyStats, get_ist_time
+
+USER_SCOPE = "user"
+COURSE_SCOPE = "course"
+GLOBAL_SCOPE = "global"
+GLOBAL_KEY = "all"
+
+# Counters recorded at event time
+EVENTS = (
+    "users",               # Users created (negative on delete)
+    "activeUsers",         # Active users created (negative on delete)
+    "logins",
+    "enrollments",
+    "submissions",
+    "modulesCompleted",
+    "chatQuestions",
+)
+
+# Breakdowns AdminStatisticsAPI can add to the totals
+ADMIN_BREAKDOWNS = ('role', 'course')
+
+
+def _user_totals(groupBy):
+    # $group stage computing the user statistics for each value of `groupBy`
+    return {"$group": {
+        "_id": groupBy,
+        "users": {"$sum": 1},
+        "activeUsers": {"$sum": {"$cond": [{"$eq": ["$active", True]}, 1, 0]}},
+        "questionsAttempted": {"$sum": {"$size": {"$ifNull": ["$questionsAttempted", []]}}}
+    }}
+
+
+def admin_statistics_pipeline(breakdowns=()):
+    """
+    Builds a single $facet aggregation over the users collection that computes
+    the totals and any requested breakdowns server-side.
+    """
+    facets = {"totals": [_user_totals(None)]}
+
+    if "role" in breakdowns:
+        facets["byRole"] = [_user_totals("$role"), {"$sort": {"_id": 1}}]
+
+    if "course" in breakdowns:
+        facets["byCourse"] = [
+            {"$project": {"registeredCourses": 1, "active": 1, "questionsAttempted": 1}},
+            {"$unwind": "$registeredCourses"},
+            _user_totals("$registeredCourses"),
+            {"$sort": {"users": -1}}
+        ]
+
+    return [
+        {"$project": {"role": 1, "active": 1, "questionsAttempted": 1, "registeredCourses": 1}},
+        {"$facet": facets}
+    ]
+
+
+def compute_admin_statistics(breakdowns=(), courseMetadata=None):
+    """
+    Runs the admin statistics aggregation and shapes it for AdminStatisticsAPI.
+    `courseMetadata` resolves course ids to names for the per-course breakdown.
+    """
+    result = next(User._get_collection().aggregate(admin_statistics_pipeline(breakdowns)))
+    totals = result["totals"][0] if result["totals"] else {}
+
+    statisticsData = {
+        "totalUsers": totals.get("users", 0),
+        "totalModules": Module._get_collection().estimated_document_count(),
+        "activeUsers": totals.get("activeUsers", 0),
+        "questionsAttempted": totals.get("questionsAttempted", 0)
+    }
+
+    if "byRole" in result:
+        statisticsData["byRole"] = {
+            row["_id"]: {
+                "users": row["users"],
+                "activeUsers": row["activeUsers"],
+                "questionsAttempted": row["questionsAttempted"]
+            }
+            for row in result["byRole"]
+        }
+
+    if "byCourse" in result:
+        metadata = courseMetadata([row["_id"] for row in result["byCourse"]]) if courseMetadata else {}
+        statisticsData["byCourse"] = [
+            {
+                "courseId": str(row["_id"]),
+                "name": metadata.get(str(row["_id"]), {}).get("name"),
+                "users": row["users"],
+                "activeUsers": row["activeUsers"],
+                "questionsAttempted": row["questionsAttempted"]
+            }
+            for row in result["byCourse"]
+        ]
+
+    return statisticsData
+
+
+# -----------------------------
+# Incremental counters
+# -----------------------------
+def _counter_update(scope, key, increments, now):
+    return UpdateOne(
+        {"scope": scope, "key": str(key)},
+        {
+            "$inc": {f"counts.{event}": amount for event, amount in increments.items()},
+            "$set": {"updatedAt": now}
+        },
+        upsert=True
+    )
+
+
+def record_event(event, amount=1, userId=None, courseId=None):
+    """
+    Increments `event` on the global counter and, when given, on the user's and
+    the course's counters, in one unordered bulk write.
+    Statistics are best effort: a failure here never fails the caller's request.
+    """
+    record_events({event: amount}, userId=userId, courseId=courseId)
+
+
+def record_events(increments, userId=None, courseId=None):
+    """Same as record_event() for several counters at once, e.g. {"users": 1, "activeUsers": 1}."""
+    now = get_ist_time()
+    operations = [_counter_update(GLOBAL_SCOPE, GLOBAL_KEY, increments, now)]
+    if userId is not None:
+        operations.append(_counter_update(USER_SCOPE, userId, increments, now))
+    if courseId is not None:
+        operations.append(_counter_update(COURSE_SCOPE, courseId, increments, now))
+    write_counter_updates(operations, f"statistics {increments}")
+
+
+def write_counter_updates(operations, description):
+    """Applies counter updates in one unordered bulk write, logging rather than raising on failure."""
+    if not operations:
+        return
+    try:
+        StatsCounter._get_collection().bulk_write(operations, ordered=False)
+    except Exception as e:
+        print(f"Failed to record {description}: {str(e)}")
+
+
+def record_enrollments(userId, courseIds):
+    """Counts new enrollments for the user, each course and globally in one bulk write."""
+    if not courseIds:
+        return
+
+    now = get_ist_time()
+    operations = [
+        _counter_update(GLOBAL_SCOPE, GLOBAL_KEY, {"enrollments": len(courseIds)}, now),
+        _counter_update(USER_SCOPE, userId, {"enrollments": len(courseIds)}, now)
+    ]
+    operations.extend(_counter_update(COURSE_SCOPE, courseId, {"enrollments": 1}, now) for courseId in courseIds)
+    write_counter_updates(operations, "enrollment statistics")
+
+
+def _courses_of_modules(moduleIds):
+    # Module id -> course id, through the modules' weeks
+    weeks = {row["_id"]: row["week"] for row in Module._get_collection().find(
+        {"_id": {"$in": list(moduleIds)}}, {"week": 1}
+    )}
+    courses = {row["_id"]: row["course"] for row in Week._get_collection().find(
+        {"_id": {"$in": list(set(weeks.values()))}}, {"course": 1}
+    )}
+    return {moduleId: courses[weekId] for moduleId, weekId in weeks.items() if weekId in courses}
+
+
+def user_removal_updates(userId):
+    """
+    Counter updates taking a user off the statistics: their share of the
+    derived global and course counts (what rebuild_counters() would no longer
+    find) is subtracted and their own counter is deleted. Event-only counts
+    such as logins and submissions are history and stay.
+    Build them before deleting the user, whose enrollments and chatbot
+    questions the delete cascades away, and apply them with write_counter_updates().
+    """
+    try:
+        return _user_removal_updates(userId)
+    except Exception as e:
+        print(f"Failed to read statistics of user {userId}: {str(e)}")
+        return []
+
+
+def _user_removal_updates(userId):
+    user = User._get_collection().find_one({"_id": userId}, {"active": 1, "modulesCompleted": 1})
+    if not user:
+        return []
+
+    totals = {"users": -1, "activeUsers": -1 if user.get("active") else 0,
+              "enrollments": 0, "modulesCompleted": 0, "chatQuestions": 0}
+    byCourse = {}
+
+    def take(courseId, field, amount):
+        courseCounts = byCourse.setdefault(courseId, {})
+        courseCounts[field] = courseCounts.get(field, 0) - amount
+        totals[field] -= amount
+
+    for row in Enrollment._get_collection().find({"user": userId}, {"course": 1, "_id": 0}):
+        take(row["course"], "enrollments", 1)
+    for courseId in _courses_of_modules(user.get("modulesCompleted", [])).values():
+        take(courseId, "modulesCompleted", 1)
+    for row in ChatQuestions._get_collection().aggregate([
+        {"$match": {"user": userId}},
+        {"$group": {"_id": "$course", "questions": {"$sum": {"$size": {"$ifNull": ["$questions", []]}}}}}
+    ]):
+        take(row["_id"], "chatQuestions", row["questions"])
+
+    now = get_ist_time()
+    operations = [_counter_update(GLOBAL_SCOPE, GLOBAL_KEY, totals, now)]
+    operations.extend(_counter_update(COURSE_SCOPE, courseId, counts, now) for courseId, counts in byCourse.items())
+    operations.append(DeleteOne({"scope": USER_SCOPE, "key": str(userId)}))
+    return operations
+
+
+# Set once the global counter carries rebuild_counters()'s seededAt mark
+_seeded = False
+
+
+def counters_seeded():
+    """
+    True once rebuild_counters() has run. Counters only receive increments
+    from events, so before that they miss everything that happened earlier
+    (a user's first login would create a counter holding nothing but the login).
+    """
+    global _seeded
+    if not _seeded:
+        _seeded = StatsCounter._get_collection().find_one(
+            {"scope": GLOBAL_SCOPE, "key": GLOBAL_KEY, "seededAt": {"$exists": True}},
+            {"_id": 1}
+        ) is not None
+    return _seeded
+
+
+def get_counters(scope, key):
+    """
+    Returns the counts for one counter document, or None if it does not exist
+    yet or the counters have not been seeded; callers then count from the data.
+    """
+    if not counters_seeded():
+        return None
+
+    counter = StatsCounter._get_collection().find_one(
+        {"scope": scope, "key": str(key)},
+        {"counts": 1, "_id": 0}
+    )
+    return counter.get("counts", {}) if counter else None
+
+
+def count_user_lists(userId):
+    """Fallback for users without a counter document: sizes the lists server-side."""
+    result = list(User._get_collection().aggregate([
+        {"$match": {"_id": userId}},
+        {"$project": {
+            "modulesCompleted": {"$size": {"$ifNull": ["$modulesCompleted", []]}},
+            "questionsAttempted": {"$size": {"$ifNull": ["$questionsAttempted", []]}}
+        }}
+    ]))
+    return result[0] if result else {}
+
+
+def rebuild_counters():
+    """
+    Recomputes every counter that can be derived from stored data (users,
+    enrollments, completed modules, chatbot questions, and the attempted
+    questions lists, which nothing records as events) and writes them with
+    $set. Event-only counters such as logins and submissions are kept.
+    Meant for the first deployment and for occasional reconciliation; until
+    it has run, readers ignore the counters (see counters_seeded()).
+    """
+    now = get_ist_time()
+    counts = {}
+
+    def add(scope, key, field, value):
+        fields = counts.setdefault((scope, str(key)), {})
+        fields[field] = fields.get(field, 0) + value
+
+    userTotals = {"users": 0, "activeUsers": 0, "modulesCompleted": 0, "questionsAttempted": 0}
+    for row in User._get_collection().aggregate([
+        {"$project": {
+            "active": 1,
+            "modulesCompleted": {"$size": {"$ifNull": ["$modulesCompleted", []]}},
+            "questionsAttempted": {"$size": {"$ifNull": ["$questionsAttempted", []]}}
+        }}
+    ]):
+        add(USER_SCOPE, row["_id"], "modulesCompleted", row["modulesCompleted"])
+        add(USER_SCOPE, row["_id"], "questionsAttempted", row["questionsAttempted"])
+        userTotals["users"] += 1
+        userTotals["activeUsers"] += 1 if row.get("active") else 0
+        userTotals["modulesCompleted"] += row["modulesCompleted"]
+        userTotals["questionsAttempted"] += row["questionsAttempted"]
+
+    # Completions per module, credited to the module's course
+    completions = {
+        row["_id"]: row["users"]
+        for row in User._get_collection().aggregate([
+            {"$project": {"modulesCompleted": 1}},
+            {"$unwind": "$modulesCompleted"},
+            {"$group": {"_id": "$modulesCompleted", "users": {"$sum": 1}}}
+        ])
+    }
+    for moduleId, courseId in _courses_of_modules(completions).items():
+        add(COURSE_SCOPE, courseId, "modulesCompleted", completions[moduleId])
+
+    chatTotal = 0
+    for scope, field in ((USER_SCOPE, "$user"), (COURSE_SCOPE, "$course")):
+        for row in ChatQuestions._get_collection().aggregate([
+            {"$group": {"_id": field, "questions": {"$sum": {"$size": {"$ifNull": ["$questions", []]}}}}}
+        ]):
+            add(scope, row["_id"], "chatQuestions", row["questions"])
+            if scope == USER_SCOPE:
+                chatTotal += row["questions"]
+
+    enrollmentTotal = 0
+    for scope, field in ((USER_SCOPE, "$user"), (COURSE_SCOPE, "$course")):
+        for row in Enrollment._get_collection().aggregate([
+            {"$group": {"_id": field, "enrollments": {"$sum": 1}}}
+        ]):
+            add(scope, row["_id"], "enrollments", row["enrollments"])
+            if scope == COURSE_SCOPE:
+                enrollmentTotal += row["enrollments"]
+
+    for field, value in userTotals.items():
+        add(GLOBAL_SCOPE, GLOBAL_KEY, field, value)
+    add(GLOBAL_SCOPE, GLOBAL_KEY, "chatQuestions", chatTotal)
+    add(GLOBAL_SCOPE, GLOBAL_KEY, "enrollments", enrollmentTotal)
+
+    def seed(scope, key, fields):
+        return UpdateOne(
+            {"scope": scope, "key": key},
+            {"$set": {**{f"counts.{field}": value for field, value in fields.items()},
+                      "updatedAt": now, "seededAt": now}},
+            upsert=True
+        )
+
+    # The global counter goes last: its seededAt mark enables the counters for readers
+    globalFields = counts.pop((GLOBAL_SCOPE, GLOBAL_KEY))
+    operations = [seed(scope, key, fields) for (scope, key), fields in counts.items()]
+    if operations:
+        StatsCounter._get_collection().bulk_write(operations, ordered=False)
+    StatsCounter._get_collection().bulk_write([seed(GLOBAL_SCOPE, GLOBAL_KEY, globalFields)])
+    return len(operations) + 1
+
+
+# -----------------------------
+# Daily rollups
+# -----------------------------
+def _start_of_day(value):
+    return datetime(value.year, value.month, value.day)
+
+
+# Counters rolled up per batch, bounding the rollup's memory however many counters exist
+ROLLUP_BATCH = 1000
+
+
+def _latest_buckets(scope, keys, day):
+    # Counts of the newest bucket before `day` for each of `keys`
+    rows = DailyStats._get_collection().aggregate([
+        {"$match": {"scope": scope, "key": {"$in": keys}, "day": {"$lt": day}}},
+        {"$sort": {"day": -1}},
+        {"$group": {"_id": "$key", "counts": {"$first": "$counts"}}}
+    ])
+    return {row["_id"]: row.get("counts", {}) for row in rows}
+
+
+def _rollup_batch(counters, day):
+    before = {}
+    for scope in {counter["scope"] for counter in counters}:
+        keys = [counter["key"] for counter in counters if counter["scope"] == scope]
+        before.update({(scope, key): counts for key, counts in _latest_buckets(scope, keys, day).items()})
+
+    operations = []
+    for counter in counters:
+        counts = counter.get("counts", {})
+        previous = before.get((counter["scope"], counter["key"]), {})
+        operations.append(UpdateOne(
+            {"scope": counter["scope"], "key": counter["key"], "day": day},
+            {"$set": {
+                "counts": counts,
+                "deltas": {event: value - previous.get(event, 0) for event, value in counts.items()}
+            }},
+            upsert=True
+        ))
+
+    if operations:
+        DailyStats._get_collection().bulk_write(operations, ordered=False)
+    return len(operations)
+
+
+def rollup_daily_stats(day=None):
+    """
+    Snapshots the counters that changed since the previous run into DailyStats
+    buckets for `day` (today, IST, by default), with the change since each
+    counter's previous bucket. Unchanged counters get no bucket; see
+    get_daily_stats(). Running it again for the same day overwrites that
+    day's buckets. Returns the number of buckets written.
+    """
+    day = _start_of_day(day or get_ist_time())
+    started = get_ist_time()
+
+    marker = StatsCounter._get_collection().find_one({"scope": GLOBAL_SCOPE, "key": GLOBAL_KEY}, {"rolledUpAt": 1})
+    query = {}
+    if marker and marker.get("rolledUpAt"):
+        query["updatedAt"] = {"$gte": marker["rolledUpAt"]}
+
+    written = 0
+    batch = []
+    for counter in StatsCounter._get_collection().find(query, {"scope": 1, "key": 1, "counts": 1, "_id": 0}):
+        batch.append(counter)
+        if len(batch) >= ROLLUP_BATCH:
+            written += _rollup_batch(batch, day)
+            batch = []
+    if batch:
+        written += _rollup_batch(batch, day)
+
+    # Counters updated from here on are rolled up by the next run
+    StatsCounter._get_collection().update_one(
+        {"scope": GLOBAL_SCOPE, "key": GLOBAL_KEY},
+        {"$set": {"rolledUpAt": started}},
+        upsert=True
+    )
+    return written
+
+
+def get_daily_stats(scope, key, days):
+    """
+    Returns the last `days` days of one counter, oldest first, up to the last
+    rollup. Days without a bucket, when the counter did not change, repeat
+    the previous counts with zero deltas.
+    """
+    today = _start_of_day(get_ist_time())
+    since = today - timedelta(days=days - 1)
+    query = {"scope": scope, "key": str(key)}
+    projection = {"day": 1, "counts": 1, "deltas": 1, "_id": 0}
+
+    marker = StatsCounter._get_collection().find_one({"scope": GLOBAL_SCOPE, "key": GLOBAL_KEY}, {"rolledUpAt": 1})
+    if not marker or not marker.get("rolledUpAt"):
+        return []
+    until = min(today, _start_of_day(marker["rolledUpAt"]))
+
+    buckets = {row["day"]: row for row in DailyStats._get_collection().find(
+        {**query, "day": {"$gte": since, "$lte": today}}, projection
+    )}
+    earlier = DailyStats._get_collection().find_one({**query, "day": {"$lt": since}}, projection,
+                                                    sort=[("day", -1)])
+    counts = earlier.get("counts", {}) if earlier else None
+
+    daily = []
+    day = since
+    while day <= today:
+        bucket = buckets.get(day)
+        if bucket:
+            counts = bucket.get("counts", {})
+            deltas = bucket.get("deltas", {})
+        elif counts is None or day > until:
+            # Before the counter's first bucket, or not rolled up yet
+            day += timedelta(days=1)
+            continue
+        else:
+            deltas = dict.fromkeys(counts, 0)
+        daily.append({"day": day.strftime("%Y-%m-%d"), "counts": counts, "deltas": deltas})
+        day += timedelta(days=1)
+    return daily
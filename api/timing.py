@@ -0,0 +1,148 @@
+"""
+Per-request timing.
+
+init_timing() starts a RequestTimer for every Flask request and, when the
+response is ready, reports where the time went as a Server-Timing header and
+as one JSON log line (route, status, sizes and the timings below):
+- total: from the start of the request to the finished response;
+- db: MongoDB commands, reported by MongoTimingListener;
+- http: outbound calls to RAG and Groq (api/resilience.py);
+- json: response encoding (api/json_provider.py);
+- compress: response compression (api/compression.py).
+
+Code that does not run inside a request (background refreshes, CLI commands)
+records nothing. Set REQUEST_TIMING_LOG=0 to keep the header but drop the log.
+"""
+import json
+import logging
+import os
+import sys
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from pymongo import monitoring
+
+KINDS = ("db", "http", "json", "compress")
+
+_current = ContextVar("requestTimer", default=None)
+
+LOG_ENABLED = os.getenv("REQUEST_TIMING_LOG", "1") != "0"
+
+
+def stdout_logger(name):
+    """A logger writing bare messages (one JSON object per line) to stdout."""
+    logger = logging.getLogger(name)
+    if not logger.handlers:
+        handler = logging.StreamHandler(sys.stdout)
+        handler.setFormatter(logging.Formatter("%(message)s"))
+        logger.addHandler(handler)
+        logger.setLevel(logging.INFO)
+        logger.propagate = False
+    return logger
+
+
+logger = stdout_logger("api.timing")
+
+
+class RequestTimer:
+    __slots__ = ("started", "seconds", "counts")
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.seconds = dict.fromkeys(KINDS, 0.0)
+        self.counts = dict.fromkeys(KINDS, 0)
+
+    def elapsed(self):
+        return time.perf_counter() - self.started
+
+
+def begin_request_timer():
+    """Starts timing the current request; returns the timer and the token for end_request_timer()."""
+    timer = RequestTimer()
+    return timer, _current.set(timer)
+
+
+def end_request_timer(token):
+    _current.reset(token)
+
+
+def record(kind, seconds):
+    """Adds `seconds` of `kind` to the current request's timer, if any."""
+    timer = _current.get()
+    if timer is not None:
+        timer.seconds[kind] += seconds
+        timer.counts[kind] += 1
+
+
+@contextmanager
+def timed(kind):
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        record(kind, time.perf_counter() - started)
+
+
+class MongoTimingListener(monitoring.CommandListener):
+    """Times every MongoDB command; events fire on the thread that issued the command."""
+
+    def started(self, event):
+        pass
+
+    def succeeded(self, event):
+        record("db", event.duration_micros / 1e6)
+
+    def failed(self, event):
+        record("db", event.duration_micros / 1e6)
+
+
+def server_timing(timer, total):
+    metrics = [f"total;dur={total * 1000:.1f}"]
+    for kind in KINDS:
+        if timer.counts[kind]:
+            metrics.append(f'{kind};dur={timer.seconds[kind] * 1000:.1f};desc="n={timer.counts[kind]}"')
+    return ", ".join(metrics)
+
+
+def log_request(method, route, path, status, requestBytes, responseBytes, timer, total):
+    """The per-request log line, shared by the Flask app and the ASGI routes."""
+    logger.info(json.dumps({
+        "method": method,
+        "route": route,
+        "path": path,
+        "status": status,
+        "requestBytes": requestBytes,
+        "responseBytes": responseBytes,
+        "totalMs": round(total * 1000, 2),
+        **{f"{kind}Ms": round(timer.seconds[kind] * 1000, 2) for kind in KINDS},
+        **{f"{kind}Calls": timer.counts[kind] for kind in KINDS}
+    }))
+
+
+def init_timing(app):
+    """Times every request of `app`. Register it before other after_request hooks so it runs last."""
+    from flask import g, request
+
+    @app.before_request
+    def start_timer():
+        g.requestTimer, g.requestTimerToken = begin_request_timer()
+
+    @app.after_request
+    def report_timing(response):
+        timer = g.get("requestTimer")
+        if timer is None:
+            return response
+
+        total = timer.elapsed()
+        response.headers["Server-Timing"] = server_timing(timer, total)
+
+        if LOG_ENABLED:
+            log_request(request.method, request.url_rule.rule if request.url_rule else None, request.path,
+                        response.status_code, request.content_length or 0, response.content_length, timer, total)
+        return response
+
+    @app.teardown_request
+    def stop_timer(error=None):
+        token = g.pop("requestTimerToken", None)
+        if token is not None:
+            end_request_timer(token)
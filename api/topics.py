@@ -0,0 +1,431 @@
+"""
+Incremental topic clustering of chatbot questions.
+
+Each course keeps a small TF-IDF model (document frequencies) and a set of
+clusters built with online k-means: a new question joins its most similar
+cluster, whose centroid moves towards it with a 1/size learning rate, or starts
+a new cluster when nothing is similar enough. Only questions that arrived since
+the last update are processed, so refreshing a course costs time proportional
+to its new questions, not to everything ever asked.
+"""
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+import math
+import os
+import re
+import threading
+from bson import ObjectId
+from pymongo import UpdateOne
+from pymongo.errors import DuplicateKeyError
+from api.cache import TTLCache
+from api.models import ChatQuestions, CourseTopics, TopicSnapshot, get_ist_time
+from api.upstream import groq_chat, groq_content
+
+# Clustering settings
+MAX_CLUSTERS = 30
+SIMILARITY_THRESHOLD = 0.25
+CENTROID_TERMS = 40
+CLUSTER_SAMPLES = 5
+MAX_VOCABULARY = 20000
+
+# LLM labelling: only clusters that are new or grew by this factor are relabelled
+LABEL_TOPICS = 10
+RELABEL_GROWTH = 1.5
+
+TOKEN_RE = re.compile(r"[a-z][a-z0-9_+#]*")
+STOPWORDS = frozenset("""
+a an and are as at be by can do does for from how i if in into is it its me my of on or
+so that the this to use used using what when where which who why will with you your
+we our not no yes should would could there their them then than get got have has had
+was were been being just also about please help explain difference between way ways
+python code program programming
+""".split())
+
+
+def tokenize(text):
+    return [token for token in TOKEN_RE.findall(text.lower()) if len(token) > 1 and token not in STOPWORDS]
+
+
+def _norm(vector):
+    return math.sqrt(sum(weight * weight for weight in vector.values()))
+
+
+def _cosine(vector, centroid):
+    # `vector` is unit length; the centroid is not kept normalized
+    if len(vector) > len(centroid):
+        vector, centroid = centroid, vector
+    dot = sum(weight * centroid.get(term, 0.0) for term, weight in vector.items())
+    norm = _norm(centroid)
+    return dot / norm if norm else 0.0
+
+
+class TopicModel:
+    """TF-IDF vectorizer and online k-means clusters, stored as plain dicts."""
+
+    def __init__(self, docCount=0, docFreq=None, clusters=None):
+        self.docCount = docCount
+        self.docFreq = docFreq or {}
+        self.clusters = clusters or []
+
+    def vectorize(self, tokens):
+        counts = {}
+        for token in tokens:
+            counts[token] = counts.get(token, 0) + 1
+
+        vector = {
+            term: count * (math.log((1 + self.docCount) / (1 + self.docFreq.get(term, 0))) + 1)
+            for term, count in counts.items()
+        }
+        norm = _norm(vector)
+        return {term: weight / norm for term, weight in vector.items()} if norm else {}
+
+    def partial_fit(self, questions):
+        """Folds a batch of new questions into the model."""
+        for question in questions:
+            tokens = tokenize(question)
+            if not tokens:
+                continue
+
+            self.docCount += 1
+            for term in set(tokens):
+                self.docFreq[term] = self.docFreq.get(term, 0) + 1
+
+            self._assign(question, self.vectorize(tokens))
+
+        self._prune_vocabulary()
+
+    def _assign(self, question, vector):
+        best, bestSimilarity = None, 0.0
+        for cluster in self.clusters:
+            similarity = _cosine(vector, cluster["centroid"])
+            if similarity > bestSimilarity:
+                best, bestSimilarity = cluster, similarity
+
+        if best is None or bestSimilarity < SIMILARITY_THRESHOLD:
+            if len(self.clusters) >= MAX_CLUSTERS:
+                # No room for a new cluster: join the nearest one, or the
+                # smallest when the question shares no terms with any of them
+                if best is None:
+                    best = min(self.clusters, key=lambda cluster: cluster["size"])
+                self._merge(best, question, vector, bestSimilarity)
+                return
+
+            self.clusters.append({
+                "centroid": dict(vector),
+                "size": 1,
+                "samples": [{"question": question, "similarity": 1.0}],
+                "label": None,
+                "labelledSize": 0
+            })
+            return
+
+        self._merge(best, question, vector, bestSimilarity)
+
+    def _merge(self, best, question, vector, bestSimilarity):
+        # Move the centroid towards the question with a per-cluster 1/size learning rate
+        best["size"] += 1
+        rate = 1.0 / best["size"]
+        centroid = best["centroid"]
+        for term in centroid:
+            centroid[term] *= (1 - rate)
+        for term, weight in vector.items():
+            centroid[term] = centroid.get(term, 0.0) + rate * weight
+
+        # Keep centroids small: only their heaviest terms
+        if len(centroid) > CENTROID_TERMS:
+            best["centroid"] = dict(sorted(centroid.items(), key=lambda item: item[1], reverse=True)[:CENTROID_TERMS])
+
+        # Keep the questions most representative of the cluster as samples
+        samples = [sample for sample in best["samples"] if sample["question"] != question]
+        samples.append({"question": question, "similarity": bestSimilarity})
+        samples.sort(key=lambda sample: sample["similarity"], reverse=True)
+        best["samples"] = samples[:CLUSTER_SAMPLES]
+
+    def _prune_vocabulary(self):
+        # Past MAX_VOCABULARY terms, keep only the most frequent ones, with
+        # headroom so that the next batches do not prune again straight away
+        if len(self.docFreq) > MAX_VOCABULARY:
+            kept = sorted(self.docFreq.items(), key=lambda item: item[1], reverse=True)[:int(MAX_VOCABULARY * 0.8)]
+            self.docFreq = dict(kept)
+
+    def top_topics(self, count):
+        """Returns the `count` largest clusters with their label, size and sample questions."""
+        topics = []
+        seen = set()
+        for cluster in sorted(self.clusters, key=lambda cluster: cluster["size"], reverse=True):
+            label = cluster_label(cluster)
+            if label.lower() in seen:
+                continue
+            seen.add(label.lower())
+            topics.append({
+                "topic": label,
+                "questions": cluster["size"],
+                "samples": [sample["question"] for sample in cluster["samples"]]
+            })
+            if len(topics) == count:
+                break
+        return topics
+
+
+def cluster_label(cluster):
+    # The LLM label when there is one, otherwise the centroid's top terms
+    if cluster.get("label"):
+        return cluster["label"]
+    terms = sorted(cluster["centroid"].items(), key=lambda item: item[1], reverse=True)[:3]
+    return " ".join(term for term, _ in terms)
+
+
+def label_clusters(clusters):
+    """
+    Asks the LLM for a short label for the largest clusters that are unlabelled
+    or have grown since they were last labelled, in a single call.
+    Leaves the term-based labels in place if the call fails.
+    """
+    candidates = [
+        cluster
+        for cluster in sorted(clusters, key=lambda cluster: cluster["size"], reverse=True)[:LABEL_TOPICS]
+        if not cluster.get("label") or cluster["size"] >= cluster.get("labelledSize", 0) * RELABEL_GROWTH
+    ]
+    if not candidates:
+        return
+
+    descriptions = "\n".join(
+        f"{index + 1}. keywords: {cluster_label(dict(cluster, label=None))}; examples: "
+        + " | ".join(sample["question"] for sample in cluster["samples"][:3])
+        for index, cluster in enumerate(candidates)
+    )
+    prompt = f"""
+Each numbered line describes a group of student programming questions.
+Give each group a topic name of 2-4 words.
+Respond with exactly {len(candidates)} lines, one topic name per line, in the same order.
+No numbering, no quotation marks, no additional text or commentary.
+
+{descriptions}
+"""
+
+    try:
+        response = groq_chat(prompt)
+        if response.status_code != 200:
+            return
+        labels = [line.strip(" -*\"'") for line in groq_content(response).strip().splitlines() if line.strip()]
+    except Exception as e:
+        print(f"Failed to label topics: {str(e)}")
+        return
+
+    if len(labels) != len(candidates):
+        return
+
+    for cluster, label in zip(candidates, labels):
+        cluster["label"] = label
+        cluster["labelledSize"] = cluster["size"]
+
+
+def llm_labels_enabled():
+    return os.getenv("TOPICS_LLM_LABELS", "false").lower() in ("1", "true", "yes")
+
+
+def refresh_course_topics(courseId):
+    """
+    Brings a course's topic model up to date with the questions asked since
+    its last refresh and returns the stored CourseTopics document.
+    """
+    topics = CourseTopics.objects(course=courseId).first() or CourseTopics(course=courseId)
+    model = TopicModel(topics.docCount, topics.docFreq, topics.clusters)
+
+    # Entries updated since the high-water mark; `clustered` says how many of
+    # each entry's questions are already in the model
+    query = {"course": courseId}
+    if topics.highWaterMark:
+        query["updatedAt"] = {"$gte": topics.highWaterMark}
+
+    highWaterMark = topics.highWaterMark
+    processed = []
+    newQuestions = 0
+    for entry in ChatQuestions._get_collection().find(query, {"questions": 1, "clustered": 1, "updatedAt": 1}):
+        questions = entry.get("questions", [])
+        clustered = entry.get("clustered", 0)
+        if len(questions) > clustered:
+            model.partial_fit(questions[clustered:])
+            newQuestions += len(questions) - clustered
+            processed.append(UpdateOne({"_id": entry["_id"]}, {"$max": {"clustered": len(questions)}}))
+
+        updatedAt = entry.get("updatedAt")
+        if updatedAt and (highWaterMark is None or updatedAt > highWaterMark):
+            highWaterMark = updatedAt
+
+    if not newQuestions and topics.id:
+        return topics
+
+    if llm_labels_enabled():
+        label_clusters(model.clusters)
+
+    state = {
+        "docCount": model.docCount,
+        "docFreq": model.docFreq,
+        "clusters": model.clusters,
+        "questionCount": (topics.questionCount or 0) + newQuestions,
+        "highWaterMark": highWaterMark or datetime.min,
+        "updatedAt": get_ist_time(),
+        "version": (topics.version or 0) + 1
+    }
+
+    # Optimistic concurrency: if another worker refreshed the course meanwhile,
+    # keep its model and leave the entries' `clustered` counts to it
+    collection = CourseTopics._get_collection()
+    if topics.id:
+        saved = collection.update_one({"_id": topics.id, "version": topics.version}, {"$set": state}).modified_count
+    else:
+        try:
+            collection.insert_one({"course": courseId, **state})
+            saved = True
+        except DuplicateKeyError:
+            saved = False
+
+    if saved and processed:
+        ChatQuestions._get_collection().bulk_write(processed, ordered=False)
+
+    return CourseTopics.objects(course=courseId).first()
+
+
+def top_topics(topics, count):
+    return TopicModel(topics.docCount, topics.docFreq, topics.clusters).top_topics(count)
+
+
+# -----------------------------
+# Cached, windowed results
+# -----------------------------
+# Windows: "all" (the incremental model above), "<n>d" (last n days) or "week:<weekId>"
+WINDOW_RE = re.compile(r"^(all|[1-9][0-9]{0,2}d|week:[0-9a-f]{24})$")
+TOP_TOPICS = 5
+RECENT_QUESTIONS = 500
+
+# A snapshot is recomputed in the background once this many entries have new
+# questions, or once it is this old and anything at all has changed
+REFRESH_MIN_NEW = int(os.getenv("TOPICS_REFRESH_MIN_NEW", "20"))
+REFRESH_MAX_AGE = timedelta(hours=int(os.getenv("TOPICS_REFRESH_MAX_AGE_HOURS", "6")))
+
+# Snapshots served from this worker's memory before checking Mongo for new questions
+SNAPSHOT_CACHE = TTLCache(maxsize=256, ttl=60, name="topic-snapshot")
+
+_refreshExecutor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="topics-refresh")
+_refreshing = set()
+_refreshingLock = threading.Lock()
+
+
+def window_query(courseId, window):
+    """Returns the ChatQuestions filter selecting a window of a course's questions."""
+    query = {"course": courseId}
+    # Week ids can end in "d" too, so they are told apart first
+    if window.startswith("week:"):
+        query["week"] = ObjectId(window[len("week:"):])
+    elif window.endswith("d"):
+        since = get_ist_time() - timedelta(days=int(window[:-1]) - 1)
+        query["date"] = {"$gte": datetime(since.year, since.month, since.day)}
+    return query
+
+
+def recent_questions(query, limit=RECENT_QUESTIONS):
+    """The newest `limit` questions matching `query`, newest first."""
+    return [
+        row["question"]
+        for row in ChatQuestions._get_collection().aggregate([
+            {"$match": query},
+            {"$sort": {"date": -1, "_id": -1}},
+            {"$unwind": "$questions"},
+            {"$limit": limit},
+            {"$project": {"_id": 0, "question": "$questions"}}
+        ])
+    ]
+
+
+def _latest_update(query):
+    latest = ChatQuestions._get_collection().find_one(
+        {**query, "updatedAt": {"$exists": True}},
+        {"updatedAt": 1},
+        sort=[("updatedAt", -1)]
+    )
+    return latest["updatedAt"] if latest else datetime.min
+
+
+def compute_topic_snapshot(courseId, window):
+    """
+    Computes and stores the topics for one course and window. The "all" window
+    uses the course's incremental model; other windows are small enough to be
+    clustered from scratch.
+    """
+    query = window_query(courseId, window)
+    # Anything updated after this point counts as new for the next refresh
+    highWaterMark = _latest_update(query)
+
+    if window == "all":
+        topics = top_topics(refresh_course_topics(courseId), TOP_TOPICS)
+    else:
+        model = TopicModel()
+        for entry in ChatQuestions._get_collection().find(query, {"questions": 1}):
+            model.partial_fit(entry.get("questions", []))
+        if llm_labels_enabled():
+            label_clusters(model.clusters)
+        topics = model.top_topics(TOP_TOPICS)
+
+    snapshot = {
+        "topics": topics,
+        "recentQuestions": recent_questions(query),
+        "highWaterMark": highWaterMark,
+        "computedAt": get_ist_time()
+    }
+    TopicSnapshot._get_collection().update_one(
+        {"course": courseId, "window": window},
+        {"$set": snapshot},
+        upsert=True
+    )
+    SNAPSHOT_CACHE.set((courseId, window), snapshot)
+    return snapshot
+
+
+def _refresh_in_background(courseId, window):
+    # One refresh per course and window at a time in this worker
+    key = (courseId, window)
+    with _refreshingLock:
+        if key in _refreshing:
+            return
+        _refreshing.add(key)
+
+    def run():
+        try:
+            compute_topic_snapshot(courseId, window)
+        except Exception as e:
+            print(f"Failed to refresh topics for course {courseId} ({window}): {str(e)}")
+        finally:
+            with _refreshingLock:
+                _refreshing.discard(key)
+
+    _refreshExecutor.submit(run)
+
+
+def get_topic_snapshot(courseId, window="all"):
+    """
+    Returns (snapshot, stale) for a course and window. A stored snapshot is
+    always served immediately; when enough new questions have arrived since it
+    was computed, a background refresh is started and the snapshot is marked
+    stale. Only the very first request for a window computes synchronously.
+    """
+    snapshot = SNAPSHOT_CACHE.get((courseId, window))
+    if snapshot is not None:
+        return snapshot, False
+
+    snapshot = TopicSnapshot._get_collection().find_one({"course": courseId, "window": window}, {"_id": 0})
+    if snapshot is None:
+        return compute_topic_snapshot(courseId, window), False
+
+    # Entries updated since the snapshot, counted on the (course, updatedAt) index
+    query = window_query(courseId, window)
+    query["updatedAt"] = {"$gt": snapshot["highWaterMark"]}
+    pending = ChatQuestions._get_collection().count_documents(query, limit=REFRESH_MIN_NEW)
+
+    stale = pending >= REFRESH_MIN_NEW or (pending and snapshot["computedAt"] + REFRESH_MAX_AGE < get_ist_time())
+    if stale:
+        _refresh_in_background(courseId, window)
+    else:
+        SNAPSHOT_CACHE.set((courseId, window), snapshot)
+
+    return snapshot, bool(stale)
@@ -0,0 +1,60 @@
+import os
+from api.resilience import Dependency
+
+GROQ_URL = "https://api.groq.com/openai/v1/chat/completions"
+GROQ_MODEL = "llama-3.3-70b-versatile"
+
+# Threads serving requests in this worker (gunicorn.conf.py sets it). Each
+# service may hold a quarter of them, so even with both hung the other half
+# keeps serving course pages
+WORKER_THREADS = int(os.getenv("WORKER_THREADS", "8"))
+UPSTREAM_CONCURRENCY = max(1, WORKER_THREADS // 4)
+
+# Per-worker isolation for each upstream service; see api/resilience.py
+RAG = Dependency.from_env("rag", maxConcurrent=UPSTREAM_CONCURRENCY, timeout=(3.05, 30), slowCallSeconds=20.0)
+GROQ = Dependency.from_env("groq", maxConcurrent=UPSTREAM_CONCURRENCY, timeout=(3.05, 20), slowCallSeconds=10.0)
+
+
+def rag_ask(data):
+    """Sends a question to the RAG service and returns the raw response."""
+    return RAG.post(os.getenv("RAG_API") + "/ask", json=data)
+
+
+async def rag_ask_async(client, data):
+    """rag_ask() through the ASGI app's httpx.AsyncClient."""
+    return await RAG.apost(client, os.getenv("RAG_API") + "/ask", json=data)
+
+
+def _groq_request(prompt):
+    return {
+        "json": {
+            "model": GROQ_MODEL,
+            "messages": [{
+                "role": "user",
+                "content": prompt
+            }]
+        },
+        "headers": {
+            "Content-Type": "application/json",
+            "Authorization": f"Bearer {os.getenv('GROQ_API_KEY')}"
+        }
+    }
+
+
+def groq_chat(prompt):
+    """Sends a single-message chat completion to Groq and returns the raw response."""
+    return GROQ.post(GROQ_URL, **_groq_request(prompt))
+
+
+async def groq_chat_async(client, prompt):
+    """groq_chat() through the ASGI app's httpx.AsyncClient."""
+    return await GROQ.apost(client, GROQ_URL, **_groq_request(prompt))
+
+
+def groq_content(response):
+    """Extracts the assistant message text from a successful Groq response."""
+    return response.json()["choices"][0]["message"]["content"]
+
+
+def dependency_stats():
+    return {dependency.name: dependency.stats() for dependency in (RAG, GROQ)}
@@ -0,0 +1,95 @@
+"""
+Cold-start benchmark for the serverless entry point.
+
+Starts a fresh interpreter several times, imports api.app under
+`python -X importtime` and serves one request, then reports:
+- the median time to import the app and to answer the first request;
+- where import time goes, grouped by top-level package (self time);
+- the cumulative import time of each api.* module.
+
+Usage (from the repository root):
+    python benchmarks/cold_start.py [--runs 5] [--path /] [--top 15]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+from collections import defaultdict
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+CHILD = """
+import json, sys, time
+started = time.perf_counter()
+import api.app
+imported = time.perf_counter()
+response = api.app.app.test_client().get(sys.argv[1])
+served = time.perf_counter()
+print(json.dumps({
+    "importMs": (imported - started) * 1000,
+    "firstRequestMs": (served - imported) * 1000,
+    "status": response.status_code
+}))
+"""
+
+
+def parse_importtime(stderr):
+    """Yields (module, selfMicroseconds, cumulativeMicroseconds) from -X importtime output."""
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        selfTime, cumulative, module = line[len("import time:"):].split("|")
+        yield module.strip(), int(selfTime), int(cumulative)
+
+
+def run_once(path):
+    process = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", CHILD, path],
+        cwd=ROOT, capture_output=True, text=True
+    )
+    lines = [line for line in process.stdout.splitlines() if line.startswith("{")]
+    if process.returncode != 0 or not lines:
+        raise RuntimeError(f"Cold start failed:\n{process.stderr[-2000:]}")
+    return json.loads(lines[-1]), list(parse_importtime(process.stderr))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--path", default="/", help="path of the first request")
+    parser.add_argument("--top", type=int, default=15, help="packages to list")
+    args = parser.parse_args()
+
+    timings = []
+    byPackage = defaultdict(list)
+    byApiModule = defaultdict(list)
+    for _ in range(args.runs):
+        timing, modules = run_once(args.path)
+        timings.append(timing)
+
+        packageTotals = defaultdict(int)
+        for module, selfTime, cumulative in modules:
+            packageTotals[module.split(".")[0]] += selfTime
+            if module.startswith("api."):
+                byApiModule[module].append(cumulative)
+        for package, total in packageTotals.items():
+            byPackage[package].append(total)
+
+    print(f"{args.runs} cold starts, first request GET {args.path} -> {timings[-1]['status']}")
+    print(f"  import api.app   {statistics.median(t['importMs'] for t in timings):8.1f} ms (median)")
+    print(f"  first request    {statistics.median(t['firstRequestMs'] for t in timings):8.1f} ms (median)")
+
+    print(f"\nImport self time by top-level package (median ms, top {args.top})")
+    packages = sorted(byPackage.items(), key=lambda item: statistics.median(item[1]), reverse=True)
+    for package, values in packages[:args.top]:
+        print(f"  {package:32} {statistics.median(values) / 1000:8.1f}")
+
+    print("\nCumulative import time of api.* modules (median ms)")
+    for module, values in sorted(byApiModule.items(), key=lambda item: statistics.median(item[1]), reverse=True):
+        print(f"  {module:32} {statistics.median(values) / 1000:8.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+"""
+JSON encoding benchmark: Flask's default (stdlib) provider against
+FastJSONProvider on a realistic course tree, as returned by /course/<courseId>.
+
+The stdlib provider encodes the tree with ids and dates already formatted as
+strings (as the course builder used to do field by field); only the encoding
+itself is timed.
+
+Usage (from the repository root):
+    python benchmarks/json_encoding.py [--weeks 12] [--modules 8] [--repeat 200]
+"""
+import argparse
+import os
+import random
+import sys
+import timeit
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bson import ObjectId
+from flask import Flask
+from flask.json.provider import DefaultJSONProvider
+from api.json_provider import FastJSONProvider, ISO_FORMAT, orjson
+
+MODULE_TYPES = ("video", "coding", "assignment", "document")
+
+
+def words(count):
+    return " ".join(random.choice(("loop", "list", "index", "function", "return", "value", "string",
+                                   "python", "input", "print", "range", "sum")) for _ in range(count))
+
+
+def build_course(weeks, modules):
+    """A course tree shaped like build_course_detail()'s, with raw datetimes."""
+    start = datetime(2025, 1, 6, 9, 30)
+    weekList = []
+    for w in range(weeks):
+        moduleList = []
+        for m in range(modules):
+            moduleType = MODULE_TYPES[m % len(MODULE_TYPES)]
+            module = {"moduleId": ObjectId(), "title": words(4), "type": moduleType}
+            if moduleType == "video":
+                module["url"] = "https://www.youtube.com/watch?v=dQw4w9WgXcQ"
+            elif moduleType == "coding":
+                module.update({
+                    "language": "python",
+                    "description": words(80),
+                    "codeTemplate": "def solve(n):\n    pass\n",
+                    "hint": words(20),
+                    "testCases": [{"inputData": str(i), "expectedOutput": str(i * i)} for i in range(10)]
+                })
+            elif moduleType == "assignment":
+                module.update({
+                    "questions": [
+                        {"question": words(25), "type": "mcq", "options": [words(4) for _ in range(4)],
+                         "correctAnswer": [0], "hint": words(10)}
+                        for _ in range(10)
+                    ],
+                    "graded": True
+                })
+            else:
+                module.update({"docType": "pdf", "docUrl": "https://example.com/notes.pdf",
+                               "description": words(40)})
+            moduleList.append(module)
+        weekList.append({
+            "weekId": ObjectId(),
+            "title": f"Week {w + 1}",
+            "deadline": start + timedelta(weeks=w + 1),
+            "modules": moduleList
+        })
+
+    return {
+        "courseId": ObjectId(),
+        "name": "Programming in Python",
+        "description": words(60),
+        "startDate": start,
+        "endDate": start + timedelta(weeks=weeks),
+        "announcements": [{"announcementId": ObjectId(), "message": words(30), "date": start + timedelta(days=d)}
+                          for d in range(20)],
+        "weeks": weekList
+    }
+
+
+def stringified(course):
+    """The same tree the way the stdlib path needs it: ids and dates pre-formatted."""
+    if isinstance(course, dict):
+        return {key: stringified(value) for key, value in course.items()}
+    if isinstance(course, list):
+        return [stringified(value) for value in course]
+    if isinstance(course, ObjectId):
+        return str(course)
+    if isinstance(course, datetime):
+        return course.strftime(ISO_FORMAT)
+    return course
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--weeks", type=int, default=12)
+    parser.add_argument("--modules", type=int, default=8)
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    random.seed(0)
+    course = build_course(args.weeks, args.modules)
+
+    app = Flask(__name__)
+    default = DefaultJSONProvider(app)
+    fast = FastJSONProvider(app)
+
+    preformatted = stringified(course)
+    cases = {
+        "stdlib (Flask default)": lambda: default.dumps(preformatted),
+        f"FastJSONProvider ({'orjson' if orjson else 'stdlib fallback'})": lambda: fast.dumps(course),
+    }
+
+    size = len(fast.dumps(course).encode("utf-8"))
+    print(f"Course tree: {args.weeks} weeks x {args.modules} modules, {size / 1024:.0f} KiB of JSON\n")
+
+    baseline = None
+    for name, fn in cases.items():
+        seconds = min(timeit.repeat(fn, number=args.repeat, repeat=5)) / args.repeat
+        baseline = baseline or seconds
+        print(f"  {name:34} {seconds * 1000:8.3f} ms/response  {baseline / seconds:5.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,168 @@
+"""
+Read path benchmark: the raw pymongo read path used by CourseAPI and
+VideoTranscriptAPI against the mongoengine Document path it replaced.
+
+Seeds a throwaway database with one course (announcements, weeks, modules of
+every type) and a long transcript, checks both paths return the same data,
+times them, and drops the database. The raw course tree must not repeat a
+query shape (no query per week or per module).
+
+Usage (from the repository root, against a MongoDB you can write to):
+    MONGO_URI=mongodb://localhost:27017 python benchmarks/read_path.py [--weeks 12] [--modules 10]
+"""
+import argparse
+import os
+import sys
+import timeit
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from mongoengine import connect, disconnect, get_db
+from api.models import Announcement, Course, Module, Question, TestCase, VideoTranscript, Week
+from api.controllers import build_course_detail, load_full_transcript
+from api.query_monitor import QueryMonitorListener, assert_queries
+
+DB_NAME = "backend_read_path_benchmark"
+MODULE_TYPES = ("video", "coding", "assignment", "document")
+
+
+def orm_course_detail(courseId):
+    """The Document-based course tree builder, as it was before the raw read path."""
+    course = Course.objects(id=courseId).first()
+    if not course:
+        return None
+
+    announcementList = [
+        {"announcementId": str(ann.id), "message": ann.message, "date": ann.date}
+        for ann in Announcement.objects(course=course)
+    ]
+
+    weekList = []
+    for week in Week.objects(course=course):
+        moduleList = []
+        for module in Module.objects(week=week):
+            moduleData = {"moduleId": str(module.id), "title": module.title, "type": module.type}
+            if module.type == "video":
+                moduleData["url"] = module.url
+            elif module.type == "coding":
+                moduleData.update({
+                    "language": module.language,
+                    "description": module.description,
+                    "codeTemplate": module.codeTemplate,
+                    "hint": module.hint or "No hint available.",
+                    "testCases": [
+                        {"inputData": tc.inputData, "expectedOutput": tc.expectedOutput} for tc in module.testCases
+                    ]
+                })
+            elif module.type == "assignment":
+                moduleData.update({
+                    "questions": [
+                        {"question": q.question, "type": q.type, "options": q.options,
+                         "correctAnswer": q.correctAnswer, "hint": q.hint}
+                        for q in module.questions
+                    ],
+                    "graded": module.isGraded
+                })
+            elif module.type == "document":
+                moduleData.update({"docType": module.docType, "docUrl": module.docUrl,
+                                   "description": module.description})
+            moduleList.append(moduleData)
+        weekList.append({"weekId": str(week.id), "title": week.title, "deadline": week.deadline,
+                         "modules": moduleList})
+
+    return {
+        "courseId": str(course.id),
+        "name": course.name,
+        "description": course.description,
+        "startDate": course.startDate,
+        "endDate": course.endDate,
+        "announcements": announcementList,
+        "weeks": weekList
+    }
+
+
+def orm_full_transcript(video_id):
+    video_transcript = VideoTranscript.objects(videoID=video_id).first()
+    if not video_transcript:
+        return None
+    return " ".join([chunk["text"] for chunk in video_transcript.transcript])
+
+
+def seed(weeks, modules):
+    start = datetime(2025, 1, 6, 9, 30)
+    course = Course(name="Benchmark course", description="Seeded by benchmarks/read_path.py",
+                    startDate=start, endDate=start + timedelta(weeks=weeks)).save()
+    for a in range(10):
+        Announcement(course=course, message=f"Announcement {a}", date=start + timedelta(days=a)).save()
+
+    for w in range(weeks):
+        week = Week(course=course, title=f"Week {w + 1}", deadline=start + timedelta(weeks=w + 1)).save()
+        for m in range(modules):
+            moduleType = MODULE_TYPES[m % len(MODULE_TYPES)]
+            module = Module(week=week, title=f"Module {w + 1}.{m + 1}", type=moduleType)
+            if moduleType == "video":
+                module.url = "https://www.youtube.com/watch?v=dQw4w9WgXcQ"
+            elif moduleType == "coding":
+                module.language = "python"
+                module.description = "Print the square of n. " * 10
+                module.codeTemplate = "def solve(n):\n    pass\n"
+                module.testCases = [TestCase(inputData=str(i), expectedOutput=str(i * i)) for i in range(10)]
+            elif moduleType == "assignment":
+                module.isGraded = m % 2 == 0
+                module.questions = [
+                    Question(question=f"Question {q}?", type="mcq", options=["a", "b", "c", "d"],
+                             correctAnswer="a", hint="Think about it.")
+                    for q in range(10)
+                ]
+            else:
+                module.docType = "pdf"
+                module.docUrl = "https://example.com/notes.pdf"
+                module.description = "Lecture notes."
+            module.save()
+
+    VideoTranscript(videoID="dQw4w9WgXcQ", transcript=[
+        {"text": f"segment {i} of the lecture", "start": i * 2.5, "duration": 2.5} for i in range(2000)
+    ]).save()
+    return str(course.id)
+
+
+def report(name, fn, number):
+    seconds = min(timeit.repeat(fn, number=number, repeat=5)) / number
+    print(f"  {name:34} {seconds * 1000:8.2f} ms")
+    return seconds
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--weeks", type=int, default=12)
+    parser.add_argument("--modules", type=int, default=10)
+    parser.add_argument("--number", type=int, default=20)
+    args = parser.parse_args()
+
+    disconnect()
+    connect(db=DB_NAME, host=os.getenv("MONGO_URI"), alias="default", event_listeners=[QueryMonitorListener()])
+    get_db().client.drop_database(DB_NAME)
+    try:
+        courseId = seed(args.weeks, args.modules)
+
+        with assert_queries(maxRepeated=1):
+            course = build_course_detail(courseId)
+        assert orm_course_detail(courseId) == course, "course trees differ"
+        assert orm_full_transcript("dQw4w9WgXcQ") == load_full_transcript("dQw4w9WgXcQ"), "transcripts differ"
+
+        print(f"Course tree: {args.weeks} weeks x {args.modules} modules")
+        orm = report("mongoengine Documents", lambda: orm_course_detail(courseId), args.number)
+        raw = report("raw read path", lambda: build_course_detail(courseId), args.number)
+        print(f"  {'speedup':34} {orm / raw:8.1f}x\n")
+
+        print("Transcript: 2000 segments")
+        orm = report("mongoengine Documents", lambda: orm_full_transcript("dQw4w9WgXcQ"), args.number)
+        raw = report("raw read path", lambda: load_full_transcript("dQw4w9WgXcQ"), args.number)
+        print(f"  {'speedup':34} {orm / raw:8.1f}x")
+    finally:
+        get_db().client.drop_database(DB_NAME)
+
+
+if __name__ == "__main__":
+    main()
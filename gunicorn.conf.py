@@ -0,0 +1,93 @@
+"""
+Production server configuration. gunicorn loads this file from the working
+directory, so from the repository root:
+
+    gunicorn                                                      # WSGI app, threaded workers
+    GUNICORN_WORKER_CLASS=uvicorn.workers.UvicornWorker gunicorn  # ASGI app (api/asgi.py)
+
+The app is preloaded in the master so workers share its memory copy-on-write,
+and each worker opens its own MongoDB pool after the fork: pymongo clients are
+not fork-safe, so none may exist in the master. Per-worker memory and
+connection counts therefore follow directly from the settings below.
+
+Environment:
+    PORT                     port to bind (default 8000)
+    WEB_CONCURRENCY          worker processes (default 2 x available CPUs + 1, at most 8)
+    GUNICORN_WORKER_CLASS    gthread (default), sync or uvicorn.workers.UvicornWorker
+    GUNICORN_THREADS         threads per gthread worker (default 8)
+    GUNICORN_TIMEOUT         seconds before a silent worker is restarted (default 60)
+    GUNICORN_MAX_REQUESTS    requests before a worker is recycled, 0 to never (default 2000)
+    MONGO_MAX_POOL_SIZE      MongoDB connections per worker (default: one per thread + 4)
+    MONGO_MIN_POOL_SIZE      connections kept open per worker (default 1)
+    PROMETHEUS_MULTIPROC_DIR where workers write /metrics samples (default a
+                             directory under /dev/shm or the temp directory)
+"""
+import gc
+import os
+import shutil
+import tempfile
+
+# Worker class and count
+worker_class = os.getenv("GUNICORN_WORKER_CLASS", "gthread")
+threads = int(os.getenv("GUNICORN_THREADS", "8")) if worker_class == "gthread" else 1
+workers = int(os.getenv("WEB_CONCURRENCY", min(2 * len(os.sched_getaffinity(0)) + 1, 8)))
+
+# Async workers serve the ASGI app, whose upstream-bound views are async
+wsgi_app = "api.asgi:app" if "uvicorn" in worker_class else "api.app:app"
+
+bind = f"0.0.0.0:{os.getenv('PORT', '8000')}"
+timeout = int(os.getenv("GUNICORN_TIMEOUT", "60"))
+graceful_timeout = 30
+keepalive = 5
+
+# Recycle workers now and then so slow leaks cannot grow memory without bound
+max_requests = int(os.getenv("GUNICORN_MAX_REQUESTS", "2000"))
+max_requests_jitter = max_requests // 10
+
+# Heartbeat files on tmpfs; a disk-backed /tmp can stall workers in containers
+if os.path.isdir("/dev/shm"):
+    worker_tmp_dir = "/dev/shm"
+
+preload_app = True
+
+# Import the app in the master without creating a MongoDB client
+os.environ["MONGO_CONNECT_ON_IMPORT"] = "0"
+
+# Workers write their metrics to files here so /metrics can add them up. It has
+# to exist before the app, and so prometheus_client, is preloaded; samples left
+# by a previous run would be added to this one's
+metricsDir = os.environ.setdefault("PROMETHEUS_MULTIPROC_DIR", os.path.join(
+    "/dev/shm" if os.path.isdir("/dev/shm") else tempfile.gettempdir(),
+    f"backend-metrics-{os.getenv('PORT', '8000')}"
+))
+shutil.rmtree(metricsDir, ignore_errors=True)
+os.makedirs(metricsDir)
+
+# Database work happens on the request threads (async workers run it in the
+# default 40-thread pool), plus the two topic refresh threads and some headroom
+dbThreads = 40 if "uvicorn" in worker_class else threads
+
+# The upstream bulkheads (api/upstream.py) are sized from the threads that serve requests
+os.environ.setdefault("WORKER_THREADS", str(dbThreads))
+maxPoolSize = int(os.getenv("MONGO_MAX_POOL_SIZE", dbThreads + 4))
+minPoolSize = int(os.getenv("MONGO_MIN_POOL_SIZE", "1"))
+
+
+def when_ready(server):
+    # Runs in the master after preloading, before the first fork: move the
+    # app's objects out of the collector's reach so that collections in the
+    # workers do not write to (and so copy) the shared pages
+    gc.collect()
+    gc.freeze()
+
+
+def post_fork(server, worker):
+    from api.db import init_db
+    init_db(maxPoolSize=maxPoolSize, minPoolSize=minPoolSize)
+    server.log.info("Worker %s: MongoDB pool of %s to %s connections", worker.pid, minPoolSize, maxPoolSize)
+
+
+def child_exit(server, worker):
+    # Drop the exited worker's live gauges (in-flight runs, pool connections)
+    from prometheus_client import multiprocess
+    multiprocess.mark_process_dead(worker.pid)
@@ -0,0 +1,56 @@
+"""
+Fixtures for tests that go through the app: the Flask test client and a
+small course, backed by an in-memory mongomock database that is dropped
+after each test.
+"""
+import os
+from datetime import datetime, timedelta
+
+import pytest
+
+# The app connects to mongomock below instead of MONGO_URI
+os.environ["MONGO_CONNECT_ON_IMPORT"] = "0"
+os.environ.setdefault("REQUEST_TIMING_LOG", "0")
+os.environ.setdefault("RAG_API", "http://rag.test")
+
+
+@pytest.fixture
+def db():
+    import mongomock
+    from mongoengine import get_connection
+    from api.db import DB_NAME, init_db
+    # Imported first: importing the app registers the real connection settings
+    import api.app  # noqa: F401
+
+    init_db(warm=False, mongo_client_class=mongomock.MongoClient)
+    yield get_connection()[DB_NAME]
+    get_connection().drop_database(DB_NAME)
+
+
+@pytest.fixture
+def app(db):
+    from api.app import app
+    return app
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def course(db):
+    """A course with one week, a coding module and an enrolled student."""
+    from api.enrollment import enroll
+    from api.models import Course, Module, TestCase, User, Week
+
+    now = datetime.now()
+    course = Course(name="Python", description="Programming in Python",
+                    startDate=now - timedelta(days=7), endDate=now + timedelta(days=60)).save()
+    week = Week(course=course, title="Week 1", deadline=now + timedelta(days=7)).save()
+    module = Module(week=week, title="Sum", type="coding", language="python",
+                    codeTemplate="def solve(a, b):\n    pass",
+                    testCases=[TestCase(inputData="1 2", expectedOutput="3")]).save()
+    student = User(role="student", email="student@example.com", name="Student").save()
+    enroll(student.id, [course.id])
+    return {"course": course, "week": week, "module": module, "student": student}
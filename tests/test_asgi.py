@@ -0,0 +1,63 @@
+import httpx
+import pytest
+from starlette.testclient import TestClient
+
+from api.resilience import CircuitBreaker
+from api.upstream import RAG
+
+ORIGIN = {"Origin": "https://frontend.example"}
+
+
+@pytest.fixture
+def asgi_client(app):
+    from api.asgi import app as asgi_app
+    with TestClient(asgi_app) as client:
+        yield client
+
+
+def rag_answers(asgi_client, handler):
+    """Routes the app's upstream calls to `handler` instead of the network."""
+    asgi_client.app.state.http = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+
+
+def chatbot_request(course):
+    return {"query": "What is a list?", "history": ["hi"], "email": course["student"].email,
+            "moduleId": str(course["module"].id)}
+
+
+def test_flask_routes_are_passed_through_with_cors_applied_once(asgi_client):
+    response = asgi_client.get("/db_status", headers=ORIGIN)
+    assert response.status_code == 200
+    assert response.json() == {"status": True}
+    assert response.headers.get_list("Access-Control-Allow-Origin") == [ORIGIN["Origin"]]
+    assert [value.strip() for value in response.headers["Vary"].split(",")].count("Origin") == 1
+
+
+def test_async_routes_answer_cors_preflight(asgi_client):
+    response = asgi_client.options("/chatbot", headers={**ORIGIN, "Access-Control-Request-Method": "POST"})
+    assert response.status_code == 200
+    assert response.headers["Access-Control-Allow-Origin"] == ORIGIN["Origin"]
+
+
+def test_chatbot_answers_from_rag(asgi_client, course):
+    rag_answers(asgi_client, lambda request: httpx.Response(200, json={"answer": "A sequence"}))
+
+    response = asgi_client.post("/chatbot", json=chatbot_request(course), headers=ORIGIN)
+    assert response.status_code == 200
+    assert response.json() == {"answer": "A sequence"}
+    assert response.headers["Access-Control-Allow-Origin"] == ORIGIN["Origin"]
+    assert response.headers["Server-Timing"].startswith("total;dur=")
+
+
+def test_chatbot_is_degraded_when_rag_is_unreachable(asgi_client, course, monkeypatch):
+    monkeypatch.setattr(RAG, "breaker", CircuitBreaker())
+
+    def unreachable(request):
+        raise httpx.ConnectError("connection refused", request=request)
+
+    rag_answers(asgi_client, unreachable)
+
+    response = asgi_client.post("/chatbot", json=chatbot_request(course))
+    assert response.status_code == 503
+    assert response.json()["degraded"] is True
+    assert response.headers["Retry-After"] == "1"
@@ -0,0 +1,94 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from api import controllers
+from api.models import ChatQuestions
+from api.resilience import DependencyUnavailable
+
+HISTORY = [{"text": "Hi! How can I help?"}]
+
+
+class FakeResponse:
+    def __init__(self, status_code, body=None, text=""):
+        self.status_code = status_code
+        self.body = body
+        self.text = text
+
+    def json(self):
+        return self.body
+
+
+def ask(client, course, query="What is a list?"):
+    return client.post("/chatbot", json={
+        "email": course["student"].email,
+        "moduleId": str(course["module"].id),
+        "query": query,
+        "history": HISTORY
+    })
+
+
+def test_answers_come_from_the_rag_service(client, course, monkeypatch):
+    sent = []
+    monkeypatch.setattr(controllers, "rag_ask",
+                        lambda data: sent.append(data) or FakeResponse(200, {"answer": "An ordered collection."}))
+
+    response = ask(client, course)
+
+    assert response.status_code == 200
+    assert response.get_json() == {"answer": "An ordered collection."}
+    assert [(data["query"], data["history"]) for data in sent] == [("What is a list?", [])]
+    assert ChatQuestions.objects(user=course["student"].id).first().questions == ["What is a list?"]
+
+
+def test_unavailable_rag_service_gets_a_fast_503(client, course, monkeypatch):
+    def rag_ask(data):
+        raise DependencyUnavailable("rag", "circuit open", retryAfter=7)
+    monkeypatch.setattr(controllers, "rag_ask", rag_ask)
+
+    response = ask(client, course)
+
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "7"
+    assert response.get_json() == {
+        "error": "The assistant is temporarily unavailable, please try again shortly",
+        "message": "rag is unavailable: circuit open",
+        "degraded": True
+    }
+
+
+def test_identical_concurrent_questions_share_one_rag_call(app, course, monkeypatch):
+    release = threading.Event()
+    calls = []
+
+    def rag_ask(data):
+        calls.append(data)
+        release.wait(2)
+        return FakeResponse(200, {"answer": "An ordered collection."})
+    monkeypatch.setattr(controllers, "rag_ask", rag_ask)
+
+    coalesced = controllers.CHATBOT_FLIGHTS.stats()["coalesced"]
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        futures = [pool.submit(ask, app.test_client(), course)]
+        deadline = time.monotonic() + 2
+        while not calls:
+            assert time.monotonic() < deadline, "the RAG service was never called"
+            time.sleep(0.001)
+        futures.append(pool.submit(ask, app.test_client(), course))
+        while controllers.CHATBOT_FLIGHTS.stats()["coalesced"] == coalesced:
+            assert time.monotonic() < deadline, "the second question did not join the first"
+            time.sleep(0.001)
+        release.set()
+        responses = [future.result() for future in futures]
+
+    assert [response.get_json() for response in responses] == [{"answer": "An ordered collection."}] * 2
+    assert len(calls) == 1
+
+
+@pytest.mark.parametrize("data", [{"query": "What is a list?"}, {"history": HISTORY}])
+def test_query_and_history_are_required(client, course, data):
+    response = client.post("/chatbot", json={"email": course["student"].email,
+                                             "moduleId": str(course["module"].id), **data})
+    assert response.status_code == 400
@@ -0,0 +1,58 @@
+from datetime import date
+
+import pytest
+
+from api.models import ChatQuestions, Course, Week
+
+
+@pytest.fixture
+def entries(course):
+    other = Course(name="Java", description="Java", startDate=course["course"].startDate,
+                   endDate=course["course"].endDate).save()
+    otherWeek = Week(course=other, title="Week 1", deadline=course["week"].deadline).save()
+    asked = [
+        (course["course"], course["week"], date(2025, 1, 1), ["q1"]),
+        (other, otherWeek, date(2025, 1, 2), ["q2", "q3"]),
+        (course["course"], course["week"], date(2025, 1, 3), ["q4"]),
+    ]
+    return [
+        ChatQuestions(user=course["student"], course=courseDoc, week=week, date=day, questions=texts).save()
+        for courseDoc, week, day, texts in asked
+    ]
+
+
+def questions_page(client, course, **params):
+    query = "&".join(f"{key}={value}" for key, value in params.items())
+    return client.get(f"/dashboard/user/questions?email={course['student'].email}&{query}")
+
+
+def test_groups_the_newest_entries_by_course(client, course, entries):
+    body = questions_page(client, course).get_json()
+    assert body["nextBefore"] is None
+    assert body["data"][str(course["course"].id)] == {
+        "course_name": "Python",
+        "questions": [{"question": "q4", "date": "2025-01-03"}, {"question": "q1", "date": "2025-01-01"}]
+    }
+    assert [item["question"] for item in body["data"][str(entries[1].course.id)]["questions"]] == ["q2", "q3"]
+
+
+def test_pages_backwards_with_the_before_cursor(client, course, entries):
+    first = questions_page(client, course, limit=2).get_json()
+    assert first["nextBefore"] == str(entries[1].id)
+    assert [item["question"] for questions in first["data"].values() for item in questions["questions"]] == [
+        "q4", "q2", "q3"
+    ]
+
+    last = questions_page(client, course, limit=2, before=first["nextBefore"]).get_json()
+    assert last["data"] == {str(course["course"].id): {"course_name": "Python",
+                                                      "questions": [{"question": "q1", "date": "2025-01-01"}]}}
+    # The last entry ends the page exactly, and there is nothing after it
+    assert last["nextBefore"] is None
+    assert questions_page(client, course, limit=3).get_json()["nextBefore"] is None
+
+
+def test_rejects_bad_requests(client, course, entries):
+    assert client.get("/dashboard/user/questions").status_code == 400
+    assert questions_page(client, course, before="nope").status_code == 400
+    assert questions_page(client, course, before="0" * 24).status_code == 400
+    assert client.get("/dashboard/user/questions?email=nobody@example.com").status_code == 404
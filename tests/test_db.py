@@ -0,0 +1,77 @@
+import os
+import subprocess
+import sys
+
+import mongomock
+import pytest
+from mongoengine import connection
+
+from api import db as dbModule
+from api.db import connection_settings, init_db, wait_for_db
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def test_settings_fail_fast_and_honour_pool_overrides(monkeypatch):
+    monkeypatch.delenv("MONGO_SERVER_SELECTION_TIMEOUT_MS", raising=False)
+    monkeypatch.delenv("MONGO_MIN_POOL_SIZE", raising=False)
+    monkeypatch.setenv("MONGO_MAX_POOL_SIZE", "12")
+
+    settings = connection_settings(maxPoolSize=4, minPoolSize=1)
+
+    assert settings["serverSelectionTimeoutMS"] == 5000
+    assert settings["maxPoolSize"] == 12
+    assert settings["minPoolSize"] == 1
+    assert len(settings["event_listeners"]) == 3
+
+
+def test_cold_init_creates_no_client_until_the_first_query(db):
+    init_db(warm=False, mongo_client_class=mongomock.MongoClient)
+
+    assert dbModule.ALIAS not in connection._connections
+    wait_for_db(timeout=0)
+    assert dbModule._clientReady.is_set()
+
+    connection.get_connection(dbModule.ALIAS)
+    assert dbModule.ALIAS in connection._connections
+
+
+def test_warm_init_creates_the_client_in_the_background(db):
+    init_db(warm=True, mongo_client_class=mongomock.MongoClient)
+
+    wait_for_db(timeout=2)
+
+    assert dbModule._clientReady.is_set()
+    assert dbModule.ALIAS in connection._connections
+
+
+def test_requests_are_released_when_the_client_cannot_be_created(db, monkeypatch):
+    def get_connection(alias):
+        raise connection.ConnectionFailure("no such host")
+    monkeypatch.setattr(dbModule, "get_connection", get_connection)
+
+    init_db(warm=True, mongo_client_class=mongomock.MongoClient)
+    wait_for_db(timeout=2)
+
+    assert dbModule._clientReady.is_set()
+
+
+def test_db_status_reports_a_failed_ping(db, monkeypatch):
+    def get_connection(alias):
+        raise connection.ConnectionFailure("no such host")
+    monkeypatch.setattr(dbModule, "get_connection", get_connection)
+
+    assert dbModule.db_status() is False
+
+
+@pytest.mark.parametrize("module", ["youtube_transcript_api", "requests", "api.seed_db"])
+def test_importing_the_app_skips_modules_most_requests_never_use(module):
+    env = dict(os.environ, MONGO_CONNECT_ON_IMPORT="0")
+    code = ("import sys, api.app\n"
+            "from mongoengine import connection\n"
+            f"print({module!r} in sys.modules, bool(connection._connections))")
+    result = subprocess.run([sys.executable, "-c", code], cwd=ROOT, env=env, capture_output=True, text=True,
+                            check=True)
+
+    # Neither the module nor a MongoDB client are created by the import
+    assert result.stdout.split() == ["False", "False"]
@@ -0,0 +1,129 @@
+import pytest
+
+from api import controllers
+from api.resilience import DependencyUnavailable
+
+PASSING_CODE = "def solve(a, b):\n    return a + b\n"
+
+
+class FakeResponse:
+    def __init__(self, status_code, body=None, text=""):
+        self.status_code = status_code
+        self.body = body
+        self.text = text
+
+    def json(self):
+        return self.body
+
+
+@pytest.fixture(autouse=True)
+def empty_cache():
+    controllers.DEBUG_CACHE.clear()
+    yield
+    controllers.DEBUG_CACHE.clear()
+
+
+@pytest.fixture
+def llm(monkeypatch):
+    """Prompts sent to the LLM; answers with `llm.response`."""
+    class FakeLLM:
+        prompts = []
+        response = FakeResponse(200, {"choices": [{"message": {"content": "Looks fine.\nNothing to fix."}}]})
+
+    def groq_chat(prompt):
+        FakeLLM.prompts.append(prompt)
+        if isinstance(FakeLLM.response, Exception):
+            raise FakeLLM.response
+        return FakeLLM.response
+
+    monkeypatch.setattr(controllers, "groq_chat", groq_chat)
+    return FakeLLM
+
+
+def debug(client, course, code):
+    return client.post("/debug/code", json={
+        "email": course["student"].email,
+        "moduleId": str(course["module"].id),
+        "code": code
+    })
+
+
+def test_syntax_errors_are_diagnosed_statically(client, course, llm):
+    response = debug(client, course, "def solve(a, b)\n    return a + b\n")
+
+    assert response.status_code == 200
+    body = response.get_json()
+    assert body["source"] == "static"
+    assert "SyntaxError" in body["choices"][0]["message"]["content"]
+    assert llm.prompts == []
+
+
+def test_crashes_on_the_first_test_case_are_diagnosed_by_running_the_code(client, course, llm):
+    response = debug(client, course, "def solve(a, b):\n    return [a][b]\n\nsolve(1, 2)\n")
+
+    assert response.status_code == 200
+    body = response.get_json()
+    assert body["source"] == "test-run"
+    assert "IndexError" in body["choices"][0]["message"]["content"]
+    assert llm.prompts == []
+
+
+def test_the_llm_is_asked_only_when_the_local_tiers_find_nothing(client, course, llm):
+    response = debug(client, course, PASSING_CODE)
+
+    assert response.status_code == 200
+    assert response.get_json()["choices"][0]["message"]["content"] == "Looks fine.\nNothing to fix."
+    assert len(llm.prompts) == 1
+    assert PASSING_CODE in llm.prompts[0]
+
+
+def test_unchanged_code_is_served_from_the_cache(client, course, llm, monkeypatch):
+    debug(client, course, PASSING_CODE)
+    monkeypatch.setattr(controllers, "quick_run_diagnosis", lambda *args: pytest.fail("ran the code again"))
+
+    # Comments, blank lines and indentation width do not change the diagnosis
+    response = debug(client, course, "# my answer\ndef solve(a, b):\n\n  return a + b  # add\n")
+
+    assert response.status_code == 200
+    assert response.get_json()["choices"][0]["message"]["content"] == "Looks fine.\nNothing to fix."
+    assert len(llm.prompts) == 1
+
+
+def test_test_run_diagnoses_are_cached(client, course, llm, monkeypatch):
+    code = "def solve(a, b):\n    return [a][b]\n\nsolve(1, 2)\n"
+    first = debug(client, course, code).get_json()
+    monkeypatch.setattr(controllers, "quick_run_diagnosis", lambda *args: pytest.fail("ran the code again"))
+
+    assert debug(client, course, code).get_json() == first
+
+
+def test_llm_errors_are_passed_on_and_not_cached(client, course, llm):
+    llm.response = FakeResponse(429, text="rate limited")
+
+    response = debug(client, course, PASSING_CODE)
+    assert response.status_code == 429
+    assert response.get_json() == {"error": "Failed to debug code", "message": "rate limited"}
+
+    debug(client, course, PASSING_CODE)
+    assert len(llm.prompts) == 2
+
+
+def test_unavailable_llm_gets_a_fast_503(client, course, llm):
+    llm.response = DependencyUnavailable("groq", "circuit open", retryAfter=12)
+
+    response = debug(client, course, PASSING_CODE)
+
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "12"
+    assert response.get_json() == {
+        "error": "Failed to debug code",
+        "message": "The debugging assistant is temporarily unavailable, please try again shortly",
+        "degraded": True
+    }
+
+
+def test_unknown_modules_are_rejected(client, course, llm):
+    response = client.post("/debug/code", json={
+        "email": course["student"].email, "moduleId": str(course["week"].id), "code": PASSING_CODE
+    })
+    assert response.status_code == 404
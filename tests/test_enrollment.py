@@ -0,0 +1,88 @@
+import pytest
+from pymongo.errors import BulkWriteError
+
+from api import enrollment
+from api.enrollment import backfill_enrollments, count_enrolled, enroll, enrolled_user_ids
+from api.models import Course, Enrollment, User
+
+
+def make_course(name, course):
+    return Course(name=name, description=name, startDate=course["course"].startDate,
+                  endDate=course["course"].endDate).save()
+
+
+def test_enroll_returns_only_new_courses(course):
+    other = make_course("Java", course)
+    student = course["student"].id
+
+    assert enroll(student, [other.id, other.id]) == [other.id]
+    assert enroll(student, [course["course"].id, other.id]) == []
+    assert Enrollment.objects(user=student).count() == 2
+
+
+def test_enroll_treats_a_concurrent_duplicate_as_existing(course, monkeypatch):
+    other = make_course("Java", course)
+
+    class RacingCollection:
+        # The first course was inserted by another request between our read and write
+        def bulk_write(self, operations, ordered):
+            raise BulkWriteError({
+                "writeErrors": [{"index": 0, "code": enrollment.DUPLICATE_KEY_ERROR, "errmsg": "duplicate"}],
+                "upserted": [{"index": 1, "_id": "new"}]
+            })
+
+    monkeypatch.setattr(Enrollment, "_get_collection", classmethod(lambda cls: RacingCollection()))
+    assert enroll(course["student"].id, [course["course"].id, other.id]) == [other.id]
+
+
+def test_enrollments_are_deleted_with_their_user_or_course(course):
+    other = make_course("Java", course)
+    classmate = User(role="student", email="classmate@example.com", name="Classmate").save()
+    enroll(classmate.id, [course["course"].id, other.id])
+    assert count_enrolled(course["course"].id) == 2
+
+    classmate.delete()
+    assert enrolled_user_ids(course["course"].id) == [course["student"].id]
+
+    other.delete()
+    assert Enrollment.objects(course=other.id).count() == 0
+
+
+def test_backfill_merges_both_legacy_arrays_in_batches(course, monkeypatch):
+    monkeypatch.setattr(enrollment, "BACKFILL_BATCH", 2)
+    Enrollment.objects.delete()
+    courses = [course["course"]] + [make_course(f"Course {index}", course) for index in range(2)]
+    students = [course["student"]] + [
+        User(role="student", email=f"student{index}@example.com", name="Student").save() for index in range(2)
+    ]
+    for student in students:
+        User.objects(id=student.id).update(set__registeredCourses=[item.id for item in courses])
+    for item in courses:
+        Course.objects(id=item.id).update(set__registeredUsers=[student.id for student in students])
+
+    assert backfill_enrollments() == 9
+    assert backfill_enrollments() == 0
+    assert Enrollment.objects.count() == 9
+
+
+def test_course_enrollments_pages_by_cursor(client, course):
+    courseId = course["course"].id
+    classmate = User(role="student", email="classmate@example.com", name="Classmate").save()
+    enroll(classmate.id, [courseId])
+
+    # A page that ends exactly at the last user has no next page
+    body = client.get(f"/course/{courseId}/enrollments?limit=2").get_json()
+    assert body["count"] == 2
+    assert body["users"] == [str(course["student"].id), str(classmate.id)]
+    assert body["nextCursor"] is None
+
+    first = client.get(f"/course/{courseId}/enrollments?limit=1").get_json()
+    assert first["users"] == [str(course["student"].id)]
+    second = client.get(f"/course/{courseId}/enrollments?limit=1&after={first['nextCursor']}").get_json()
+    assert second["users"] == [str(classmate.id)]
+    assert second["nextCursor"] is None
+
+
+def test_course_enrollments_rejects_bad_cursor(client, course):
+    response = client.get(f"/course/{course['course'].id}/enrollments?after=nope")
+    assert response.status_code == 400
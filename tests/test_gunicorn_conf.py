@@ -0,0 +1,96 @@
+import gc
+import os
+import runpy
+from types import SimpleNamespace
+
+import pytest
+
+CONFIG = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "gunicorn.conf.py")
+
+
+@pytest.fixture
+def load_config(monkeypatch, tmp_path):
+    """Runs gunicorn.conf.py with the given environment and returns its settings."""
+    def load(**env):
+        # Set first so that monkeypatch restores what the config file changes
+        monkeypatch.setenv("MONGO_CONNECT_ON_IMPORT", "1")
+        monkeypatch.setenv("PROMETHEUS_MULTIPROC_DIR", str(tmp_path / "metrics"))
+        for name in ("WORKER_THREADS", "GUNICORN_WORKER_CLASS", "GUNICORN_THREADS",
+                     "MONGO_MAX_POOL_SIZE", "MONGO_MIN_POOL_SIZE", "WEB_CONCURRENCY"):
+            monkeypatch.delenv(name, raising=False)
+        for name, value in env.items():
+            monkeypatch.setenv(name, value)
+        return runpy.run_path(CONFIG)
+    return load
+
+
+class FakeServer:
+    def __init__(self):
+        self.log = SimpleNamespace(info=lambda *args: None)
+
+
+def test_threaded_workers_serve_the_wsgi_app(load_config):
+    config = load_config(WEB_CONCURRENCY="3")
+
+    assert config["wsgi_app"] == "api.app:app"
+    assert (config["workers"], config["threads"]) == (3, 8)
+    assert config["preload_app"] is True
+    # One connection per request thread plus headroom, sized for the bulkheads too
+    assert (config["minPoolSize"], config["maxPoolSize"]) == (1, 12)
+    assert os.environ["WORKER_THREADS"] == "8"
+    # The master imports the app without creating a MongoDB client
+    assert os.environ["MONGO_CONNECT_ON_IMPORT"] == "0"
+
+
+def test_uvicorn_workers_serve_the_asgi_app(load_config):
+    config = load_config(GUNICORN_WORKER_CLASS="uvicorn.workers.UvicornWorker")
+
+    assert config["wsgi_app"] == "api.asgi:app"
+    assert config["threads"] == 1
+    assert config["maxPoolSize"] == 44
+    assert os.environ["WORKER_THREADS"] == "40"
+
+
+def test_pool_sizes_can_be_set(load_config):
+    config = load_config(MONGO_MAX_POOL_SIZE="20", MONGO_MIN_POOL_SIZE="5")
+    assert (config["minPoolSize"], config["maxPoolSize"]) == (5, 20)
+
+
+def test_samples_of_a_previous_run_are_removed(load_config, tmp_path):
+    (tmp_path / "metrics").mkdir()
+    (tmp_path / "metrics" / "counter_123.db").write_bytes(b"stale")
+
+    load_config()
+
+    assert os.listdir(tmp_path / "metrics") == []
+
+
+def test_each_worker_opens_its_own_pool_after_forking(load_config, monkeypatch):
+    from api import db
+    calls = []
+    monkeypatch.setattr(db, "init_db", lambda **options: calls.append(options))
+    config = load_config()
+
+    config["post_fork"](FakeServer(), SimpleNamespace(pid=123))
+
+    assert calls == [{"maxPoolSize": 12, "minPoolSize": 1}]
+
+
+def test_preloaded_objects_are_frozen_before_forking(load_config):
+    config = load_config()
+    try:
+        config["when_ready"](FakeServer())
+        assert gc.get_freeze_count() > 0
+    finally:
+        gc.unfreeze()
+
+
+def test_exited_workers_are_dropped_from_the_metrics(load_config, monkeypatch):
+    from prometheus_client import multiprocess
+    dead = []
+    monkeypatch.setattr(multiprocess, "mark_process_dead", dead.append)
+    config = load_config()
+
+    config["child_exit"](FakeServer(), SimpleNamespace(pid=123))
+
+    assert dead == [123]
@@ -0,0 +1,30 @@
+from api.models import User
+
+
+def test_first_login_creates_the_user(client, db):
+    response = client.post("/login", json={"email": "ada@example.com", "picture": "https://img/ada.png"})
+    assert response.status_code == 200
+
+    body = response.get_json()
+    user = User.objects.get(email="ada@example.com")
+    assert body["userId"] == str(user.id)
+    assert (body["role"], body["name"], body["picture"]) == ("student", "Ada", "https://img/ada.png")
+    assert user.active is True and user.registeredCourses == []
+
+
+def test_later_logins_update_last_login_only(client, course):
+    student = course["student"]
+    User.objects(id=student.id).update(set__role="admin", set__name="Kept")
+    before = User.objects.get(id=student.id).lastLogin
+
+    body = client.post("/login", json={"email": student.email, "name": "Ignored"}).get_json()
+    assert body["userId"] == str(student.id)
+    assert (body["role"], body["name"]) == ("admin", "Kept")
+    assert User.objects.get(id=student.id).lastLogin > before
+    assert User.objects(email=student.email).count() == 1
+
+
+def test_login_requires_a_valid_email(client, db):
+    assert client.post("/login", json={}).status_code == 400
+    assert client.post("/login", json={"email": "nope"}).status_code == 400
+    assert User.objects.count() == 0
@@ -0,0 +1,89 @@
+import os
+import sys
+import time
+
+import pytest
+
+from api.precheck import quick_run_diagnosis, static_diagnosis
+
+
+def test_static_reports_undefined_name():
+    assert static_diagnosis("print(pritn)").startswith("Line 1: NameError: `pritn`")
+
+
+def test_static_skips_names_from_star_imports():
+    assert static_diagnosis("from math import *\nprint(sqrt(4))") is None
+
+
+def test_static_knows_implicit_names():
+    code = "class A:\n    print(__qualname__)\n    def f(self):\n        return __class__\n"
+    assert static_diagnosis(code) is None
+
+
+def test_quick_run_reports_runtime_error():
+    diagnosis = quick_run_diagnosis("x = [1]\nprint(x[3])")
+    assert diagnosis.startswith("Line 2: IndexError")
+
+
+def test_quick_run_hides_server_environment(monkeypatch):
+    monkeypatch.setenv("SECRET_X", "hunter2")
+    diagnosis = quick_run_diagnosis('import os\nraise RuntimeError(os.environ.get("SECRET_X"))')
+    assert "hunter2" not in diagnosis
+
+
+@pytest.mark.skipif(sys.platform == "win32", reason="rlimits are POSIX only")
+def test_quick_run_limits_memory():
+    assert "MemoryError" in quick_run_diagnosis("x = bytearray(512 * 1024 * 1024)")
+
+
+@pytest.mark.skipif(sys.platform == "win32", reason="rlimits are POSIX only")
+def test_quick_run_bounds_output():
+    diagnosis = quick_run_diagnosis("while True:\n    print('x' * 1000)")
+    assert diagnosis.startswith("The code printed more than 64 KB")
+
+
+@pytest.mark.skipif(sys.platform == "win32", reason="process groups are POSIX only")
+def test_quick_run_timeout_kills_started_processes(tmp_path):
+    pidFile = tmp_path / "pid"
+    code = ("import subprocess, time\n"
+            f"child = subprocess.Popen(['sleep', '30'])\n"
+            f"open({str(pidFile)!r}, 'w').write(str(child.pid))\n"
+            "time.sleep(30)\n")
+    diagnosis = quick_run_diagnosis(code)
+    if not pidFile.exists():
+        # Not running as root: RLIMIT_NPROC kept the code from starting the process at all
+        assert "BlockingIOError" in diagnosis
+        return
+
+    assert diagnosis.startswith("The code did not finish")
+    status = f"/proc/{pidFile.read_text()}/status"
+
+    def dead():
+        # Gone, or a zombie waiting for init to reap it
+        try:
+            with open(status) as f:
+                return "State:\tZ" in f.read()
+        except FileNotFoundError:
+            return True
+
+    # SIGKILL is delivered asynchronously; give the orphan a moment to exit
+    deadline = time.monotonic() + 1
+    while not dead() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert dead()
+
+
+@pytest.mark.parametrize("code", [
+    "solve = lambda n: n",
+    "from helpers import solve",
+    "def _solve(n):\n    return n\nsolve = _solve",
+    "try:\n    from fast import solve\nexcept ImportError:\n    def solve(n):\n        return n",
+])
+def test_static_accepts_any_module_level_binding_of_template_function(code):
+    assert static_diagnosis(code, "def solve(n):\n    pass") is None
+
+
+def test_static_reports_missing_template_function():
+    template = "def solve(n):\n    pass"
+    diagnosis = static_diagnosis("def helper(n):\n    solve = n\n    return solve", template)
+    assert diagnosis.startswith("The function `solve` from the code template is not defined.")
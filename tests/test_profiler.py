@@ -0,0 +1,50 @@
+import pytest
+from flask import Flask
+
+from api.profiler import init_profiler
+
+TOKEN = "profile-me"
+
+
+def make_app():
+    app = Flask(__name__)
+
+    @app.route("/work")
+    def work():
+        return {"sum": sum(range(1000))}
+
+    init_profiler(app, token=TOKEN)
+    return app
+
+
+@pytest.fixture
+def client():
+    return make_app().test_client()
+
+
+def test_profiler_can_be_set_up_on_several_apps():
+    for app in (make_app(), make_app()):
+        assert app.test_client().get("/admin/profiler/memory/snapshot").status_code == 403
+
+
+def test_profiled_request_returns_the_profile(client):
+    response = client.get("/work", headers={"X-Profile": TOKEN})
+    assert response.status_code == 200
+    assert response.headers["X-Profiled-Status"] == "200"
+    assert b"cumulative" in response.data
+
+    # Without the right token the request is served normally
+    assert client.get("/work", headers={"X-Profile": "wrong"}).get_json() == {"sum": 499500}
+
+
+def test_memory_endpoints_validate_arguments(client):
+    headers = {"X-Profile": TOKEN}
+    assert client.post("/admin/profiler/memory/start?frames=abc", headers=headers).status_code == 400
+    assert client.post("/admin/profiler/memory/start?frames=0", headers=headers).status_code == 400
+    try:
+        assert client.post("/admin/profiler/memory/start?frames=5", headers=headers).get_json()["frames"] == 5
+        assert client.get("/admin/profiler/memory/snapshot?limit=x", headers=headers).status_code == 400
+        snapshot = client.get("/admin/profiler/memory/snapshot?limit=3", headers=headers).get_json()
+        assert len(snapshot["top"]) <= 3
+    finally:
+        client.post("/admin/profiler/memory/stop", headers=headers)
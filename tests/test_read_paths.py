@@ -0,0 +1,112 @@
+import importlib.util
+import os
+from datetime import datetime, timedelta
+
+import pytest
+
+from api import controllers
+from api.models import Announcement, Module, Question, VideoTranscript, Week
+
+BENCHMARK = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "benchmarks", "read_path.py")
+VIDEO_URL = "https://www.youtube.com/watch?v=dQw4w9WgXcQ"
+
+
+@pytest.fixture(scope="module")
+def orm():
+    """benchmarks/read_path.py, whose Document-based readers are the reference for the raw ones."""
+    spec = importlib.util.spec_from_file_location("read_path_benchmark", BENCHMARK)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+@pytest.fixture(autouse=True)
+def empty_caches():
+    for cache in (controllers.COURSE_RESPONSE_CACHE, controllers.TRANSCRIPT_RESPONSE_CACHE):
+        cache.clear()
+
+
+@pytest.fixture
+def full_course(course):
+    """The `course` fixture plus announcements and a module of every type."""
+    week = course["week"]
+    Announcement(course=course["course"], message="Welcome", date=datetime(2025, 1, 6)).save()
+    Module(week=week, title="Intro", type="video", url=VIDEO_URL).save()
+    Module(week=week, title="Quiz", type="assignment", isGraded=True, questions=[
+        Question(question="2 + 2?", type="mcq", options=["3", "4"], correctAnswer="4", hint="Add")
+    ]).save()
+    Module(week=week, title="Notes", type="document", docType="pdf", docUrl="https://example.com/notes.pdf").save()
+    # Written without the fields that have defaults, as older documents were
+    otherWeek = Week(course=course["course"], title="Week 2", deadline=datetime.now() + timedelta(days=14)).save()
+    Module._get_collection().insert_one({"week": otherWeek.id, "title": "Practice", "type": "assignment"})
+    Module._get_collection().insert_one({"week": otherWeek.id, "title": "Loops", "type": "coding",
+                                         "language": "python"})
+    return course
+
+
+def test_course_tree_matches_the_document_path(full_course, orm):
+    courseId = str(full_course["course"].id)
+    assert controllers.build_course_detail(courseId) == orm.orm_course_detail(courseId)
+
+
+def test_missing_module_fields_get_their_defaults(full_course):
+    weeks = controllers.build_course_detail(str(full_course["course"].id))["weeks"]
+
+    assert [week["title"] for week in weeks] == ["Week 1", "Week 2"]
+    practice, loops = weeks[1]["modules"]
+    assert (practice["questions"], practice["graded"]) == ([], False)
+    assert (loops["hint"], loops["testCases"]) == ("No hint available.", [])
+
+
+def test_course_endpoint_serves_the_tree(client, full_course):
+    response = client.get(f"/course/{full_course['course'].id}")
+
+    assert response.status_code == 200
+    body = response.get_json()
+    assert body["name"] == "Python"
+    assert [announcement["message"] for announcement in body["announcements"]] == ["Welcome"]
+    assert [module["type"] for module in body["weeks"][0]["modules"]] == ["coding", "video", "assignment", "document"]
+    assert body["weeks"][0]["modules"][0]["testCases"] == [{"inputData": "1 2", "expectedOutput": "3"}]
+
+
+def test_course_list(client, full_course):
+    response = client.get("/courses")
+
+    assert response.status_code == 200
+    assert [(course["id"], course["name"]) for course in response.get_json()["courses"]] == [
+        (str(full_course["course"].id), "Python")
+    ]
+
+
+@pytest.mark.parametrize("courseId, status", [("not-an-id", 400), ("0123456789abcdef01234567", 404)])
+def test_unknown_courses(client, db, courseId, status):
+    assert client.get(f"/course/{courseId}").status_code == status
+
+
+def test_transcript_matches_the_document_path(db, orm):
+    VideoTranscript(videoID="dQw4w9WgXcQ", transcript=[
+        {"text": f"segment {i}", "start": i * 2.5, "duration": 2.5} for i in range(3)
+    ]).save()
+
+    assert controllers.load_full_transcript("dQw4w9WgXcQ") == orm.orm_full_transcript("dQw4w9WgXcQ")
+    assert controllers.load_full_transcript("unknown0000") is None
+
+
+def test_transcript_endpoint(client, db):
+    VideoTranscript(videoID="dQw4w9WgXcQ", transcript=[{"text": "hello", "start": 0, "duration": 1},
+                                                       {"text": "world", "start": 1, "duration": 1}]).save()
+
+    response = client.get("/video-transcript", query_string={"videoURL": VIDEO_URL})
+
+    assert response.status_code == 200
+    assert response.get_json() == {"videoURL": VIDEO_URL, "videoID": "dQw4w9WgXcQ", "transcript": "hello world"}
+    assert client.get("/video-transcript", query_string={"videoURL": "https://youtu.be/aaaaaaaaaaa"}).status_code == 404
+
+
+def test_module_type_picks_the_chatbot_prompt(full_course):
+    types = {module.title: module for module in Module.objects}
+
+    assert controllers.get_module_type(types["Quiz"].id) == "graded"
+    assert controllers.get_module_type(types["Practice"].id) == "practice"
+    assert controllers.get_module_type(types["Intro"].id) == "learning"
+    assert controllers.get_module_type("0123456789abcdef01234567") == "Module not found"
@@ -0,0 +1,45 @@
+from api.models import Course, Enrollment, User
+
+
+def register(client, email, courses):
+    return client.post("/registered-courses", json={"email": email, "courses": [str(course) for course in courses]})
+
+
+def test_registers_a_new_user_with_their_courses(client, course):
+    courseId = course["course"].id
+
+    response = register(client, "new@example.com", [courseId, courseId])
+    assert response.status_code == 201
+
+    user = User.objects.get(email="new@example.com")
+    assert response.get_json()["user_id"] == str(user.id)
+    assert user.role == "student" and user.name == "New"
+    assert User._get_collection().find_one({"_id": user.id})["registeredCourses"] == [courseId]
+    assert Enrollment.objects(user=user.id).count() == 1
+
+
+def test_adds_courses_to_an_existing_user_without_duplicates(client, course):
+    other = Course(name="Java", description="Java", startDate=course["course"].startDate,
+                   endDate=course["course"].endDate).save()
+    student = course["student"]
+    User.objects(id=student.id).update(set__registeredCourses=[course["course"].id])
+
+    response = register(client, student.email, [course["course"].id, other.id])
+    assert response.status_code == 200
+    assert response.get_json()["user_id"] == str(student.id)
+
+    stored = User._get_collection().find_one({"_id": student.id})["registeredCourses"]
+    assert stored == [course["course"].id, other.id]
+    assert Enrollment.objects(user=student.id).count() == 2
+
+    names = [item["name"] for item in client.get(f"/registered-courses?email={student.email}")
+             .get_json()["registeredCourses"]]
+    assert names == ["Python", "Java"]
+
+
+def test_rejects_invalid_requests(client, course):
+    assert client.post("/registered-courses", json={"email": "x@example.com"}).status_code == 400
+    assert client.post("/registered-courses", json={"email": "x@example.com", "courses": ["nope"]}).status_code == 400
+    assert register(client, "x@example.com", ["0" * 24]).status_code == 400
+    assert register(client, "not-an-email", [course["course"].id]).status_code == 400
+    assert User.objects(email="x@example.com").count() == 0
@@ -0,0 +1,110 @@
+import time
+
+import pytest
+
+from api.resilience import CLOSED, HALF_OPEN, OPEN, CircuitBreaker, Dependency, DependencyUnavailable
+
+
+def open_breaker():
+    breaker = CircuitBreaker(failureThreshold=2, resetTimeout=0.05)
+    for _ in range(2):
+        assert breaker.allow() == CLOSED
+        breaker.record(False, 0)
+    assert breaker.state == OPEN
+    return breaker
+
+
+def test_straggler_success_does_not_close_an_open_circuit():
+    breaker = open_breaker()
+    breaker.record(True, 0)
+    assert breaker.state == OPEN
+    assert not breaker.allow()
+
+
+def test_only_the_probe_closes_a_half_open_circuit():
+    breaker = open_breaker()
+    time.sleep(0.06)
+    assert breaker.allow() == HALF_OPEN
+    assert not breaker.allow()
+
+    breaker.record(True, 0)
+    assert breaker.state == HALF_OPEN
+    breaker.record(True, 0, probe=True)
+    assert breaker.state == CLOSED
+
+
+def test_failed_probe_reopens_the_circuit():
+    breaker = open_breaker()
+    time.sleep(0.06)
+    assert breaker.allow() == HALF_OPEN
+    breaker.record(False, 0, probe=True)
+    assert breaker.state == OPEN
+
+
+def test_slow_calls_count_as_failures():
+    breaker = CircuitBreaker(failureThreshold=1, slowCallSeconds=1.0)
+    breaker.record(True, 2.0)
+    assert breaker.state == OPEN
+
+
+def test_dependency_recovers_through_its_probe():
+    dependency = Dependency("test", failureThreshold=1, resetTimeout=0.05)
+    with pytest.raises(ZeroDivisionError):
+        dependency.call(lambda: 1 / 0)
+    assert dependency.breaker.state == OPEN
+
+    time.sleep(0.06)
+    assert dependency.call(lambda: "ok") == "ok"
+    assert dependency.breaker.state == CLOSED
+
+
+def test_cancelled_probe_lets_the_next_call_probe():
+    import asyncio
+
+    dependency = Dependency("test", failureThreshold=1, resetTimeout=0.05)
+    with pytest.raises(ZeroDivisionError):
+        dependency.call(lambda: 1 / 0)
+    time.sleep(0.06)
+
+    async def scenario():
+        started = asyncio.Event()
+
+        async def hang():
+            started.set()
+            await asyncio.sleep(10)
+
+        probe = asyncio.ensure_future(dependency.acall(hang))
+        await started.wait()
+        probe.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await probe
+
+        async def ok():
+            return "ok"
+
+        return await dependency.acall(ok)
+
+    assert asyncio.run(scenario()) == "ok"
+    assert dependency.breaker.state == CLOSED
+
+
+def test_transport_errors_are_reported_as_unavailable():
+    import asyncio
+    import httpx
+
+    dependency = Dependency("test", failureThreshold=2)
+    with pytest.raises(DependencyUnavailable, match="connection failed"):
+        # Nothing listens on port 1
+        dependency.post("http://127.0.0.1:1/ask", json={})
+    assert dependency.breaker.failures == 1
+
+    def timeout(request):
+        raise httpx.ReadTimeout("timed out", request=request)
+
+    async def scenario():
+        async with httpx.AsyncClient(transport=httpx.MockTransport(timeout)) as client:
+            await dependency.apost(client, "http://rag/ask", json={})
+
+    with pytest.raises(DependencyUnavailable, match="timed out"):
+        asyncio.run(scenario())
+    assert dependency.breaker.state == OPEN
@@ -0,0 +1,116 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from api.singleflight import AsyncSingleFlight, SingleFlight
+
+
+def test_cancelled_leader_does_not_cancel_waiters():
+    flights = AsyncSingleFlight("test-cancel")
+
+    async def scenario():
+        release = asyncio.Event()
+        runs = []
+
+        async def work():
+            runs.append(1)
+            await release.wait()
+            return "answer"
+
+        leader = asyncio.ensure_future(flights.ado("key", work))
+        await asyncio.sleep(0)
+        waiter = asyncio.ensure_future(flights.ado("key", work))
+        await asyncio.sleep(0)
+
+        leader.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await leader
+        release.set()
+        return await waiter, runs
+
+    result, runs = asyncio.run(scenario())
+    assert result == "answer"
+    assert runs == [1]
+    assert flights.stats() == {"calls": 2, "executions": 1, "coalesced": 1, "inFlight": 0}
+
+
+def test_errors_are_shared_and_the_key_is_released():
+    flights = AsyncSingleFlight("test-error")
+
+    async def fail():
+        await asyncio.sleep(0)
+        raise ValueError("down")
+
+    async def scenario():
+        results = await asyncio.gather(flights.ado("key", fail), flights.ado("key", fail),
+                                       return_exceptions=True)
+        assert [type(result) for result in results] == [ValueError, ValueError]
+
+        async def ok():
+            return 1
+
+        return await flights.ado("key", ok)
+
+    assert asyncio.run(scenario()) == 1
+    assert flights.stats()["executions"] == 2
+
+
+def wait_until(condition, timeout=2):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.001)
+
+
+def test_concurrent_calls_share_one_execution():
+    flights = SingleFlight("test-share")
+    release = threading.Event()
+    runs = []
+
+    def work():
+        runs.append(1)
+        release.wait(2)
+        return "answer"
+
+    with ThreadPoolExecutor(max_workers=3) as pool:
+        futures = [pool.submit(flights.do, "key", work)]
+        wait_until(lambda: runs)
+        futures += [pool.submit(flights.do, "key", work) for _ in range(2)]
+        wait_until(lambda: flights.stats()["coalesced"] == 2)
+        release.set()
+        results = [future.result() for future in futures]
+
+    assert results == ["answer"] * 3
+    assert runs == [1]
+    assert flights.stats() == {"calls": 3, "executions": 1, "coalesced": 2, "inFlight": 0}
+
+
+def test_errors_are_raised_to_every_waiter():
+    flights = SingleFlight("test-sync-error")
+    release = threading.Event()
+
+    def fail():
+        release.wait(2)
+        raise ValueError("down")
+
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        leader = pool.submit(flights.do, "key", fail)
+        wait_until(lambda: flights.stats()["inFlight"] == 1)
+        waiter = pool.submit(flights.do, "key", fail)
+        wait_until(lambda: flights.stats()["coalesced"] == 1)
+        release.set()
+        for future in (leader, waiter):
+            with pytest.raises(ValueError):
+                future.result()
+
+    # Finished calls are not remembered
+    assert flights.do("key", lambda: 1) == 1
+
+
+def test_different_keys_run_separately():
+    flights = SingleFlight("test-keys")
+    assert [flights.do(key, lambda key=key: key) for key in ("a", "b")] == ["a", "b"]
+    assert flights.stats()["executions"] == 2
@@ -0,0 +1,113 @@
+import time
+
+import pytest
+
+from api import stats
+from api.enrollment import enroll
+from api.models import ChatQuestions, Course, StatsCounter, User
+from api.stats import COURSE_SCOPE, GLOBAL_KEY, GLOBAL_SCOPE, USER_SCOPE, get_counters, rebuild_counters, record_event
+
+
+@pytest.fixture(autouse=True)
+def unseeded(monkeypatch):
+    # counters_seeded() caches its answer for the life of the process
+    monkeypatch.setattr(stats, "_seeded", False)
+
+
+def complete(user, module):
+    User._get_collection().update_one({"_id": user.id}, {"$addToSet": {"modulesCompleted": module.id}})
+
+
+def ask(course, question):
+    ChatQuestions(user=course["student"], course=course["course"], week=course["week"],
+                  questions=[question]).save()
+
+
+def test_counters_are_ignored_until_rebuilt(course):
+    record_event("logins", userId=course["student"].id)
+    assert get_counters(USER_SCOPE, course["student"].id) is None
+
+    rebuild_counters()
+    assert get_counters(USER_SCOPE, course["student"].id)["logins"] == 1
+
+
+def test_rebuild_seeds_global_course_and_user_counters(course):
+    complete(course["student"], course["module"])
+    ask(course, "What is a list?")
+
+    rebuild_counters()
+
+    assert get_counters(GLOBAL_SCOPE, GLOBAL_KEY) == {
+        "users": 1, "activeUsers": 1, "modulesCompleted": 1, "questionsAttempted": 0,
+        "chatQuestions": 1, "enrollments": 1
+    }
+    assert get_counters(COURSE_SCOPE, course["course"].id) == {
+        "modulesCompleted": 1, "chatQuestions": 1, "enrollments": 1
+    }
+    assert get_counters(USER_SCOPE, course["student"].id) == {
+        "modulesCompleted": 1, "questionsAttempted": 0, "chatQuestions": 1, "enrollments": 1
+    }
+
+
+def test_rebuild_keeps_event_only_counters(course):
+    record_event("submissions", userId=course["student"].id, courseId=course["course"].id)
+    rebuild_counters()
+    rebuild_counters()
+    assert get_counters(COURSE_SCOPE, course["course"].id)["submissions"] == 1
+
+
+def test_deleting_a_user_takes_back_their_counts(client, course):
+    other = Course(name="Java", description="Programming in Java", startDate=course["course"].startDate,
+                   endDate=course["course"].endDate).save()
+    enroll(course["student"].id, [other.id])
+    complete(course["student"], course["module"])
+    ask(course, "What is a list?")
+    record_event("logins", userId=course["student"].id)
+    rebuild_counters()
+
+    response = client.delete(f"/user/{course['student'].id}")
+    assert response.status_code == 200
+
+    totals = get_counters(GLOBAL_SCOPE, GLOBAL_KEY)
+    for field in ("users", "activeUsers", "enrollments", "modulesCompleted", "chatQuestions"):
+        assert totals[field] == 0, field
+    assert totals["logins"] == 1
+    assert get_counters(COURSE_SCOPE, course["course"].id) == {
+        "modulesCompleted": 0, "chatQuestions": 0, "enrollments": 0
+    }
+    assert get_counters(COURSE_SCOPE, other.id) == {"enrollments": 0}
+    assert StatsCounter.objects(scope=USER_SCOPE, key=str(course["student"].id)).count() == 0
+
+    # What a rebuild finds now agrees with the adjusted counters
+    rebuild_counters()
+    assert get_counters(GLOBAL_SCOPE, GLOBAL_KEY)["enrollments"] == 0
+
+
+def test_rollup_writes_only_counters_changed_since_the_last_run(course):
+    from datetime import timedelta
+    from api.models import DailyStats
+    from api.stats import _start_of_day, get_daily_stats, get_ist_time, rollup_daily_stats
+
+    rebuild_counters()
+    # Counters updated in the same millisecond as a run are rolled up again by the next one
+    time.sleep(0.002)
+    today = _start_of_day(get_ist_time())
+    firstDay = today - timedelta(days=2)
+
+    # Every counter was just seeded, so the first run writes them all
+    assert rollup_daily_stats(firstDay) == StatsCounter.objects.count()
+    assert rollup_daily_stats(today - timedelta(days=1)) == 0
+
+    record_event("logins", userId=course["student"].id)
+    assert rollup_daily_stats(today) == 2  # The global and the student's counters
+    assert DailyStats.objects(day=today).count() == 2
+
+    daily = get_daily_stats(USER_SCOPE, course["student"].id, 3)
+    assert [entry["day"] for entry in daily] == [
+        (firstDay + timedelta(days=offset)).strftime("%Y-%m-%d") for offset in range(3)
+    ]
+    # The unchanged middle day repeats the counts with no change
+    assert daily[1]["counts"] == daily[0]["counts"]
+    assert not any(daily[1]["deltas"].values())
+    assert daily[2]["deltas"]["logins"] == 1
+    assert daily[2]["deltas"]["enrollments"] == 0
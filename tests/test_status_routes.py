@@ -0,0 +1,26 @@
+import pytest
+
+STATUS_ROUTES = ["/metrics", "/query_status", "/dependency_status", "/singleflight_status"]
+
+
+@pytest.mark.parametrize("route", STATUS_ROUTES)
+def test_status_routes_need_the_token(app, client, monkeypatch, route):
+    monkeypatch.setitem(app.config, "PROFILER_TOKEN", "secret")
+
+    assert client.get(route).status_code == 403
+    assert client.get(route, headers={"Authorization": "Bearer wrong"}).status_code == 403
+    assert client.get(route, headers={"Authorization": "Bearer secret"}).status_code == 200
+
+
+def test_status_routes_are_closed_without_a_token(app, client):
+    assert app.config.get("PROFILER_TOKEN") is None
+    assert client.get("/metrics").status_code == 403
+    # The health check stays public
+    assert client.get("/db_status").status_code == 200
+
+
+def test_status_routes_can_be_made_public(app, client, monkeypatch):
+    monkeypatch.setitem(app.config, "STATUS_ENDPOINTS_PUBLIC", True)
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert b"http_requests_total" in response.data
@@ -0,0 +1,104 @@
+import json
+import re
+
+import httpx
+import pytest
+
+from api import controllers, timing
+from api.models import VideoTranscript
+from api.timing import RequestTimer, begin_request_timer, end_request_timer, record, server_timing
+
+METRIC_RE = re.compile(r'^(total|db|http|json|compress);dur=\d+\.\d(;desc="n=\d+")?$')
+
+
+def metrics(header):
+    entries = [entry.strip() for entry in header.split(",")]
+    assert all(METRIC_RE.match(entry) for entry in entries), header
+    return {entry.split(";")[0]: entry for entry in entries}
+
+
+@pytest.fixture
+def logged(monkeypatch):
+    """Request log lines, decoded, instead of writing them to stdout."""
+    lines = []
+
+    class Logger:
+        def info(self, message):
+            lines.append(json.loads(message))
+
+    monkeypatch.setattr(timing, "LOG_ENABLED", True)
+    monkeypatch.setattr(timing, "logger", Logger())
+    return lines
+
+
+def test_header_lists_only_the_kinds_that_ran():
+    timer = RequestTimer()
+    timer.seconds["db"], timer.counts["db"] = 0.0123, 2
+
+    assert server_timing(timer, 0.05) == 'total;dur=50.0, db;dur=12.3;desc="n=2"'
+
+
+def test_time_outside_a_request_is_not_recorded():
+    record("db", 1.0)
+
+    timer, token = begin_request_timer()
+    record("db", 0.5)
+    end_request_timer(token)
+    record("db", 1.0)
+
+    assert (timer.seconds["db"], timer.counts["db"]) == (0.5, 1)
+
+
+def test_flask_responses_report_json_encoding(client, logged):
+    response = client.get("/db_status")
+
+    assert response.status_code == 200
+    reported = metrics(response.headers["Server-Timing"])
+    assert set(reported) >= {"total", "json"}
+    assert reported["json"].endswith('desc="n=1"')
+
+
+def test_compression_is_reported(client, db):
+    controllers.TRANSCRIPT_RESPONSE_CACHE.clear()
+    VideoTranscript(videoID="dQw4w9WgXcQ", transcript=[
+        {"text": f"segment {i} of the lecture", "start": i, "duration": 1} for i in range(500)
+    ]).save()
+
+    response = client.get("/video-transcript", headers={"Accept-Encoding": "gzip"},
+                          query_string={"videoURL": "https://www.youtube.com/watch?v=dQw4w9WgXcQ"})
+
+    assert response.headers["Content-Encoding"] == "gzip"
+    assert "compress" in metrics(response.headers["Server-Timing"])
+
+
+def test_each_request_is_logged_once_with_its_route(client, course, logged):
+    client.get(f"/course/{course['course'].id}")
+
+    assert len(logged) == 1
+    line = logged[0]
+    assert (line["method"], line["route"], line["path"], line["status"]) == (
+        "GET", "/course/<courseId>", f"/course/{course['course'].id}", 200
+    )
+    assert line["responseBytes"] > 0
+    assert line["totalMs"] >= line["jsonMs"]
+    assert set(line) >= {f"{kind}{unit}" for kind in timing.KINDS for unit in ("Ms", "Calls")}
+
+
+def test_async_routes_report_upstream_time(app, course, logged, monkeypatch):
+    from starlette.testclient import TestClient
+    from api import asgi
+    from api.asgi import app as asgiApp
+    monkeypatch.setattr(asgi, "LOG_ENABLED", True)
+
+    with TestClient(asgiApp) as asgiClient:
+        asgiApp.state.http = httpx.AsyncClient(transport=httpx.MockTransport(
+            lambda request: httpx.Response(200, json={"answer": "A sequence"})
+        ))
+        response = asgiClient.post("/chatbot", json={
+            "query": "What is a list?", "history": ["hi"], "email": course["student"].email,
+            "moduleId": str(course["module"].id)
+        })
+
+    assert response.status_code == 200
+    assert metrics(response.headers["Server-Timing"])["http"].endswith('desc="n=1"')
+    assert [(line["route"], line["status"], line["httpCalls"]) for line in logged] == [("/chatbot", 200, 1)]
@@ -0,0 +1,118 @@
+from datetime import timedelta
+
+import pytest
+from bson import ObjectId
+
+from api import topics
+from api.models import ChatQuestions, TopicSnapshot, User, get_ist_time
+
+
+@pytest.fixture
+def instructor(course):
+    topics.SNAPSHOT_CACHE.clear()
+    yield User(role="instructor", email="instructor@example.com", name="Instructor").save()
+    topics.SNAPSHOT_CACHE.clear()
+
+
+@pytest.fixture
+def refreshes(monkeypatch):
+    """Background refreshes requested, as (courseId, window) pairs, instead of running them."""
+    requested = []
+    monkeypatch.setattr(topics, "_refresh_in_background", lambda courseId, window: requested.append((courseId, window)))
+    return requested
+
+
+def ask(course, *questions, updatedAt=None):
+    return ChatQuestions(user=course["student"], course=course["course"], week=course["week"],
+                         questions=list(questions), updatedAt=updatedAt or get_ist_time()).save()
+
+
+def top_questions(client, course, email="instructor@example.com", **data):
+    return client.post("/top-questions", json={"email": email, "courseId": str(course["course"].id), **data})
+
+
+def test_first_request_computes_and_stores_the_snapshot(client, course, instructor, refreshes):
+    ask(course, "list index out of range", "index out of range in my list")
+
+    response = top_questions(client, course)
+
+    assert response.status_code == 200
+    body = response.get_json()
+    assert body["stale"] is False
+    assert body["window"] == "all"
+    assert body["allQuestions"] == ["list index out of range", "index out of range in my list"]
+    assert body["topics"][0]["questions"] == 2
+    assert TopicSnapshot.objects(course=course["course"].id, window="all").count() == 1
+    assert refreshes == []
+
+
+def test_stored_snapshot_is_served_without_recomputing(client, course, instructor, refreshes, monkeypatch):
+    ask(course, "list index out of range")
+    top_questions(client, course)
+    topics.SNAPSHOT_CACHE.clear()
+
+    monkeypatch.setattr(topics, "compute_topic_snapshot", lambda *args: pytest.fail("recomputed"))
+    response = top_questions(client, course)
+
+    assert response.status_code == 200
+    assert response.get_json()["stale"] is False
+    assert refreshes == []
+
+
+def test_new_questions_mark_the_snapshot_stale_and_refresh_it(client, course, instructor, refreshes, monkeypatch):
+    monkeypatch.setattr(topics, "REFRESH_MIN_NEW", 2)
+    ask(course, "list index out of range", updatedAt=get_ist_time() - timedelta(minutes=5))
+    first = top_questions(client, course).get_json()
+    topics.SNAPSHOT_CACHE.clear()
+
+    ask(course, "recursion depth exceeded")
+    ask(course, "recursion in factorial")
+    response = top_questions(client, course)
+
+    # The old snapshot is served while the refresh runs
+    body = response.get_json()
+    assert body["stale"] is True
+    assert body["allQuestions"] == first["allQuestions"]
+    assert refreshes == [(course["course"].id, "all")]
+
+
+def test_refresh_recomputes_the_stored_snapshot(course, instructor):
+    courseId = course["course"].id
+    ask(course, "list index out of range")
+    topics.compute_topic_snapshot(courseId, "all")
+    ask(course, "recursion depth exceeded")
+
+    topics.compute_topic_snapshot(courseId, "all")
+
+    stored = TopicSnapshot.objects(course=courseId, window="all").first()
+    assert sorted(stored.recentQuestions) == ["list index out of range", "recursion depth exceeded"]
+    assert topics.SNAPSHOT_CACHE.get((courseId, "all"))["recentQuestions"] == stored.recentQuestions
+
+
+def test_week_window_only_counts_that_week(client, course, instructor, refreshes):
+    from api.models import Week
+    otherWeek = Week(course=course["course"], title="Week 2", deadline=get_ist_time()).save()
+    ask(course, "list index out of range")
+    ChatQuestions(user=course["student"], course=course["course"], week=otherWeek,
+                  questions=["recursion depth exceeded"]).save()
+
+    response = top_questions(client, course, window=f"week:{course['week'].id}")
+
+    assert response.status_code == 200
+    assert response.get_json()["allQuestions"] == ["list index out of range"]
+
+
+def test_week_ids_ending_in_d_are_weeks():
+    weekId = "0123456789abcdef0123456d"
+    assert topics.window_query("course", f"week:{weekId}") == {"course": "course", "week": ObjectId(weekId)}
+
+
+def test_invalid_window_is_rejected(client, course, instructor):
+    response = top_questions(client, course, window="forever")
+    assert response.status_code == 400
+    assert response.get_json() == {"error": "Invalid window"}
+
+
+def test_students_cannot_see_top_questions(client, course, instructor):
+    response = top_questions(client, course, email=course["student"].email)
+    assert response.status_code == 404
@@ -0,0 +1,57 @@
+import itertools
+import string
+
+from api import topics
+from api.topics import TopicModel, tokenize
+
+
+def unrelated_questions(count):
+    # Questions sharing no terms with each other
+    words = ("".join(letters) for letters in itertools.product(string.ascii_lowercase, repeat=3))
+    return [f"{next(words)} {next(words)} {next(words)}" for _ in range(count)]
+
+
+def test_tokenize_drops_stopwords_and_short_tokens():
+    assert tokenize("How do I use a for loop in Python?") == ["loop"]
+
+
+def test_similar_questions_share_a_cluster():
+    model = TopicModel()
+    model.partial_fit([
+        "list index out of range error",
+        "index out of range in my list",
+        "recursion depth exceeded in factorial",
+    ])
+    assert len(model.clusters) == 2
+    assert sorted(cluster["size"] for cluster in model.clusters) == [1, 2]
+
+
+def test_clusters_never_exceed_the_limit():
+    model = TopicModel()
+    model.partial_fit(unrelated_questions(300))
+    assert len(model.clusters) == topics.MAX_CLUSTERS
+    assert sum(cluster["size"] for cluster in model.clusters) == 300
+
+
+def test_centroids_and_samples_stay_small():
+    model = TopicModel()
+    model.partial_fit(unrelated_questions(300))
+    for cluster in model.clusters:
+        assert len(cluster["centroid"]) <= topics.CENTROID_TERMS
+        assert len(cluster["samples"]) <= topics.CLUSTER_SAMPLES
+
+
+def test_vocabulary_is_bounded(monkeypatch):
+    monkeypatch.setattr(topics, "MAX_VOCABULARY", 100)
+    model = TopicModel()
+    questions = unrelated_questions(200)
+    model.partial_fit(questions + questions)  # every term seen twice
+    assert len(model.docFreq) <= 100
+
+
+def test_top_topics_orders_by_size():
+    model = TopicModel()
+    model.partial_fit(["sorting a list", "sorting a list quickly", "reading files"])
+    result = model.top_topics(2)
+    assert [topic["questions"] for topic in result] == [2, 1]
+    assert result[0]["samples"][0].startswith("sorting")
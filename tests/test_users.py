@@ -0,0 +1,60 @@
+import json
+
+import pytest
+
+from api.models import User
+
+
+@pytest.fixture
+def users(db):
+    people = [
+        User(role="student", email="s1@example.com", name="S1").save(),
+        User(role="admin", email="a1@example.com", name="A1").save(),
+        User(role="student", email="s2@example.com", name="S2", active=False).save(),
+        User(role="student", email="s3@example.com", name="S3").save(),
+    ]
+    return [str(user.id) for user in people]
+
+
+def test_listing_pages_by_cursor(client, users):
+    first = client.get("/users?limit=3")
+    assert [user["id"] for user in first.get_json()] == users[:3]
+    assert first.headers["X-Next-Cursor"] == users[2]
+
+    last = client.get(f"/users?limit=3&after={first.headers['X-Next-Cursor']}")
+    assert [user["id"] for user in last.get_json()] == users[3:]
+    assert "X-Next-Cursor" not in last.headers
+
+    # A page ending exactly on the last user has no cursor
+    assert "X-Next-Cursor" not in client.get("/users?limit=4").headers
+
+
+def test_listing_filters_by_role_and_active(client, users):
+    students = client.get("/users?role=student").get_json()
+    assert [user["id"] for user in students] == [users[0], users[2], users[3]]
+
+    inactive = client.get("/users?active=false").get_json()
+    assert [user["id"] for user in inactive] == [users[2]]
+
+    both = client.get("/users?role=student&active=true&limit=1")
+    assert [user["id"] for user in both.get_json()] == [users[0]]
+    assert both.headers["X-Next-Cursor"] == users[0]
+
+
+def test_listing_rejects_bad_cursor_and_limit(client, users):
+    assert client.get("/users?after=nope").status_code == 400
+    assert client.get("/users?limit=0").status_code == 400
+
+
+def test_ndjson_export_streams_every_matching_user(client, users):
+    response = client.get("/users?format=ndjson&role=student")
+    assert response.mimetype == "application/x-ndjson"
+    rows = [json.loads(line) for line in response.data.decode().splitlines()]
+    assert [row["id"] for row in rows] == [users[0], users[2], users[3]]
+    assert set(rows[0]) == {"id", "role", "email", "name", "profilePictureUrl", "registeredCourses"}
+
+
+def test_single_user_lookup(client, users):
+    assert client.get(f"/user/{users[1]}").get_json()["role"] == "admin"
+    assert client.get("/user/nope").status_code == 400
+    assert client.get("/user/" + "0" * 24).status_code == 404
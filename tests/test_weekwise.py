@@ -0,0 +1,59 @@
+from datetime import date, datetime, timedelta
+
+import pytest
+
+from api.models import ChatQuestions, Week
+
+
+@pytest.fixture
+def questions(course):
+    second = Week(course=course["course"], title="Week 2", deadline=datetime.now() + timedelta(days=14)).save()
+    asked = [
+        (course["week"], date(2025, 1, 1), ["What is a list?", "what is a list? "]),
+        (course["week"], date(2025, 1, 2), ["How do loops work?"]),
+        (second, date(2025, 1, 8), ["What is a dict?"]),
+    ]
+    for week, day, texts in asked:
+        ChatQuestions(user=course["student"], course=course["course"], week=week, date=day,
+                      questions=texts).save()
+    return {**course, "second": second}
+
+
+def weekwise(client, questions, **params):
+    query = "&".join(f"{key}={value}" for key, value in params.items())
+    return client.get(f"/weekwise-questions?courseId={questions['course'].id}&{query}")
+
+
+def test_pages_each_weeks_questions_in_order(client, questions):
+    body = weekwise(client, questions, limit=2).get_json()
+    assert body["offset"] == 0 and body["limit"] == 2
+
+    first, second = body["weekwise_questions"]
+    assert first["title"] == "Week 1"
+    assert first["questionCount"] == 3
+    assert first["questions"] == ["What is a list?", "what is a list? "]
+    assert first["hasMore"] is True
+    assert second["questions"] == ["What is a dict?"]
+    assert second["hasMore"] is False
+
+    body = weekwise(client, questions, limit=2, offset=2).get_json()
+    first, second = body["weekwise_questions"]
+    assert first["questions"] == ["How do loops work?"]
+    assert first["hasMore"] is False
+    assert second["questions"] == []
+
+
+def test_restricts_to_one_week(client, questions):
+    body = weekwise(client, questions, weekId=questions["second"].id).get_json()
+    assert [week["weekId"] for week in body["weekwise_questions"]] == [str(questions["second"].id)]
+
+
+def test_top_questions_ignore_case_and_whitespace(client, questions):
+    first = weekwise(client, questions, top=1).get_json()["weekwise_questions"][0]
+    assert first["topQuestions"] == [{"question": "what is a list?", "count": 2}]
+
+
+def test_rejects_bad_parameters(client, questions):
+    assert weekwise(client, questions, offset=-1).status_code == 400
+    assert weekwise(client, questions, top=0).status_code == 400
+    assert client.get("/weekwise-questions?courseId=nope").status_code == 400